@@ -1,8 +1,10 @@
 from lnder_signzy.customization.employee.custom_field import employee_field_customization
 from lnder_signzy.customization.driver.custom_field import driver_field_customization
 from lnder_signzy.customization.bank_account.custom_field import bank_account_field_customization
+from lnder_signzy.customization.vehicle.custom_field import vehicle_field_customization
 
 def after_migrate():
 	employee_field_customization()
 	driver_field_customization()
-	bank_account_field_customization()
\ No newline at end of file
+	bank_account_field_customization()
+	vehicle_field_customization()
\ No newline at end of file
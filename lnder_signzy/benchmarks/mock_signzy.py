@@ -0,0 +1,144 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+"""
+A local stand-in for the Signzy API, used by the benchmarks and tests.
+
+	with MockSignzyServer(latency=0.05, error_rate=0.01) as server, use_mock_connector(server.url):
+		...
+"""
+
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import frappe
+
+from lnder_signzy.lnder_signzy.doctype.signzy_connector import signzy_connector
+
+# A representative success body for every endpoint the app calls
+RESPONSES = {
+	"/aadhaar/verify": {"result": {"verified": "true", "ageBand": "20-30", "state": "Karnataka"}},
+	"/aadhaar/extraction": {"result": {"name": "Test User", "uid": "XXXXXXXX0124", "dob": "01/01/1990", "address": "1, Test Street, Bengaluru"}},
+	"/phone/generateOtp": {"result": {"referenceId": "mock-reference-id"}},
+	"/phone/getNumberDetails": {"result": {"mobileNumber": "9999999999", "operator": "Mock"}},
+	"/dl_/verification": {"result": {"verified": True, "message": "Verified", "moreInfo": {"expiryDate": "2040-01-01"}}},
+	"/dl_number/based_search": {"result": {"name": "Test User", "validity": {"nonTransport": "2040-01-01"}}},
+	"/pan/verify": {"result": {"panStatus": "E", "name": "Y", "dob": "Y"}},
+	"/bankAccountVerification/upiVerifications": {"result": {"verified": "true", "name": "Test User"}},
+	"/bankaccountverifications/advancedverification": {"result": {"active": "yes", "reason": "success", "nameMatch": "yes"}},
+	"/vehicle/detailedsearches": {"result": {"regNo": "KA01AB1234", "blacklistStatus": "NA", "splitPresentAddress": {"city": ["Bengaluru"]}}},
+}
+
+
+class MockSignzyServer:
+	"""
+	Serves canned Signzy responses on a local port.
+
+	Args:
+		latency (float, optional): Seconds each response is delayed by. Defaults to 0.
+		jitter (float, optional): Up to this many extra seconds are added at random. Defaults to 0.
+		error_rate (float, optional): Fraction of requests answered with a 503. Defaults to 0.
+		port (int, optional): Port to listen on, 0 picks a free one. Defaults to 0.
+	"""
+
+	def __init__(self, latency: float = 0, jitter: float = 0, error_rate: float = 0, port: int = 0):
+		self.latency = latency
+		self.jitter = jitter
+		self.error_rate = error_rate
+		self.request_count = 0
+		self._lock = threading.Lock()
+		self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+		self._server.daemon_threads = True
+		self._thread = None
+
+	@property
+	def url(self) -> str:
+		host, port = self._server.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def start(self) -> "MockSignzyServer":
+		self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self._server.shutdown()
+		self._server.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *args):
+		self.stop()
+
+	def _make_handler(self):
+		server = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = "HTTP/1.1"
+
+			def do_POST(self):
+				self.rfile.read(int(self.headers.get("Content-Length") or 0))
+				with server._lock:
+					server.request_count += 1
+
+				time.sleep(server.latency + random.uniform(0, server.jitter))
+
+				if self.path not in RESPONSES:
+					status, body = 404, {"error": {"message": f"Unknown endpoint {self.path}"}}
+				elif random.random() < server.error_rate:
+					status, body = 503, {"error": {"message": "Injected failure"}}
+				else:
+					status, body = 200, RESPONSES[self.path]
+
+				content = json.dumps(body).encode()
+				self.send_response(status)
+				self.send_header("Content-Type", "application/json")
+				self.send_header("Content-Length", str(len(content)))
+				self.end_headers()
+				self.wfile.write(content)
+
+			def log_message(self, *args):
+				pass
+
+		return Handler
+
+
+@contextmanager
+def use_mock_connector(url: str, **overrides):
+	"""
+	Points this worker's connector settings at a mock server without touching the saved connector.
+
+	Result cache, circuit breaker, retries and rate limits are off unless passed in `overrides`,
+	so every call reaches the mock server exactly once.
+
+	Args:
+		url (str): Base URL of the mock server.
+		**overrides: Any other connector settings to replace.
+	"""
+	site = frappe.local.site
+	config = frappe._dict(signzy_connector.get_connector_config())
+	config.update(
+		url=url,
+		authorization="mock-token",
+		enable_result_cache=0,
+		enable_circuit_breaker=0,
+		max_attempts=1,
+		api_settings=[],
+		endpoints=[frappe._dict(id=None, url=url, authorization="mock-token", weight=1, apis=())]
+	)
+	config.update(overrides)
+
+	previous = signzy_connector._config.get(site)
+	signzy_connector._config[site] = (frappe.cache().get_value(signzy_connector.CONFIG_VERSION_KEY), config)
+	try:
+		yield config
+	finally:
+		if previous:
+			signzy_connector._config[site] = previous
+		else:
+			signzy_connector._config.pop(site, None)
@@ -0,0 +1,255 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+"""
+Benchmarks every lnder_signzy.signzy_api endpoint against a local mock Signzy server.
+
+	bench --site <site> execute lnder_signzy.benchmarks.run.run
+	bench --site <site> execute lnder_signzy.benchmarks.run.run --kwargs "{'concurrency': '1,16', 'latency': 0.2, 'error_rate': 0.05}"
+
+The request log rows the run writes, and what they added to the Signzy API Usage totals, are
+removed again once it is done.
+"""
+
+import threading
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+from lnder_signzy import signzy_api
+from lnder_signzy.benchmarks.mock_signzy import MockSignzyServer, use_mock_connector
+from lnder_signzy.lnder_signzy.doctype.signzy_api_request_log.signzy_api_request_log import (
+	LOG_FLUSH_LOCK,
+	create_log,
+	flush_logs,
+)
+from lnder_signzy.lnder_signzy.doctype.signzy_api_usage.signzy_api_usage import get_status_class
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+from lnder_signzy.signzy_validators import VERHOEFF_D, VERHOEFF_P
+
+# The URL of the log rows written by `measure_overhead`
+OVERHEAD_LOG_URL = "http://benchmark"
+
+
+def aadhaar_number(index: int) -> str:
+	"""Returns a distinct Aadhaar number with a valid Verhoeff check digit for each index."""
+	number = str(20000000000 + index)
+	checksum = 0
+	for position, digit in enumerate(reversed(number)):
+		checksum = VERHOEFF_D[checksum][VERHOEFF_P[(position + 1) % 8][int(digit)]]
+	return number + str(VERHOEFF_D[checksum].index(0))
+
+
+# Arguments for the index-th call to each endpoint; every call differs, as real traffic does,
+# so identical calls in flight are not coalesced into one
+ENDPOINTS = {
+	"verify_aadhaar": lambda i: {"aadhaar_no": aadhaar_number(i)},
+	"verify_aadhaar_ocr": lambda i: {"front_url": f"/files/aadhaar-front-{i}.jpg", "back_url": f"/files/aadhaar-back-{i}.jpg"},
+	"generate_otp": lambda i: {"country_code": "91", "mobile_no": f"9{i:09d}"},
+	"submit_otp": lambda i: {"country_code": "91", "mobile_no": f"9{i:09d}", "reference_id": f"mock-reference-{i}", "otp": "123456"},
+	"verify_dl": lambda i: {"dl_number": f"KA012020{i:07d}", "dob": "1990-01-01", "issue_date": "2020-01-01"},
+	"extract_dl": lambda i: {"dl_number": f"KA012020{i:07d}", "dob": "1990-01-01"},
+	"verify_pan": lambda i: {"pan": f"ABCP{chr(65 + i // 10000 % 26)}{i % 10000:04d}F", "name": "Test User", "dob": "1990-01-01"},
+	"verify_upi": lambda i: {"vpa": f"test{i}@upi", "name": "Test User"},
+	"verify_bank_acc": lambda i: {"acc_no": str(1000000000 + i), "ifsc_code": "SBIN0000001", "mobile_no": f"9{i:09d}", "name": "Test User"},
+	"verify_rc": lambda i: {"vehicle_no": f"KA{1 + i // 10000 % 99:02d}AB{i % 10000:04d}"},
+}
+
+
+def run(
+	concurrency: str = "1,8,32",
+	requests_per_level: int = 200,
+	latency: float = 0.05,
+	jitter: float = 0.02,
+	error_rate: float = 0.0,
+	endpoints: str | None = None
+) -> dict:
+	"""
+	Runs the benchmark and prints a report.
+
+	Args:
+		concurrency (str, optional): Comma separated concurrency levels. Defaults to "1,8,32".
+		requests_per_level (int, optional): Calls per endpoint at each level. Defaults to 200.
+		latency (float, optional): Mock server latency in seconds. Defaults to 0.05.
+		jitter (float, optional): Random extra mock latency in seconds. Defaults to 0.02.
+		error_rate (float, optional): Fraction of mock responses that are 503s. Defaults to 0.
+		endpoints (str, optional): Comma separated endpoint names to limit the run to. Defaults to all.
+
+	Returns:
+		dict: {"endpoints": [...one row per endpoint and level...], "overhead": {...}}
+	"""
+	levels = [int(level) for level in str(concurrency).split(",")]
+	names = endpoints.split(",") if endpoints else list(ENDPOINTS)
+
+	results = {"endpoints": [], "overhead": {}}
+	server = MockSignzyServer(latency=latency, jitter=jitter, error_rate=error_rate)
+	try:
+		with server, use_mock_connector(server.url):
+			results["overhead"] = measure_overhead()
+			for name in names:
+				for level in levels:
+					results["endpoints"].append(benchmark_endpoint(name, level, requests_per_level))
+	finally:
+		remove_benchmark_logs((server.url, OVERHEAD_LOG_URL))
+
+	print_report(results)
+	return results
+
+
+def benchmark_endpoint(name: str, concurrency: int, total: int) -> dict:
+	"""Calls one endpoint `total` times from `concurrency` threads and returns latency percentiles."""
+	fn = getattr(signzy_api, name)
+	get_kwargs = ENDPOINTS[name]
+	site, sites_path, user = frappe.local.site, frappe.local.sites_path, frappe.session.user
+
+	latencies, errors = [], []
+	remaining = iter(range(total))
+	lock = threading.Lock()
+
+	def worker():
+		frappe.init(site=site, sites_path=sites_path)
+		frappe.connect()
+		frappe.set_user(user)
+		try:
+			while True:
+				with lock:
+					index = next(remaining, None)
+				if index is None:
+					return
+				started_at = time.perf_counter()
+				try:
+					fn(**get_kwargs(index))
+				except Exception as e:
+					errors.append(str(e))
+				finally:
+					latencies.append(time.perf_counter() - started_at)
+		finally:
+			frappe.destroy()
+
+	started_at = time.perf_counter()
+	threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	elapsed = time.perf_counter() - started_at
+
+	latencies.sort()
+	return {
+		"endpoint": name,
+		"concurrency": concurrency,
+		"requests": len(latencies),
+		"errors": len(errors),
+		"p50": percentile(latencies, 50),
+		"p95": percentile(latencies, 95),
+		"p99": percentile(latencies, 99),
+		"throughput": len(latencies) / elapsed if elapsed else 0
+	}
+
+
+def measure_overhead(iterations: int = 500) -> dict:
+	"""Returns the mean cost in microseconds of the config lookup, a log write, a log flush per row and a commit."""
+	overhead = {}
+
+	started_at = time.perf_counter()
+	for _ in range(iterations):
+		get_connector_config()
+	overhead["config_lookup_us"] = (time.perf_counter() - started_at) / iterations * 1e6
+
+	flush_logs()
+	started_at = time.perf_counter()
+	for _ in range(iterations):
+		create_log(
+			api_name="Verify PAN",
+			api_endpoint=f"{OVERHEAD_LOG_URL}/pan/verify",
+			api_request_header={"Content-Type": "application/json"},
+			api_request_data='{"pan":"ABCPE1234F"}',
+			api_response=b'{"result":{"panStatus":"E","name":"Y","dob":"Y"}}',
+			api_response_status_code=200
+		)
+	overhead["log_write_us"] = (time.perf_counter() - started_at) / iterations * 1e6
+
+	started_at = time.perf_counter()
+	flush_logs()
+	overhead["log_flush_per_row_us"] = (time.perf_counter() - started_at) / iterations * 1e6
+
+	started_at = time.perf_counter()
+	for _ in range(50):
+		frappe.db.commit()
+	overhead["commit_us"] = (time.perf_counter() - started_at) / 50 * 1e6
+
+	return overhead
+
+
+def remove_benchmark_logs(urls: tuple):
+	"""
+	Deletes the request log rows written against the given base URLs and takes them back out of
+	the Signzy API Usage totals, once every buffered row has been flushed.
+
+	Args:
+		urls (tuple): Base URLs the benchmark's calls and log writes went to.
+	"""
+	# A flush running elsewhere may hold benchmark rows; wait for it before the final flush
+	cache = frappe.cache()
+	lock = cache.lock(cache.make_key(LOG_FLUSH_LOCK), timeout=300)
+	if lock.acquire(blocking_timeout=300):
+		lock.release()
+	flush_logs()
+
+	url_filters = [["url", "like", f"{url}/%"] for url in urls]
+	logs = frappe.get_all(
+		"Signzy API Request Log",
+		or_filters=url_filters,
+		fields=["name", "creation", "api_method", "status_code", "latency", "response_size"]
+	)
+	if not logs:
+		return
+
+	totals = {}
+	for log in logs:
+		key = f"{str(log.creation)[:10]}|{log.api_method or ''}|{get_status_class(log.status_code)}"
+		total = totals.setdefault(key, [0, 0.0, 0])
+		total[0] += 1
+		total[1] += flt(log.latency)
+		if log.status_code:
+			total[2] += cint(log.response_size)
+
+	for name, (calls, latency_sum, response_bytes) in totals.items():
+		frappe.db.sql(
+			""" UPDATE `tabSignzy API Usage`
+			SET `calls` = `calls` - %s, `latency_sum` = `latency_sum` - %s, `response_bytes` = `response_bytes` - %s
+			WHERE `name` = %s
+		""",
+			(calls, latency_sum, response_bytes, name)
+		)
+	frappe.db.delete("Signzy API Usage", {"name": ("in", list(totals)), "calls": ("<=", 0)})
+
+	names = [log.name for log in logs]
+	for file_name in frappe.get_all(
+		"File", filters={"attached_to_doctype": "Signzy API Request Log", "attached_to_name": ("in", names)}, pluck="name"
+	):
+		frappe.delete_doc("File", file_name, ignore_permissions=True)
+	frappe.db.delete("Signzy API Request Log", {"name": ("in", names)})
+	frappe.db.commit()
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+	"""Returns the nearest-rank percentile of an already sorted list."""
+	if not sorted_values:
+		return 0
+	index = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+	return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def print_report(results: dict):
+	print(f"{'endpoint':<20}{'conc':>6}{'reqs':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+	for row in results["endpoints"]:
+		print(
+			f"{row['endpoint']:<20}{row['concurrency']:>6}{row['requests']:>7}{row['errors']:>8}"
+			f"{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}{row['p99'] * 1000:>10.1f}{row['throughput']:>10.1f}"
+		)
+
+	print()
+	for name, value in results["overhead"].items():
+		print(f"{name:<24}{value:>10.1f}")
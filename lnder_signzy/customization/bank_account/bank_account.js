@@ -8,7 +8,8 @@ frappe.ui.form.on("Bank Account", {
 		}
 		const args = {
 			vpa: frm.doc.custom_upi_id,
-			name: frm.doc.account_name
+			name: frm.doc.account_name,
+			...get_writeback_target(frm)
 		};
 
 		frappe.call({
@@ -17,7 +18,12 @@ frappe.ui.form.on("Bank Account", {
 			freeze: true,
 			freeze_message: __("Verifying UPI ID"),
 			callback: (r) => {
-				if (!r.exec && r.message.result) {
+				if (!r.exec && r.message.values) {
+					apply_verification_values(frm, r.message.values);
+					if (r.message.verified) {
+						frappe.msgprint(__("UPI ID Verified Successfully"));
+					}
+				} else if (!r.exec && r.message.result) {
 					handle_upi_verification_result(frm, r.message.result);
 				}
 			}
@@ -34,6 +40,7 @@ frappe.ui.form.on("Bank Account", {
 			ifsc_code: frm.doc.branch_code,
 			mobile_no: frm.doc.custom_mobile_no,
 			// email: frm.doc.personal_email || undefined
+			...get_writeback_target(frm)
 		};
 	
 		frappe.call({
@@ -42,13 +49,27 @@ frappe.ui.form.on("Bank Account", {
 			freeze: true,
 			freeze_message: __("Verifying Bank Account..."),
 			callback: (r) => {
-				if (!r.exec && r.message.result) {
+				if (!r.exec && r.message.values) {
+					apply_verification_values(frm, r.message.values);
+					frappe.msgprint(r.message.verified ? __("Bank Account Verified Successfully") : __("Bank Account Verification Failed"));
+				} else if (!r.exec && r.message.result) {
 					handle_bank_account_verification_result(frm, r.message.result);
 				}
 			}
 		});
 	}
 });
+function get_writeback_target(frm) {
+	// Saved documents get the result written server side; new ones apply it on save
+	return frm.is_new() ? {} : { doctype: frm.doc.doctype, docname: frm.doc.name };
+}
+
+function apply_verification_values(frm, values) {
+	// Already saved on the server, so update the form without marking it dirty
+	Object.assign(frm.doc, values);
+	frm.refresh_fields();
+}
+
 function handle_upi_verification_result(frm, result) {
 	if (result.verified === "true") {
 		frm.set_value("custom_is_upi_verified", 1)
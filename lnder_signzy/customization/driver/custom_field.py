@@ -20,6 +20,27 @@ def create_driver_custom_field():
 				fieldtype="Check",
 				insert_after="custom_verify_driving_license",
 				read_only=1
+			),
+			dict(
+				fieldname="custom_dl_last_checked_on",
+				label="Driving License Last Checked On",
+				fieldtype="Datetime",
+				insert_after="custom_driving_license_verified",
+				read_only=1
+			),
+			dict(
+				fieldname="custom_dl_check_failures",
+				label="Driving License Check Failures",
+				fieldtype="Int",
+				insert_after="custom_dl_last_checked_on",
+				read_only=1
+			),
+			dict(
+				fieldname="custom_dl_last_attempted_on",
+				label="Driving License Last Attempted On",
+				fieldtype="Datetime",
+				insert_after="custom_dl_check_failures",
+				read_only=1
 			)
 		]
 	}
@@ -13,7 +13,8 @@ frappe.ui.form.on("Driver", {
 		const args = {
 			dl_number: frm.doc.license_number,
 			dob: frm.doc.custom_date_of_birth,
-			issue_date: frm.doc.issuing_date
+			issue_date: frm.doc.issuing_date,
+			...get_writeback_target(frm)
 		};
 	
 		frappe.call({
@@ -22,13 +23,27 @@ frappe.ui.form.on("Driver", {
 			freeze: true,
 			freeze_message: __("Verifying Driving License..."),
 			callback: (r) => {
-				if (!r.exec && r.message.result) {
+				if (!r.exec && r.message.values) {
+					apply_verification_values(frm, r.message.values);
+					frappe.msgprint(r.message.message || (r.message.verified ? __("Driving License Verified") : __("Driving License Verification Failed")));
+				} else if (!r.exec && r.message.result) {
 					handle_dl_verification_result(frm, r.message.result);
 				}
 			}
 		});
 	}
 });
+function get_writeback_target(frm) {
+	// Saved documents get the result written server side; new ones apply it on save
+	return frm.is_new() ? {} : { doctype: frm.doc.doctype, docname: frm.doc.name };
+}
+
+function apply_verification_values(frm, values) {
+	// Already saved on the server, so update the form without marking it dirty
+	Object.assign(frm.doc, values);
+	frm.refresh_fields();
+}
+
 function handle_dl_verification_result(frm, result) {
 	if (result.verified) {
 		if (result.moreInfo && result.moreInfo.expiryDate) {
@@ -1,6 +1,8 @@
 frappe.ui.form.on("Employee", {
 	refresh: function (frm) {
-		//
+		if (!frm.is_new()) {
+			frm.add_custom_button(__("Verify KYC"), () => verify_employee_kyc(frm));
+		}
 	},
 	custom_verify_mobile: function (frm) {
 		if (!frm.doc.custom_mobile_number) {
@@ -50,12 +52,16 @@ frappe.ui.form.on("Employee", {
 		frappe.call({
 			method: "lnder_signzy.signzy_api.verify_aadhaar",
 			args: {
-				aadhaar_no: frm.doc.custom_aadhar_number
+				aadhaar_no: frm.doc.custom_aadhar_number,
+				...get_writeback_target(frm)
 			},
 			freeze: true,
 			freeze_message: __("Verifying Aadhaar Number"),
 			callback: (r) => {
-				if (!r.exec && r.message.result) {
+				if (!r.exec && r.message.values) {
+					apply_verification_values(frm, r.message.values);
+					frappe.msgprint(r.message.verified ? __("Aadhaar Number Verification Successfull") : __("Aadhaar Number Verification Failed"));
+				} else if (!r.exec && r.message.result) {
 					handle_aadhaar_verification_result(frm, r.message.result);
 				}
 			}
@@ -68,18 +74,17 @@ frappe.ui.form.on("Employee", {
 	
 		const args = {
 			front_url: frm.doc.custom_aadhar_card_front_image,
-			back_url: frm.doc.custom_aadhar_card_back_image
+			back_url: frm.doc.custom_aadhar_card_back_image,
+			...get_writeback_target(frm)
 		};
 	
-		frappe.call({
-			method: "lnder_signzy.signzy_api.verify_aadhaar_ocr",
-			args: args,
-			freeze: true,
-			freeze_message: __("Verifying Aadhaar OCR"),
-			callback: (r) => {
-				if (!r.exec && r.message.result) {
-					handle_aadhaar_ocr_verification_result(frm, r.message.result);
-				}
+		// OCR can take several seconds, so run it as a background job and wait for the realtime result
+		run_verification_in_background("lnder_signzy.signzy_api.verify_aadhaar_ocr", args, __("Verifying Aadhaar OCR in the background"), (result) => {
+			if (result.values) {
+				apply_verification_values(frm, result.values);
+				frappe.msgprint(result.verified ? __("Aadhaar Number Verified Successfully") : __("Aadhaar OCR Verification Failed"));
+			} else if (result.result) {
+				handle_aadhaar_ocr_verification_result(frm, result.result);
 			}
 		});
 	},
@@ -95,7 +100,8 @@ frappe.ui.form.on("Employee", {
 		const args = {
 			pan: frm.doc.custom_pan,
 			name: frm.doc.employee_name,
-			dob: frm.doc.date_of_birth
+			dob: frm.doc.date_of_birth,
+			...get_writeback_target(frm)
 		};
 	
 		frappe.call({
@@ -104,7 +110,10 @@ frappe.ui.form.on("Employee", {
 			freeze: true,
 			freeze_message: __("Verifying PAN Number"),
 			callback: (r) => {
-				if (!r.exec && r.message.result) {
+				if (!r.exec && r.message.values) {
+					apply_verification_values(frm, r.message.values);
+					frappe.msgprint(r.message.verified ? __("PAN Number Verified Successfully") : __("PAN Verification Failed"));
+				} else if (!r.exec && r.message.result) {
 					handle_pan_verification_result(frm, r.message.result);
 				}
 			}
@@ -118,13 +127,17 @@ function submit_otp(frm, country_code, mobile_no, reference_id, otp) {
 			country_code: country_code,
 			mobile_no: mobile_no,
 			reference_id: reference_id,
-			otp: otp
+			otp: otp,
+			...get_writeback_target(frm)
 		},
 		freeze: true,
 		freeze_message: __("Verifying OTP"),
 		callback: function (r) {
 			if (!r.exec) {
-				if (r.message.result) {
+				if (r.message.values) {
+					apply_verification_values(frm, r.message.values);
+					frappe.msgprint(r.message.verified ? __("Mobile Number Verified Successfully") : __("OTP Verification Failed"));
+				} else if (r.message.result) {
 					frm.set_value("custom_is_mobile_no_verified", 1);
 					frappe.msgprint(__("Mobile Number Verified Successfully"));
 				} else {
@@ -135,6 +148,100 @@ function submit_otp(frm, country_code, mobile_no, reference_id, otp) {
 	});
 }
 
+function verify_employee_kyc(frm) {
+	frappe.call({
+		method: "lnder_signzy.signzy_api.verify_employee_kyc",
+		args: {
+			employee: frm.doc.name
+		},
+		freeze: true,
+		freeze_message: __("Verifying KYC"),
+		callback: (r) => {
+			if (r.exec || !r.message) {
+				return;
+			}
+
+			const labels = {
+				pan: __("PAN"),
+				aadhaar: __("Aadhaar"),
+				aadhaar_ocr: __("Aadhaar OCR")
+			};
+			const lines = [];
+			for (const [key, label] of Object.entries(labels)) {
+				const check = r.message[key];
+				if (!check) {
+					continue;
+				}
+				if (check.status === "Success") {
+					apply_verification_values(frm, check.values);
+					lines.push(`${label}: ${check.verified ? __("Verified") : __("Verification Failed")}`);
+				} else {
+					lines.push(`${label}: ${check.error}`);
+				}
+			}
+
+			frappe.msgprint({
+				title: __("KYC Verification"),
+				message: lines.join("<br>")
+			});
+		}
+	});
+}
+
+function get_writeback_target(frm) {
+	// Saved documents get the result written server side; new ones apply it on save
+	return frm.is_new() ? {} : { doctype: frm.doc.doctype, docname: frm.doc.name };
+}
+
+function apply_verification_values(frm, values) {
+	// Already saved on the server, so update the form without marking it dirty
+	Object.assign(frm.doc, values);
+	frm.refresh_fields();
+}
+
+function run_verification_in_background(method, args, queued_message, callback) {
+	// Listen before queueing: a quick job can publish its result before the call returns the job id,
+	// so results arriving until then are held and matched once it is known
+	let job_id = null;
+	const early = [];
+	const handler = (data) => {
+		if (!job_id) {
+			early.push(data);
+			return;
+		}
+		if (data.job_id !== job_id) {
+			return;
+		}
+		frappe.realtime.off("signzy_verification", handler);
+
+		if (data.status === "Success") {
+			callback(data.result);
+		} else {
+			frappe.msgprint({
+				title: __("Signzy API Error"),
+				message: data.error,
+				indicator: "red"
+			});
+		}
+	};
+	frappe.realtime.on("signzy_verification", handler);
+
+	frappe.call({
+		method: method,
+		args: { ...args, run_in_background: 1 },
+		callback: (r) => {
+			if (!r.message || !r.message.job_id) {
+				frappe.realtime.off("signzy_verification", handler);
+				return;
+			}
+			frappe.show_alert({ message: queued_message, indicator: "blue" }, 5);
+			job_id = r.message.job_id;
+			early.splice(0).forEach(handler);
+		},
+		error: () => frappe.realtime.off("signzy_verification", handler)
+	});
+}
+
 function handle_aadhaar_verification_result(frm, result) {
 	if (result.verified === "true") {
 		frm.set_value("custom_is_aadhar_verified", 1)
@@ -0,0 +1,58 @@
+from frappe.custom.doctype.property_setter.property_setter import make_property_setter
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+def vehicle_field_customization():
+	create_vehicle_custom_field()
+	vehicle_property_setter()
+
+def create_vehicle_custom_field():
+	custom_fields = {
+		"Vehicle": [
+			dict(
+				fieldname="custom_rc_verified",
+				label="Is RC Verified",
+				fieldtype="Check",
+				insert_after="license_plate",
+				read_only=1
+			),
+			dict(
+				fieldname="custom_rc_blacklist_status",
+				label="RC Blacklist Status",
+				fieldtype="Data",
+				insert_after="custom_rc_verified",
+				read_only=1
+			),
+			dict(
+				fieldname="custom_rc_expiry_date",
+				label="RC Expiry Date",
+				fieldtype="Date",
+				insert_after="custom_rc_blacklist_status",
+				read_only=1
+			),
+			dict(
+				fieldname="custom_rc_last_checked_on",
+				label="RC Last Checked On",
+				fieldtype="Datetime",
+				insert_after="custom_rc_expiry_date",
+				read_only=1
+			),
+			dict(
+				fieldname="custom_rc_check_failures",
+				label="RC Check Failures",
+				fieldtype="Int",
+				insert_after="custom_rc_last_checked_on",
+				read_only=1
+			),
+			dict(
+				fieldname="custom_rc_last_attempted_on",
+				label="RC Last Attempted On",
+				fieldtype="Datetime",
+				insert_after="custom_rc_check_failures",
+				read_only=1
+			)
+		]
+	}
+	create_custom_fields(custom_fields, update=True)
+
+def vehicle_property_setter():
+	pass
@@ -138,23 +138,19 @@ after_migrate = "lnder_signzy.after_migrate.after_migrate"
 # Scheduled Tasks
 # ---------------
 
-# scheduler_events = {
-# 	"all": [
-# 		"lnder_signzy.tasks.all"
-# 	],
-# 	"daily": [
-# 		"lnder_signzy.tasks.daily"
-# 	],
-# 	"hourly": [
-# 		"lnder_signzy.tasks.hourly"
-# 	],
-# 	"weekly": [
-# 		"lnder_signzy.tasks.weekly"
-# 	],
-# 	"monthly": [
-# 		"lnder_signzy.tasks.monthly"
-# 	],
-# }
+scheduler_events = {
+	"hourly_long": [
+		"lnder_signzy.lnder_signzy.doctype.signzy_fleet_sweep.signzy_fleet_sweep.run_fleet_sweep"
+	],
+	"daily_long": [
+		"lnder_signzy.lnder_signzy.doctype.signzy_api_request_log.signzy_api_request_log.delete_older_logs"
+	],
+	"cron": {
+		"* * * * *": [
+			"lnder_signzy.lnder_signzy.doctype.signzy_api_request_log.signzy_api_request_log.flush_logs"
+		]
+	}
+}
 
 # Testing
 # -------
@@ -187,7 +183,7 @@ after_migrate = "lnder_signzy.after_migrate.after_migrate"
 # Request Events
 # ----------------
 # before_request = ["lnder_signzy.utils.before_request"]
-# after_request = ["lnder_signzy.utils.after_request"]
+after_request = ["lnder_signzy.signzy_timing.add_server_timing_header"]
 
 # Job Events
 # ----------
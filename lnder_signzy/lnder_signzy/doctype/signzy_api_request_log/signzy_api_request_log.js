@@ -1,8 +1,31 @@
 // Copyright (c) 2024, Aerele and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("Signzy API Request Log", {
-// 	refresh(frm) {
+frappe.ui.form.on("Signzy API Request Log", {
+	refresh(frm) {
+		const wrapper = frm.get_field("response_preview").$wrapper;
+		wrapper.empty();
+		if (frm.doc.response || !frm.doc.response_encoding) {
+			return;
+		}
 
-// 	},
-// });
+		// Responses are stored compressed, fetch the body only when the log is opened
+		frappe.call({
+			method: "lnder_signzy.lnder_signzy.doctype.signzy_api_request_log.signzy_api_request_log.get_response",
+			args: { name: frm.doc.name },
+			callback: (r) => {
+				if (r.exc || !r.message) {
+					return;
+				}
+				let body = r.message;
+				try {
+					body = JSON.stringify(JSON.parse(body), null, 4);
+				} catch (e) {
+					// not JSON, show it as received
+				}
+				$(`<label class="control-label">${__("Response")}</label>`).appendTo(wrapper);
+				$("<pre>").text(body).appendTo(wrapper);
+			}
+		});
+	},
+});
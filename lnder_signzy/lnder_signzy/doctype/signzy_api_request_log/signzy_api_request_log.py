@@ -2,57 +2,300 @@
 # For license information, please see license.txt
 
 
-import json
+import base64
+import contextlib
+import os
+import time
+import zlib
+
 import frappe
+import redis
 from frappe.model.document import Document
+from frappe.utils import add_days, cint, now, now_datetime
+
+from lnder_signzy import signzy_json
+from lnder_signzy.lnder_signzy.doctype.signzy_api_usage.signzy_api_usage import update_usage
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+from lnder_signzy.signzy_timing import TIMING_FIELDS
+
+# Log rows wait in this Redis list until they are flushed to the database in bulk
+LOG_BUFFER_KEY = "signzy_api_log_buffer"
+LOG_FLUSH_LOCK = "signzy_api_log_flush"
+LOG_FLUSH_LOCK_TIMEOUT = 300
+DEFAULT_LOG_BATCH_SIZE = 100
+# Batches one flush writes at most; the rest waits for the next run so a run never outlives its lock
+LOG_FLUSH_MAX_BATCHES = 20
+
+DEFAULT_LOG_RETENTION_DAYS = 1000
+LOG_PURGE_BATCH_SIZE = 5000
+
+LOG_FIELDS = (
+	"name", "creation", "modified", "owner", "modified_by", "api_method", "url", "header", "payload",
+	"status_code", "latency", "response_data", "response_encoding", "response_size", *TIMING_FIELDS
+)
+
+RESPONSE_ENCODING = "zlib+base64"
+DEFAULT_LOG_ATTACHMENT_THRESHOLD = 64
 
 
 class SignzyAPIRequestLog(Document):
 	pass
 
-def create_log(api_name, api_endpoint, api_request_header=None, api_request_data=None, api_response=None, api_response_status_code=None):
-	log_doc = frappe.new_doc("Signzy API Request Log")
-	log_doc.api_method = api_name
-	log_doc.url = api_endpoint
+def create_log(api_name, api_endpoint, api_request_header=None, api_request_data=None, api_response=None, api_response_status_code=None, latency=None, timings=None):
+	"""
+	Buffers a Signzy API Request Log entry in Redis; rows are written to the database by `flush_logs`.
+
+	Pushing to Redis keeps database inserts and commits out of the verification request. Rows
+	carry their final name from the start, so a flush that is retried after a crash does not
+	insert duplicates. The response body is stored as received, zlib compressed, and is only
+	decompressed when the log is opened. Each intermediate copy of the body is dropped as soon
+	as the next one is made, so a large response is not held several times over.
 
+	`timings` holds the per-phase milliseconds of a sampled call, as `PhaseTimer.get_log_fields`
+	returns them; the time spent building this entry is added as its log phase.
+	"""
+	building_started_at = time.perf_counter()
+	log = frappe._dict(
+		name=frappe.generate_hash(length=10),
+		creation=now(),
+		owner=frappe.session.user,
+		api_method=api_name,
+		url=api_endpoint,
+		status_code=api_response_status_code,
+		latency=round(latency, 6) if latency is not None else None
+	)
+	log.modified, log.modified_by = log.creation, log.owner
+
+	# Strings are the exact bytes that went over the wire and are stored as they are
 	if api_request_header:
-		if isinstance(api_request_header, str):
-			try:
-				api_request_header = json.loads(api_request_header)
-			except json.JSONDecodeError:
-				log_doc.header = api_request_header
 		if isinstance(api_request_header, dict):
-			log_doc.header = json.dumps(api_request_header, indent=4)
+			api_request_header = signzy_json.dumps(api_request_header)
+		log.header = api_request_header
 
 	if api_request_data:
-		if isinstance(api_request_data, str):
-			try:
-				api_request_data = json.loads(api_request_data)
-			except json.JSONDecodeError:
-				log_doc.payload = api_request_data
 		if isinstance(api_request_data, dict):
-			log_doc.payload = json.dumps(api_request_data, indent=4)
+			api_request_data = signzy_json.dumps(api_request_data)
+		log.payload = api_request_data
 
 	if api_response:
+		if isinstance(api_response, dict):
+			api_response = signzy_json.dumps(api_response)
+		elif not isinstance(api_response, (str, bytes)):
+			api_response = getattr(api_response, "content", None) or str(api_response)
 		if isinstance(api_response, str):
-			try:
-				log_doc.response = json.dumps(json.loads(api_response), indent=4)
-			except json.JSONDecodeError:
-				log_doc.response = api_response
-		elif isinstance(api_response, dict):
-			log_doc.response = json.dumps(api_response, indent=4)
-		elif not isinstance(api_response, (str, dict)):
-			try:
-				log_doc.response = json.dumps(api_response.json(), indent=4)
-			except (TypeError, ValueError):
-				log_doc.response = str(api_response)
-	log_doc.status_code = api_response_status_code
-	log_doc.insert(ignore_permissions=True)
-	frappe.db.commit()
- 
+			api_response = api_response.encode()
+
+		log.response_size = len(api_response)
+		compressed, api_response = zlib.compress(api_response), None
+		# What `flush_logs` compares with the attachment threshold, as the file holds these bytes
+		log.compressed_size = len(compressed)
+		log.response_data, compressed = base64.b64encode(compressed).decode(), None
+		log.response_encoding = RESPONSE_ENCODING
+
+	if timings:
+		log.update(timings)
+		log.time_log = round((time.perf_counter() - building_started_at) * 1000, 3)
+
+	entry, log = signzy_json.dumps(log, default=str), None
+
+	# The wrapper's rpush does not return the list length, which decides when to flush
+	cache = frappe.cache()
+	buffered = redis.Redis.rpush(cache, cache.make_key(LOG_BUFFER_KEY), entry)
+
+	if buffered >= get_log_batch_size():
+		frappe.enqueue(
+			"lnder_signzy.lnder_signzy.doctype.signzy_api_request_log.signzy_api_request_log.flush_logs",
+			queue="short",
+			job_id=LOG_FLUSH_LOCK,
+			deduplicate=True
+		)
+
+
+def get_log_batch_size():
+	return cint(get_connector_config().log_batch_size) or DEFAULT_LOG_BATCH_SIZE
+
+
+def flush_logs():
+	"""
+	Writes buffered log entries to the database as multi-row inserts.
+
+	Runs every minute from the scheduler and whenever the buffer reaches the batch size, writing
+	up to LOG_FLUSH_MAX_BATCHES batches. Entries are only trimmed from Redis after their batch has
+	been committed, so a worker dying mid-flush leaves them in place for the next run. The lock is
+	renewed before each trim; a flush that lost it to another stops without trimming anything.
+	"""
+	cache = frappe.cache()
+	batch_size = get_log_batch_size()
+	attachment_threshold = (cint(get_connector_config().log_attachment_threshold) or DEFAULT_LOG_ATTACHMENT_THRESHOLD) * 1024
+
+	lock = cache.lock(cache.make_key(LOG_FLUSH_LOCK), timeout=LOG_FLUSH_LOCK_TIMEOUT)
+	if not lock.acquire(blocking=False):
+		return
+
+	try:
+		for __ in range(LOG_FLUSH_MAX_BATCHES):
+			entries = cache.lrange(LOG_BUFFER_KEY, 0, batch_size - 1)
+			if not entries:
+				break
+
+			rows = [signzy_json.loads(entry) for entry in entries]
+			attachments = [row for row in rows if (row.pop("compressed_size", None) or 0) > attachment_threshold]
+
+			# Rows already inserted by an interrupted flush were already counted in the rollups
+			existing = set(frappe.get_all("Signzy API Request Log", filters={"name": ("in", [row["name"] for row in rows])}, pluck="name"))
+			update_usage([row for row in rows if row["name"] not in existing])
+
+			# Large responses are committed inline first and only then moved to files, so a
+			# rollback never leaves a written file without its row
+			frappe.db.bulk_insert(
+				"Signzy API Request Log",
+				fields=LOG_FIELDS,
+				values=[tuple(row.get(field) for field in LOG_FIELDS) for row in rows],
+				ignore_duplicates=True
+			)
+			frappe.db.commit()
+
+			lock.reacquire()
+			cache.ltrim(LOG_BUFFER_KEY, len(entries), -1)
+
+			for row in attachments:
+				attach_response(row["name"], row["response_data"])
+
+			if len(entries) < batch_size:
+				break
+	except redis.exceptions.LockNotOwnedError:
+		# Held past its timeout and taken over, the other flush writes and trims these entries
+		pass
+	finally:
+		with contextlib.suppress(redis.exceptions.LockNotOwnedError):
+			lock.release()
+
+
+def attach_response(log_name: str, response_data: str):
+	"""
+	Moves a large compressed response out of the log table into a private file attachment.
+
+	The log row keeps the response inline until the file is committed with it; a file written
+	by a failed attempt is removed again.
+	"""
+	if frappe.db.exists("File", {"attached_to_doctype": "Signzy API Request Log", "attached_to_name": log_name}):
+		return
+
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": f"{log_name}-response.zlib",
+		"attached_to_doctype": "Signzy API Request Log",
+		"attached_to_name": log_name,
+		"attached_to_field": "response_file",
+		"is_private": 1,
+		"content": base64.b64decode(response_data)
+	})
+	try:
+		file_doc.insert(ignore_permissions=True)
+		frappe.db.set_value(
+			"Signzy API Request Log", log_name, {"response_file": file_doc.file_url, "response_data": None}, update_modified=False
+		)
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		remove_orphaned_file(file_doc.file_url)
+		frappe.log_error(title="Signzy API Request Log Attachment Failed")
+		frappe.db.commit()
+
+
+def remove_orphaned_file(file_url: str | None):
+	"""Deletes a file written for a File record that was rolled back, unless another record uses it."""
+	if not file_url or frappe.db.exists("File", {"file_url": file_url}):
+		return
+
+	folder = ("private", "files") if file_url.startswith("/private/") else ("public", "files")
+	with contextlib.suppress(FileNotFoundError):
+		os.remove(frappe.get_site_path(*folder, file_url.rsplit("/", 1)[-1]))
+
+
+@frappe.whitelist()
+def get_response(name: str) -> str | None:
+	"""
+	Returns the decompressed response body of a log entry for display on its form.
+
+	Args:
+		name (str): The Signzy API Request Log name.
+	"""
+	log = frappe.get_doc("Signzy API Request Log", name)
+	log.check_permission("read")
+
+	if log.response_encoding != RESPONSE_ENCODING:
+		return log.response
+
+	if log.response_file:
+		compressed = frappe.get_doc("File", {"file_url": log.response_file}).get_content()
+	else:
+		compressed = base64.b64decode(log.response_data or "")
+
+	return zlib.decompress(compressed).decode(errors="replace") if compressed else None
+
+
 def delete_older_logs():
-	frappe.db.sql(
-			""" DELETE FROM `tabSignzy API Request Log`
-			WHERE `creation` < (NOW() - INTERVAL '1000' DAY)
-		"""
-		)
\ No newline at end of file
+	"""
+	Deletes log entries past their retention, in bounded primary key batches.
+
+	Retention comes from the connector's Log Retention Days and can be set per API
+	in API Settings. Each batch is committed on its own so the table is never locked
+	for long, and the run's row count and duration are stored on the connector.
+	"""
+	config = get_connector_config()
+	started_at = time.monotonic()
+
+	retention = {
+		row.api_method: cint(row.log_retention_days)
+		for row in config.api_settings
+		if cint(row.log_retention_days)
+	}
+
+	deleted = 0
+	for api_method, days in retention.items():
+		deleted += _delete_logs_before(add_days(now_datetime(), -days), "and `api_method` = %(api_method)s", {"api_method": api_method})
+
+	condition, values = "", {}
+	if retention:
+		condition = "and (`api_method` is null or `api_method` not in %(api_methods)s)"
+		values = {"api_methods": tuple(retention)}
+
+	default_days = cint(config.log_retention_days) or DEFAULT_LOG_RETENTION_DAYS
+	deleted += _delete_logs_before(add_days(now_datetime(), -default_days), condition, values)
+
+	frappe.db.set_single_value("Signzy Connector", {
+		"last_purge_on": now(),
+		"last_purge_deleted": deleted,
+		"last_purge_duration": round(time.monotonic() - started_at, 3)
+	})
+	frappe.db.commit()
+
+
+def _delete_logs_before(cutoff, condition: str, values: dict) -> int:
+	deleted = 0
+	while True:
+		names = frappe.db.sql_list(
+			f""" SELECT `name` FROM `tabSignzy API Request Log`
+			WHERE `creation` < %(cutoff)s {condition}
+			ORDER BY `creation`
+			LIMIT {LOG_PURGE_BATCH_SIZE}
+		""",
+			{"cutoff": cutoff, **values}
+		)
+		if not names:
+			return deleted
+
+		for file_name in frappe.get_all(
+			"File", filters={"attached_to_doctype": "Signzy API Request Log", "attached_to_name": ("in", names)}, pluck="name"
+		):
+			frappe.delete_doc("File", file_name, ignore_permissions=True)
+
+		frappe.db.delete("Signzy API Request Log", {"name": ("in", names)})
+		frappe.db.commit()
+		deleted += len(names)
+
+
+def on_doctype_update():
+	frappe.db.add_index("Signzy API Request Log", ["creation"])
+	frappe.db.add_index("Signzy API Request Log", ["api_method", "creation"])
@@ -1,9 +1,143 @@
 # Copyright (c) 2024, Aerele and Contributors
 # See license.txt
 
-# import frappe
+import os
+from unittest.mock import patch
+
+import frappe
+import redis
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, now_datetime, today
+
+from lnder_signzy.lnder_signzy.doctype.signzy_api_request_log import signzy_api_request_log
+from lnder_signzy.lnder_signzy.doctype.signzy_api_request_log.signzy_api_request_log import (
+	create_log,
+	delete_older_logs,
+	flush_logs,
+	get_response,
+)
+from lnder_signzy.signzy_timing import PhaseTimer
 
 
 class TestSignzyAPIRequestLog(FrappeTestCase):
-	pass
+	def test_buffered_log_is_written_on_flush(self):
+		create_log(
+			api_name="Verify PAN",
+			api_endpoint="https://signzy.test/pan/verify",
+			api_request_data='{"pan": "ABCDE1234F"}',
+			api_response='{"result": {"panStatus": "E"}}',
+			api_response_status_code=200
+		)
+		flush_logs()
+
+		log = frappe.get_last_doc("Signzy API Request Log", filters={"url": "https://signzy.test/pan/verify"})
+		self.assertEqual(log.api_method, "Verify PAN")
+		self.assertEqual(log.status_code, "200")
+		self.assertFalse(log.response)
+		self.assertEqual(get_response(log.name), '{"result": {"panStatus": "E"}}')
+
+	def test_flush_is_idempotent(self):
+		flush_logs()
+		flush_logs()
+		self.assertFalse(frappe.cache().llen("signzy_api_log_buffer"))
+
+	def test_flush_updates_daily_usage(self):
+		name = f"{today()}|Verify Bank Account|5xx"
+		calls = frappe.db.get_value("Signzy API Usage", name, "calls") or 0
+
+		for _ in range(2):
+			create_log(
+				api_name="Verify Bank Account",
+				api_endpoint="https://signzy.test/bankaccountverifications/advancedverification",
+				api_response=b'{"error": {"message": "Service Unavailable"}}',
+				api_response_status_code=503,
+				latency=0.25
+			)
+		flush_logs()
+
+		usage = frappe.get_doc("Signzy API Usage", name)
+		self.assertEqual(usage.calls, calls + 2)
+		self.assertGreaterEqual(usage.latency_sum, 0.5)
+
+	def test_responses_are_attached_by_compressed_size(self):
+		responses = {"https://signzy.test/compressible": b"a" * 8192, "https://signzy.test/random": os.urandom(4096)}
+		for url, response in responses.items():
+			create_log(api_name="Verify Aadhaar - OCR", api_endpoint=url, api_response=response, api_response_status_code=200)
+
+		# A 1 KB threshold, which the compressible response only exceeds before compression
+		config = frappe._dict(log_attachment_threshold=1)
+		with patch.object(signzy_api_request_log, "get_connector_config", return_value=config):
+			flush_logs()
+
+		compressible = frappe.get_last_doc("Signzy API Request Log", filters={"url": "https://signzy.test/compressible"})
+		random = frappe.get_last_doc("Signzy API Request Log", filters={"url": "https://signzy.test/random"})
+		self.assertEqual((bool(compressible.response_file), bool(random.response_file)), (False, True))
+		self.assertEqual((compressible.response_size, random.response_size), (8192, 4096))
+		self.assertEqual(get_response(compressible.name), "a" * 8192)
+
+	def test_flush_that_lost_its_lock_does_not_trim(self):
+		flush_logs()
+		create_log(api_name="Verify PAN", api_endpoint="https://signzy.test/lock-lost", api_response_status_code=200)
+
+		with patch.object(redis.lock.Lock, "reacquire", side_effect=redis.exceptions.LockNotOwnedError("Lock expired")):
+			flush_logs()
+
+		self.assertTrue(frappe.db.exists("Signzy API Request Log", {"url": "https://signzy.test/lock-lost"}))
+		self.assertEqual(frappe.cache().llen("signzy_api_log_buffer"), 1)
+
+		# The next flush finds the row already written and only trims it
+		flush_logs()
+		self.assertEqual(frappe.db.count("Signzy API Request Log", {"url": "https://signzy.test/lock-lost"}), 1)
+		self.assertFalse(frappe.cache().llen("signzy_api_log_buffer"))
+
+	def test_failed_attachment_keeps_the_response_inline(self):
+		response = os.urandom(4096)
+		create_log(api_name="Verify Aadhaar - OCR", api_endpoint="https://signzy.test/attach-fails", api_response=response)
+
+		config = frappe._dict(log_attachment_threshold=1)
+		with patch.object(signzy_api_request_log, "get_connector_config", return_value=config), patch.object(
+			frappe.db, "set_value", side_effect=OSError("Disk full")
+		):
+			flush_logs()
+
+		log = frappe.get_last_doc("Signzy API Request Log", filters={"url": "https://signzy.test/attach-fails"})
+		self.assertFalse(log.response_file)
+		self.assertTrue(log.response_data)
+		self.assertFalse(frappe.db.exists("File", {"attached_to_name": log.name}))
+		self.assertFalse(os.path.exists(frappe.get_site_path("private", "files", f"{log.name}-response.zlib")))
+
+	def test_sampled_phase_timings_are_logged(self):
+		timer = PhaseTimer()
+		timer.sampled = True
+		timer.add("upstream", 0.2)
+		timer.add("parse", 0.001)
+
+		create_log(
+			api_name="Verify UPI",
+			api_endpoint="https://signzy.test/vpa/verify",
+			api_response='{"result": {"verified": "true"}}',
+			api_response_status_code=200,
+			timings=timer.get_log_fields()
+		)
+		flush_logs()
+
+		log = frappe.get_last_doc("Signzy API Request Log", filters={"url": "https://signzy.test/vpa/verify"})
+		self.assertEqual(log.time_upstream, 200)
+		self.assertEqual(log.time_parse, 1)
+		self.assertIsNotNone(log.time_log)
+
+		timer.sampled = False
+		self.assertIsNone(timer.get_log_fields())
+
+	def test_logs_past_retention_are_deleted(self):
+		old_log = frappe.get_doc({"doctype": "Signzy API Request Log", "api_method": "Verify UPI"}).insert()
+		recent_log = frappe.get_doc({"doctype": "Signzy API Request Log", "api_method": "Verify UPI"}).insert()
+		frappe.db.set_value(
+			"Signzy API Request Log", old_log.name, "creation", add_days(now_datetime(), -2000), update_modified=False
+		)
+
+		delete_older_logs()
+
+		self.assertFalse(frappe.db.exists("Signzy API Request Log", old_log.name))
+		self.assertTrue(frappe.db.exists("Signzy API Request Log", recent_log.name))
+		self.assertGreaterEqual(frappe.db.get_single_value("Signzy Connector", "last_purge_deleted"), 1)
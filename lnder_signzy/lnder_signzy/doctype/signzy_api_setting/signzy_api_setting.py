@@ -0,0 +1,23 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+# Every Signzy API the app calls, as named in API Settings and the request log
+API_METHODS = (
+	"Verify Aadhaar",
+	"Verify Aadhaar - OCR",
+	"Generate OTP",
+	"Submit OTP",
+	"Verify Driving License",
+	"Verify Driving License Details",
+	"Verify PAN",
+	"Verify UPI",
+	"Verify Bank Account",
+	"Verify Vehicle RC",
+)
+
+
+class SignzyAPISetting(Document):
+	pass
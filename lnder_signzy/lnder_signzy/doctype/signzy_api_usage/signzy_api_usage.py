@@ -0,0 +1,71 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, flt, now
+
+
+class SignzyAPIUsage(Document):
+	pass
+
+
+def get_status_class(status_code) -> str:
+	"""Returns "2xx", "4xx", "5xx" etc. for a status code, or "Error" when there was no response."""
+	status_code = cint(status_code)
+	return f"{status_code // 100}xx" if status_code else "Error"
+
+
+def update_usage(rows: list):
+	"""
+	Adds request log rows to the daily usage totals, in the caller's transaction.
+
+	Rows are summed per day, API and status class first, so a flushed batch costs one
+	upsert per group rather than per row.
+
+	Args:
+		rows (list): Request log rows as buffered by `create_log`.
+	"""
+	totals = {}
+	for row in rows:
+		key = (str(row.get("creation"))[:10], row.get("api_method") or "", get_status_class(row.get("status_code")))
+		total = totals.setdefault(key, [0, 0.0, 0])
+		total[0] += 1
+		total[1] += flt(row.get("latency"))
+		if row.get("status_code"):
+			total[2] += cint(row.get("response_size"))
+
+	if not totals:
+		return
+
+	timestamp, user = now(), frappe.session.user
+	values = [
+		(f"{date}|{api_method}|{status_class}", timestamp, timestamp, user, user, date, api_method, status_class, *total)
+		for (date, api_method, status_class), total in totals.items()
+	]
+
+	if frappe.db.db_type == "postgres":
+		on_conflict = """ON CONFLICT (name) DO UPDATE SET
+			calls = `tabSignzy API Usage`.calls + EXCLUDED.calls,
+			latency_sum = `tabSignzy API Usage`.latency_sum + EXCLUDED.latency_sum,
+			response_bytes = `tabSignzy API Usage`.response_bytes + EXCLUDED.response_bytes,
+			modified = EXCLUDED.modified"""
+	else:
+		on_conflict = """ON DUPLICATE KEY UPDATE
+			`calls` = `calls` + VALUES(`calls`),
+			`latency_sum` = `latency_sum` + VALUES(`latency_sum`),
+			`response_bytes` = `response_bytes` + VALUES(`response_bytes`),
+			`modified` = VALUES(`modified`)"""
+
+	frappe.db.sql(
+		f""" INSERT INTO `tabSignzy API Usage`
+		(`name`, `creation`, `modified`, `owner`, `modified_by`, `date`, `api_method`, `status_class`, `calls`, `latency_sum`, `response_bytes`)
+		VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(values))}
+		{on_conflict}
+	""",
+		[value for row in values for value in row]
+	)
+
+
+def on_doctype_update():
+	frappe.db.add_index("Signzy API Usage", ["date", "api_method"])
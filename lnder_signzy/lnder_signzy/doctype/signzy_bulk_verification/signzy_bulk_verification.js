@@ -0,0 +1,23 @@
+// Copyright (c) 2024, Aerele and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("Signzy Bulk Verification", {
+	setup(frm) {
+		frappe.realtime.on("signzy_bulk_verification_progress", (data) => {
+			if (data.name === frm.doc.name) {
+				frm.reload_doc();
+			}
+		});
+	},
+
+	refresh(frm) {
+		if (frm.is_new() || ["Queued", "Running", "Completed"].includes(frm.doc.status)) {
+			return;
+		}
+
+		const label = frm.doc.rows_processed ? __("Resume") : __("Start");
+		frm.add_custom_button(label, () => {
+			frm.call("start").then(() => frm.reload_doc());
+		}).addClass("btn-primary");
+	},
+});
@@ -0,0 +1,233 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import asyncio
+import csv
+import io
+from itertools import islice
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import cint, now
+from frappe.utils.background_jobs import is_job_enqueued
+
+from lnder_signzy import signzy_writeback
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+from lnder_signzy.signzy_async import AsyncSignzyClient
+
+# Endpoint, required columns and optional columns of each verification type
+VERIFICATIONS = {
+	"Bank Account": ("verify_bank_acc", ("acc_no", "ifsc_code", "mobile_no", "name"), ("email",)),
+	"UPI": ("verify_upi", ("vpa", "name"), ()),
+}
+# The column identifying the Bank Account of each verification type, and its Bank Account field
+BANK_ACCOUNT_KEYS = {
+	"Bank Account": ("acc_no", "bank_account_no"),
+	"UPI": ("vpa", "custom_upi_id"),
+}
+RESULT_COLUMNS = ("status", "verified", "error")
+
+DEFAULT_CONCURRENCY = 8
+# Rows read from the source file per checkpoint, per unit of concurrency
+ROWS_PER_WORKER = 4
+# Rows queue behind the rate limit instead of failing
+RATE_LIMIT_WAIT = 60
+
+PROGRESS_EVENT = "signzy_bulk_verification_progress"
+
+
+class SignzyBulkVerification(Document):
+	def validate(self):
+		if self.source_file and not self.source_file.lower().endswith(".csv"):
+			frappe.throw(_("Source File must be a CSV file"))
+
+	@frappe.whitelist()
+	def start(self):
+		"""Queues the verification, or resumes it from its checkpoint after a failure."""
+		self.check_permission("write")
+		if self.status == "Completed":
+			frappe.throw(_("This verification has already completed"))
+		if is_job_enqueued(self.get_job_id()):
+			frappe.throw(_("This verification is already queued or running"))
+
+		self.db_set({"status": "Queued", "error": None})
+		frappe.enqueue(
+			"lnder_signzy.lnder_signzy.doctype.signzy_bulk_verification.signzy_bulk_verification.run_bulk_verification",
+			queue="long",
+			timeout=24 * 60 * 60,
+			job_id=self.get_job_id(),
+			deduplicate=True,
+			name=self.name
+		)
+
+	def get_job_id(self) -> str:
+		return f"signzy_bulk_verification|{self.name}"
+
+	def process(self):
+		"""
+		Streams the source CSV through the asyncio engine a chunk at a time.
+
+		Only one chunk is held in memory. After each chunk its result rows are appended to the
+		result file, Bank Accounts are updated, and the checkpoint and result file offset are
+		committed together. On resume the result file is cut back to the committed offset, so
+		rows of a chunk that was interrupted are neither lost nor written twice.
+		"""
+		config = get_connector_config()
+		endpoint_name, required, optional = VERIFICATIONS[self.verification_type]
+		concurrency = cint(config.bulk_concurrency) or DEFAULT_CONCURRENCY
+
+		source_path = frappe.get_doc("File", {"file_url": self.source_file}).get_full_path()
+		with open(source_path, newline="", encoding="utf-8-sig") as source:
+			reader = csv.DictReader(source)
+			missing = [column for column in required if column not in (reader.fieldnames or [])]
+			if missing:
+				frappe.throw(_("Source File is missing the columns: {0}").format(", ".join(missing)))
+
+			result_path = self.get_result_path(reader.fieldnames)
+			with open(result_path, "r+b") as result:
+				result.truncate(self.result_offset)
+				result.seek(self.result_offset)
+
+				rows = islice(reader, self.rows_processed, None)
+				asyncio.run(self.verify_rows(rows, reader.fieldnames, result, endpoint_name, required + optional, concurrency))
+
+		self.db_set({"status": "Completed", "completed_on": now()})
+		frappe.db.commit()
+		self.publish_progress()
+
+	async def verify_rows(self, rows, source_columns: list, result, endpoint_name: str, columns: tuple, concurrency: int):
+		async with AsyncSignzyClient(concurrency, RATE_LIMIT_WAIT) as client:
+			while chunk := list(islice(rows, concurrency * ROWS_PER_WORKER)):
+				outcomes = await asyncio.gather(*(self.verify_row(client, endpoint_name, columns, row) for row in chunk))
+
+				output = io.StringIO()
+				writer = csv.writer(output)
+				succeeded = 0
+				for row, (status, verified, error) in zip(chunk, outcomes):
+					writer.writerow([*(row.get(column) for column in source_columns), status, verified, error])
+					succeeded += verified
+				result.write(output.getvalue().encode())
+				result.flush()
+
+				self.db_set({
+					"rows_processed": self.rows_processed + len(chunk),
+					"succeeded": self.succeeded + succeeded,
+					"failed": self.failed + len(chunk) - succeeded,
+					"result_offset": result.tell()
+				})
+				frappe.db.commit()
+				self.publish_progress()
+
+	async def verify_row(self, client: AsyncSignzyClient, endpoint_name: str, columns: tuple, row: dict) -> tuple:
+		"""
+		Verifies one row and updates its Bank Account. Returns (status, verified, error).
+
+		A row naming a Bank Account whose account number or UPI ID is not the one in the row is
+		Skipped without a call, so a result is never saved on an account it was not made for.
+		"""
+		kwargs = {column: (row.get(column) or "").strip() for column in columns if (row.get(column) or "").strip()}
+		missing = [column for column in VERIFICATIONS[self.verification_type][1] if column not in kwargs]
+		if missing:
+			return "Failed", 0, _("Missing {0}").format(", ".join(missing))
+
+		bank_account = None
+		if self.update_bank_accounts:
+			bank_account, error = self.get_bank_account(row, kwargs)
+			if error:
+				return "Skipped", 0, error
+
+		try:
+			response = await client.call(endpoint_name, **kwargs)
+		except frappe.ValidationError as e:
+			frappe.clear_last_message()
+			return "Failed", 0, str(e)
+		except Exception as e:
+			frappe.log_error(title=_("Signzy Bulk Verification Failed"), reference_doctype=self.doctype, reference_name=self.name)
+			return "Failed", 0, str(e)
+
+		result = response.get("result") or {}
+		if self.verification_type == "Bank Account":
+			verified = signzy_writeback.is_bank_account_verified(result)
+		else:
+			verified = signzy_writeback.is_upi_verified(result)
+
+		if bank_account:
+			if self.verification_type == "Bank Account":
+				signzy_writeback.update_bank_account(bank_account, result)
+			else:
+				signzy_writeback.update_bank_account_upi(bank_account, result)
+
+		return "Success", int(verified), ""
+
+	def get_bank_account(self, row: dict, kwargs: dict) -> tuple:
+		"""
+		Returns the Bank Account a row's result is saved on, if any, and an error when the row's
+		bank_account column names an account with a different account number or UPI ID.
+		"""
+		key, field = BANK_ACCOUNT_KEYS[self.verification_type]
+		bank_account = (row.get("bank_account") or "").strip()
+		if not bank_account:
+			return frappe.db.get_value("Bank Account", {field: kwargs[key]}), None
+
+		if not signzy_writeback.matches(kwargs[key], frappe.db.get_value("Bank Account", bank_account, field)):
+			return None, _("The {0} does not match Bank Account {1}").format(frappe.unscrub(key), bank_account)
+
+		return bank_account, None
+
+	def get_result_path(self, source_columns: list) -> str:
+		"""Returns the path of the result file, creating it with its header row on the first run."""
+		if not self.result_file:
+			output = io.StringIO()
+			csv.writer(output).writerow([*source_columns, *RESULT_COLUMNS])
+			header = output.getvalue().encode()
+
+			# Written directly rather than through File content, which would share the file on
+			# disk with any other file of the same content, such as another result header
+			file_name = f"{self.name}-result.csv"
+			with open(frappe.get_site_path("private", "files", file_name), "wb") as result:
+				result.write(header)
+
+			file_doc = frappe.get_doc({
+				"doctype": "File",
+				"file_name": file_name,
+				"file_url": f"/private/files/{file_name}",
+				"attached_to_doctype": self.doctype,
+				"attached_to_name": self.name,
+				"attached_to_field": "result_file",
+				"is_private": 1
+			}).insert(ignore_permissions=True)
+
+			self.db_set({"result_file": file_doc.file_url, "result_offset": len(header)})
+			frappe.db.commit()
+
+		return frappe.get_site_path(self.result_file.lstrip("/"))
+
+	def publish_progress(self):
+		frappe.publish_realtime(
+			PROGRESS_EVENT,
+			{
+				"name": self.name,
+				"status": self.status,
+				"rows_processed": self.rows_processed,
+				"succeeded": self.succeeded,
+				"failed": self.failed
+			},
+			doctype=self.doctype,
+			docname=self.name
+		)
+
+
+def run_bulk_verification(name: str):
+	doc = frappe.get_doc("Signzy Bulk Verification", name)
+	doc.db_set({"status": "Running", "started_on": doc.started_on or now()})
+	frappe.db.commit()
+
+	try:
+		doc.process()
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(title=_("Signzy Bulk Verification Failed"), reference_doctype=doc.doctype, reference_name=doc.name)
+		doc.db_set({"status": "Failed", "error": frappe.get_traceback()})
+		frappe.db.commit()
+		doc.publish_progress()
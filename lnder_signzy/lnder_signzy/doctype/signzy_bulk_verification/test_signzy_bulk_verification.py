@@ -0,0 +1,83 @@
+# Copyright (c) 2024, Aerele and Contributors
+# See license.txt
+
+import csv
+import io
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from lnder_signzy.benchmarks.mock_signzy import MockSignzyServer, use_mock_connector
+from lnder_signzy.lnder_signzy.doctype.signzy_bulk_verification.signzy_bulk_verification import run_bulk_verification
+
+
+class TestSignzyBulkVerification(FrappeTestCase):
+	def test_csv_is_verified_and_resumed_from_checkpoint(self):
+		source = frappe.get_doc({
+			"doctype": "File",
+			"file_name": "signzy-bulk-upi.csv",
+			"is_private": 1,
+			"content": "vpa,name\ntest@upi,Test User\n,Missing VPA\nother@upi,Other User\n"
+		}).insert(ignore_permissions=True)
+
+		doc = frappe.get_doc({
+			"doctype": "Signzy Bulk Verification",
+			"verification_type": "UPI",
+			"source_file": source.file_url,
+			"update_bank_accounts": 0
+		}).insert()
+
+		with MockSignzyServer() as server, use_mock_connector(server.url):
+			run_bulk_verification(doc.name)
+
+			doc.reload()
+			self.assertEqual(doc.status, "Completed")
+			self.assertEqual((doc.rows_processed, doc.succeeded, doc.failed), (3, 2, 1))
+			self.assertEqual(server.request_count, 2)
+
+			# A second run after completion has nothing left to do
+			run_bulk_verification(doc.name)
+			self.assertEqual(server.request_count, 2)
+
+		content = frappe.get_doc("File", {"file_url": doc.result_file}).get_content()
+		rows = list(csv.DictReader(io.StringIO(content.decode() if isinstance(content, bytes) else content)))
+		self.assertEqual([row["status"] for row in rows], ["Success", "Failed", "Success"])
+
+	def test_results_are_only_saved_on_matching_bank_accounts(self):
+		owner, other = make_bank_account("owner@upi"), make_bank_account("someone@upi")
+		source = frappe.get_doc({
+			"doctype": "File",
+			"file_name": "signzy-bulk-upi-accounts.csv",
+			"is_private": 1,
+			"content": f"vpa,name,bank_account\nowner@upi,Test User,{owner}\nowner@upi,Test User,{other}\n"
+		}).insert(ignore_permissions=True)
+
+		doc = frappe.get_doc({
+			"doctype": "Signzy Bulk Verification",
+			"verification_type": "UPI",
+			"source_file": source.file_url,
+			"update_bank_accounts": 1
+		}).insert()
+
+		with MockSignzyServer() as server, use_mock_connector(server.url):
+			run_bulk_verification(doc.name)
+
+		content = frappe.get_doc("File", {"file_url": frappe.db.get_value(doc.doctype, doc.name, "result_file")}).get_content()
+		rows = list(csv.DictReader(io.StringIO(content.decode() if isinstance(content, bytes) else content)))
+		self.assertEqual([row["status"] for row in rows], ["Success", "Skipped"])
+		self.assertEqual(server.request_count, 1)
+		self.assertEqual(frappe.db.get_value("Bank Account", owner, "custom_is_upi_verified"), 1)
+		self.assertFalse(frappe.db.get_value("Bank Account", other, "custom_is_upi_verified"))
+
+
+def make_bank_account(upi_id: str) -> str:
+	"""Inserts a Bank Account with a UPI ID and returns its name."""
+	if not frappe.db.exists("Bank", "Signzy Test Bank"):
+		frappe.get_doc({"doctype": "Bank", "bank_name": "Signzy Test Bank"}).insert()
+
+	return frappe.get_doc({
+		"doctype": "Bank Account",
+		"account_name": f"Signzy Test {frappe.generate_hash(length=6)}",
+		"bank": "Signzy Test Bank",
+		"custom_upi_id": upi_id
+	}).insert(ignore_mandatory=True).name
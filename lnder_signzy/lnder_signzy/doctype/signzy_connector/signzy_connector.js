@@ -1,8 +1,173 @@
 // Copyright (c) 2024, Aerele and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("Signzy Connector", {
-// 	refresh(frm) {
+frappe.ui.form.on("Signzy Connector", {
+	refresh(frm) {
+		frm.add_custom_button(__("Cache Stats"), () => {
+			frappe.call({
+				method: "lnder_signzy.signzy_cache.get_result_cache_stats",
+				callback: (r) => {
+					if (!r.exc && r.message) {
+						show_result_cache_stats(r.message);
+					}
+				}
+			});
+		}, __("Result Cache"));
 
-// 	},
-// });
+		frm.add_custom_button(__("Clear"), () => {
+			frappe.confirm(__("Clear all cached Signzy results?"), () => {
+				frappe.call({
+					method: "lnder_signzy.signzy_cache.clear_result_cache",
+					callback: (r) => {
+						if (!r.exc) {
+							frappe.show_alert({
+								message: __("Result cache cleared"),
+								indicator: "green"
+							}, 5);
+						}
+					}
+				});
+			});
+		}, __("Result Cache"));
+
+		frm.add_custom_button(__("Reset Circuit Breaker"), () => {
+			frappe.call({
+				method: "lnder_signzy.signzy_breaker.reset_circuit_breaker",
+				callback: (r) => {
+					if (!r.exc) {
+						render_circuit_breaker_status(frm);
+					}
+				}
+			});
+		});
+
+		if (frm.doc.enable_fleet_sweep) {
+			frm.add_custom_button(__("Run Fleet Sweep"), () => {
+				frappe.call({
+					method: "lnder_signzy.lnder_signzy.doctype.signzy_fleet_sweep.signzy_fleet_sweep.start_fleet_sweep",
+					callback: (r) => {
+						if (!r.exc) {
+							frappe.show_alert({
+								message: __("Fleet sweep queued"),
+								indicator: "green"
+							}, 5);
+						}
+					}
+				});
+			});
+		}
+
+		render_circuit_breaker_status(frm);
+		render_endpoint_status(frm);
+		render_metrics_dashboard(frm);
+	},
+});
+
+function render_metrics_dashboard(frm) {
+	frappe.call({
+		method: "lnder_signzy.signzy_metrics.get_metrics_summary",
+		callback: (r) => {
+			if (r.exc || !r.message) {
+				return;
+			}
+			const format_seconds = (value) => value == null ? "> 30s" : `${flt(value, 3)}s`;
+			let rows = r.message.map((row) => `<tr>
+				<td>${__(row.api_method)}</td>
+				<td>${row.calls}</td>
+				<td>${format_seconds(row.avg_latency)}</td>
+				<td>${format_seconds(row.p95_latency)}</td>
+				<td>${flt(row.failure_rate, 1)}%</td>
+				<td>${row.cache_hits}</td>
+				<td>${row.retries}</td>
+				<td>${flt(row.bytes / 1024, 1)} KB</td>
+			</tr>`).join("");
+
+			frm.get_field("metrics_dashboard").$wrapper.html(`<table class="table table-bordered">
+				<thead><tr>
+					<th>${__("API Method")}</th><th>${__("Calls")}</th><th>${__("Avg Latency")}</th>
+					<th>${__("p95 Latency")}</th><th>${__("Failure Rate")}</th><th>${__("Cache Hits")}</th>
+					<th>${__("Retries")}</th><th>${__("Received")}</th>
+				</tr></thead>
+				<tbody>${rows || `<tr><td colspan="8" class="text-muted">${__("No calls recorded yet")}</td></tr>`}</tbody>
+			</table>`);
+		}
+	});
+}
+
+function render_circuit_breaker_status(frm) {
+	frappe.call({
+		method: "lnder_signzy.signzy_breaker.get_circuit_breaker_states",
+		callback: (r) => {
+			if (r.exc || !r.message) {
+				return;
+			}
+			const indicators = { "Closed": "green", "Half Open": "orange", "Open": "red" };
+			let rows = r.message.map((row) => {
+				const retry = row.retry_in ? __("retry in {0}s", [row.retry_in]) : "";
+				return `<tr>
+					<td>${__(row.api_method)}${row.endpoint ? `<br><span class="text-muted">${frappe.utils.escape_html(row.endpoint)}</span>` : ""}</td>
+					<td><span class="indicator-pill ${indicators[row.state]}">${__(row.state)}</span></td>
+					<td>${row.failures}</td>
+					<td>${retry}</td>
+				</tr>`;
+			}).join("");
+
+			frm.get_field("circuit_breaker_status").$wrapper.html(`<table class="table table-bordered">
+				<thead><tr><th>${__("API Method")}</th><th>${__("State")}</th><th>${__("Recent Failures")}</th><th></th></tr></thead>
+				<tbody>${rows}</tbody>
+			</table>`);
+		}
+	});
+}
+
+function render_endpoint_status(frm) {
+	if (!(frm.doc.endpoints || []).length) {
+		frm.get_field("endpoint_status").$wrapper.empty();
+		return;
+	}
+
+	frappe.call({
+		method: "lnder_signzy.signzy_router.get_endpoint_states",
+		callback: (r) => {
+			if (r.exc || !r.message) {
+				return;
+			}
+			let rows = r.message.map((row) => {
+				const state = row.ejected_for
+					? `<span class="indicator-pill red">${__("Ejected for {0}s", [row.ejected_for])}</span>`
+					: `<span class="indicator-pill green">${__("Healthy")}</span>`;
+				return `<tr>
+					<td>${frappe.utils.escape_html(row.url)}</td>
+					<td>${row.weight}</td>
+					<td>${row.apis.length ? row.apis.map((api) => __(api)).join(", ") : __("All")}</td>
+					<td>${row.outstanding}</td>
+					<td>${row.failures} / ${row.calls}</td>
+					<td>${state}</td>
+				</tr>`;
+			}).join("");
+
+			frm.get_field("endpoint_status").$wrapper.html(`<table class="table table-bordered">
+				<thead><tr>
+					<th>${__("URL")}</th><th>${__("Weight")}</th><th>${__("APIs")}</th>
+					<th>${__("In Flight")}</th><th>${__("Recent Failures")}</th><th>${__("State")}</th>
+				</tr></thead>
+				<tbody>${rows || `<tr><td colspan="6" class="text-muted">${__("No enabled endpoints")}</td></tr>`}</tbody>
+			</table>`);
+		}
+	});
+}
+
+function show_result_cache_stats(stats) {
+	let rows = Object.keys(stats).map((api_method) => {
+		const { hit, miss } = stats[api_method];
+		return `<tr><td>${__(api_method)}</td><td>${hit}</td><td>${miss}</td></tr>`;
+	}).join("");
+
+	frappe.msgprint({
+		title: __("Result Cache"),
+		message: `<table class="table table-bordered">
+			<thead><tr><th>${__("API Method")}</th><th>${__("Hits")}</th><th>${__("Misses")}</th></tr></thead>
+			<tbody>${rows}</tbody>
+		</table>`
+	});
+}
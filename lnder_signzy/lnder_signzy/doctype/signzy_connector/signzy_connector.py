@@ -1,9 +1,106 @@
 # Copyright (c) 2024, Aerele and contributors
 # For license information, please see license.txt
 
-# import frappe
+import threading
+
+import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import cint
+
+from lnder_signzy.lnder_signzy.doctype.signzy_api_setting.signzy_api_setting import API_METHODS
+
+# Bumped on every save so that all workers drop their cached copy of the connector
+CONFIG_VERSION_KEY = "signzy_connector_config_version"
+
+# Per-worker snapshot of the connector for each site: site -> (version, config)
+_config = {}
+
+# Held while a thread uses the database connection it shares with others, e.g. the threads of `signzy_async`,
+# so they never query it at once
+db_lock = threading.RLock()
 
 
 class SignzyConnector(Document):
-	pass
+	def validate(self):
+		self.validate_endpoints()
+
+	def validate_endpoints(self):
+		for row in self.endpoints:
+			unknown = [api for api in row.get_allowed_apis() if api not in API_METHODS]
+			if unknown:
+				frappe.throw(
+					_("Row #{0}: Unknown API methods in Allowed APIs: {1}").format(row.idx, ", ".join(unknown))
+				)
+
+	def on_update(self):
+		# Wait for the commit so no worker can reload the old values under the new version
+		frappe.db.after_commit.add(clear_connector_config)
+
+
+def get_connector_config() -> frappe._dict:
+	"""
+	Returns the Signzy Connector settings with the decrypted authorization token.
+
+	The snapshot is held per worker and only rebuilt when the Redis config version
+	changes, so the request path does not read the connector or decrypt the token.
+	"""
+	version = frappe.cache().get_value(CONFIG_VERSION_KEY)
+	if version is None:
+		version = frappe.generate_hash(length=10)
+		frappe.cache().set_value(CONFIG_VERSION_KEY, version)
+
+	cached_version, config = _config.get(frappe.local.site, (None, None))
+	if cached_version == version and config is not None:
+		return config
+
+	with db_lock:
+		cached_version, config = _config.get(frappe.local.site, (None, None))
+		if cached_version == version and config is not None:
+			return config
+		return load_connector_config(version)
+
+
+def load_connector_config(version: str) -> frappe._dict:
+	"""Reads the connector and caches its settings for this worker under the given config version."""
+	connector_doc = frappe.get_single("Signzy Connector")
+	config = frappe._dict(connector_doc.as_dict(no_default_fields=True))
+	config.authorization = connector_doc.get_password("authorization", raise_exception=False)
+	config.api_settings = [frappe._dict(row.as_dict()) for row in connector_doc.get("api_settings") or []]
+	config.endpoints = get_endpoints(connector_doc)
+
+	_config[frappe.local.site] = (version, config)
+	return config
+
+
+def get_endpoints(connector_doc) -> list:
+	"""
+	Returns the endpoints calls are balanced across, with decrypted authorization tokens.
+
+	Enabled rows of the Endpoints table with a weight are used; without any, the connector's
+	own URL and Authorization form a single endpoint.
+	"""
+	endpoints = [
+		frappe._dict(
+			id=row.name,
+			url=row.url,
+			authorization=row.get_password("authorization", raise_exception=False),
+			weight=cint(row.weight),
+			apis=row.get_allowed_apis()
+		)
+		for row in connector_doc.get("endpoints") or []
+		if row.enabled and cint(row.weight) > 0
+	]
+	if endpoints:
+		return endpoints
+
+	authorization = connector_doc.get_password("authorization", raise_exception=False)
+	if not (connector_doc.url and authorization):
+		return []
+	return [frappe._dict(id=None, url=connector_doc.url, authorization=authorization, weight=1, apis=())]
+
+
+def clear_connector_config():
+	"""Invalidates the cached connector settings in every worker."""
+	_config.pop(frappe.local.site, None)
+	frappe.cache().set_value(CONFIG_VERSION_KEY, frappe.generate_hash(length=10))
@@ -1,9 +1,478 @@
 # Copyright (c) 2024, Aerele and Contributors
 # See license.txt
 
-# import frappe
+import time
+from io import BytesIO
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from PIL import Image
+
+from lnder_signzy import (
+	signzy_api,
+	signzy_async,
+	signzy_breaker,
+	signzy_cache,
+	signzy_endpoints,
+	signzy_json,
+	signzy_rate_limiter,
+	signzy_singleflight,
+	signzy_validators,
+	signzy_writeback,
+)
+from lnder_signzy.benchmarks.mock_signzy import MockSignzyServer, use_mock_connector
+from lnder_signzy.signzy_bulk import run_bulk
+from lnder_signzy.signzy_client import get_retry_policy
+from lnder_signzy.signzy_images import prepare_ocr_image
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import (
+	clear_connector_config,
+	get_connector_config,
+)
 
 
 class TestSignzyConnector(FrappeTestCase):
-	pass
+	def test_result_cache_key_ignores_case_and_whitespace(self):
+		key = signzy_cache.get_cache_key("Verify PAN", {"pan": "abcde1234f", "name": "John  Doe"})
+		self.assertEqual(key, signzy_cache.get_cache_key("Verify PAN", {"pan": "ABCDE1234F ", "name": "john doe"}))
+		self.assertNotEqual(key, signzy_cache.get_cache_key("Verify UPI", {"pan": "ABCDE1234F", "name": "john doe"}))
+
+	def test_invalidate_changes_result_cache_key(self):
+		payload = {"vehicleNumber": "KA01AB1234"}
+		key = signzy_cache.get_cache_key("Verify Vehicle RC", payload)
+		signzy_cache.set_result(key, {"result": {}}, 60)
+
+		signzy_cache.invalidate("Verify Vehicle RC")
+
+		new_key = signzy_cache.get_cache_key("Verify Vehicle RC", payload)
+		self.assertNotEqual(key, new_key)
+		self.assertIsNone(signzy_cache.get_result("Verify Vehicle RC", new_key))
+
+	def test_connector_config_is_reloaded_after_invalidation(self):
+		frappe.db.set_single_value("Signzy Connector", "read_timeout", 45)
+		clear_connector_config()
+		self.assertEqual(get_connector_config().read_timeout, 45)
+
+		frappe.db.set_single_value("Signzy Connector", "read_timeout", 50)
+		self.assertEqual(get_connector_config().read_timeout, 45)
+
+		clear_connector_config()
+		self.assertEqual(get_connector_config().read_timeout, 50)
+
+	def test_otp_calls_are_never_retried(self):
+		config = frappe._dict(max_attempts=5, retry_status_codes="429, 503", api_settings=[])
+		self.assertEqual(get_retry_policy(config, "Generate OTP").max_attempts, 1)
+
+		policy = get_retry_policy(config, "Verify PAN")
+		self.assertEqual(policy.max_attempts, 5)
+		self.assertEqual(policy.retry_status_codes, {429, 503})
+
+	def test_verification_against_mock_server(self):
+		with MockSignzyServer() as server, use_mock_connector(server.url):
+			result = signzy_api.verify_pan(pan="ABCPE1234F", name="Test User", dob="1990-01-01")
+
+		self.assertEqual(result["result"]["panStatus"], "E")
+		self.assertEqual(server.request_count, 1)
+
+	def test_async_engine_against_mock_server(self):
+		items = [{"pan": "ABCPE1234F", "name": "Test User", "dob": "1990-01-01"}] * 5 + [{"vehicle_no": "KA01AB1234"}]
+		with MockSignzyServer(latency=0.05) as server, use_mock_connector(server.url):
+			results = signzy_async.run_many("verify_pan", items, concurrency=5)
+
+		self.assertEqual([row["status"] for row in results], ["Success"] * 5 + ["Failed"])
+		self.assertEqual(results[0]["result"]["result"]["panStatus"], "E")
+		self.assertEqual(server.request_count, 5)
+
+	def test_different_checks_run_together(self):
+		with MockSignzyServer(latency=0.2) as server, use_mock_connector(server.url):
+			results = signzy_async.run_together({
+				"pan": ("verify_pan", {"pan": "ABCPE1234F", "name": "Test User", "dob": "1990-01-01"}),
+				"rc": ("verify_rc", {"vehicle_no": "KA01AB1234"}),
+				"aadhaar": ("verify_aadhaar", {"aadhaar_no": "123"})
+			})
+
+		self.assertEqual(results["pan"]["status"], "Success")
+		self.assertEqual(results["rc"]["result"]["result"]["regNo"], "KA01AB1234")
+		self.assertEqual(results["aadhaar"]["status"], "Failed")
+		self.assertEqual(server.request_count, 2)
+
+	def test_checks_run_while_ocr_images_are_prepared(self):
+		requests_served = []
+
+		def prepare_slowly(file_url, config):
+			time.sleep(0.4)
+			requests_served.append(server.request_count)
+			return file_url, file_url
+
+		with MockSignzyServer(latency=0.2) as server, use_mock_connector(server.url), patch.object(
+			signzy_endpoints, "prepare_ocr_image", side_effect=prepare_slowly
+		):
+			results = signzy_async.run_together({
+				"pan": ("verify_pan", {"pan": "ABCPE1234F", "name": "Test User", "dob": "1990-01-01"}),
+				"aadhaar_ocr": ("verify_aadhaar_ocr", {"front_url": "/files/front.jpg", "back_url": "/files/back.jpg"})
+			})
+
+		# The PAN check was answered while the images were still being prepared
+		self.assertEqual(requests_served, [1, 1])
+		self.assertEqual([results["pan"]["status"], results["aadhaar_ocr"]["status"]], ["Success", "Success"])
+		self.assertEqual(server.request_count, 2)
+
+	def test_bulk_results_keep_input_order_and_isolate_failures(self):
+		items = [{"value": 1}, {"value": 2, "fail": "invalid"}, {"value": 3}, {"value": 4, "fail": "error"}, {"value": 5}]
+		results = run_bulk(double_slowly, items, max_workers=3)
+
+		self.assertEqual([row["index"] for row in results], [0, 1, 2, 3, 4])
+		self.assertEqual([row["status"] for row in results], ["Success", "Failed", "Success", "Failed", "Success"])
+		self.assertEqual([results[index]["result"] for index in (0, 2, 4)], [2, 6, 10])
+		self.assertEqual((results[1]["error"], results[3]["error"]), ("Invalid value", "Unexpected error"))
+
+	def test_bulk_threads_close_their_connections(self):
+		with patch.object(frappe, "connect", wraps=frappe.connect) as connect, patch.object(
+			frappe, "destroy", wraps=frappe.destroy
+		) as destroy:
+			results = run_bulk(double_slowly, [{"value": value, "fail": value == 3 and "invalid"} for value in range(6)], max_workers=4)
+
+		# One site context per pool thread, not per item, each torn down once the queue is drained
+		self.assertEqual(len(results), 6)
+		self.assertEqual((connect.call_count, destroy.call_count), (4, 4))
+
+	def test_large_bulk_batches_are_queued(self):
+		items = [{"pan": "ABCPE1234F", "name": "Test User", "dob": "1990-01-01"}] * (signzy_api.MAX_SYNC_BULK_ITEMS + 1)
+		with patch.object(signzy_api, "enqueue_verification", return_value={"job_id": "test", "queued": True}) as enqueue:
+			self.assertEqual(signzy_api.verify_pan_bulk(items), {"job_id": "test", "queued": True})
+
+		enqueue.assert_called_once_with(
+			"lnder_signzy.signzy_api.run_bulk_verification", verification="verify_pan", items=items
+		)
+		self.assertRaises(frappe.ValidationError, signzy_api.run_bulk_verification, "verify_upi", items)
+
+	def test_write_back_is_checked_before_the_call(self):
+		with MockSignzyServer() as server, use_mock_connector(server.url):
+			self.assertRaises(
+				frappe.ValidationError,
+				signzy_api.verify_pan,
+				pan="ABCPE1234F",
+				name="Test User",
+				dob="1990-01-01",
+				doctype="Signzy Connector",
+				docname="Signzy Connector"
+			)
+
+		self.assertEqual(server.request_count, 0)
+		self.assertNotIn(("Verify PAN", "Signzy Connector"), signzy_writeback.WRITEBACKS)
+
+	def test_write_back_inputs_must_match_the_document(self):
+		driver = frappe.get_doc({
+			"doctype": "Driver",
+			"full_name": "Test Driver",
+			"license_number": "KA01 2020 0001234",
+			"issuing_date": "2020-01-01"
+		}).insert(ignore_mandatory=True)
+
+		with MockSignzyServer() as server, use_mock_connector(server.url):
+			self.assertRaises(
+				frappe.ValidationError,
+				signzy_api.verify_dl,
+				dl_number="KA0120200009999",
+				dob="1990-01-01",
+				issue_date="2020-01-01",
+				doctype="Driver",
+				docname=driver.name
+			)
+
+		self.assertEqual(server.request_count, 0)
+		self.assertTrue(signzy_writeback.matches("ka01-2020-0001234", driver.license_number))
+		self.assertTrue(signzy_writeback.matches("2020-01-01", frappe.utils.getdate("2020-01-01")))
+
+	def test_invalid_inputs_are_rejected_before_the_call(self):
+		with MockSignzyServer() as server, use_mock_connector(server.url):
+			self.assertRaises(frappe.ValidationError, signzy_api.verify_aadhaar, aadhaar_no="234567890123")
+			self.assertRaises(frappe.ValidationError, signzy_api.verify_pan, pan="ABCXE1234F", name="Test", dob="1990-01-01")
+			self.assertRaises(frappe.ValidationError, signzy_api.verify_rc, vehicle_no="XX01AB1234")
+			self.assertRaises(frappe.ValidationError, signzy_api.verify_upi, vpa="test", name="Test")
+
+		self.assertEqual(server.request_count, 0)
+
+	def test_normalized_inputs_are_sent(self):
+		self.assertEqual(signzy_endpoints.verify_aadhaar("2345 6789 0124").payload["uid"], "234567890124")
+		self.assertEqual(signzy_endpoints.verify_pan(" abcpe1234f", "Test", "1990-01-01").payload["pan"], "ABCPE1234F")
+		self.assertEqual(signzy_endpoints.verify_rc("ka-01-ab-1234").payload["vehicleNumber"], "KA01AB1234")
+
+	def test_legacy_dl_numbers_are_accepted(self):
+		for dl_number, normalized in (
+			("KA01 20200001234", "KA0120200001234"),
+			("MH-02-1999-0012345", "MH0219990012345"),
+			("MH02 99 12345", "MH029912345"),
+			("mh02/12345/99", "MH021234599"),
+			("DL-0419980A12345", "DL0419980A12345"),
+		):
+			self.assertEqual(signzy_validators.validate_dl(dl_number), normalized)
+
+		for dl_number in ("MH02123", "XX0219990012345", "MH0219990012345678"):
+			self.assertRaises(frappe.ValidationError, signzy_validators.validate_dl, dl_number)
+
+	def test_ifsc_directory_lookup(self):
+		source_path = frappe.get_site_path("private", "ifsc_source.csv")
+		directory_path = frappe.get_site_path("private", "ifsc_directory.txt")
+		with open(source_path, "w") as source:
+			source.write("BANK,IFSC,BRANCH\nState Bank of India,SBIN0000001,Main\nHDFC Bank,hdfc0000002,Fort\n")
+
+		self.assertEqual(signzy_validators.build_ifsc_directory(source_path, directory_path), 2)
+		directory = signzy_validators.load_ifsc_directory(directory_path)
+		with patch.object(signzy_validators, "get_ifsc_directory", return_value=directory):
+			signzy_validators.validate_ifsc("SBIN0000001")
+			signzy_validators.validate_ifsc("hdfc0000002")
+			self.assertRaises(frappe.ValidationError, signzy_validators.validate_ifsc, "SBIN0000003")
+		self.assertRaises(frappe.ValidationError, signzy_validators.validate_ifsc, "SBIN1000001")
+
+	def test_ocr_images_that_need_no_processing_are_sent_as_they_are(self):
+		config = get_connector_config()
+		self.assertEqual(prepare_ocr_image("/files/not-uploaded.jpg", config), ("/files/not-uploaded.jpg", "/files/not-uploaded.jpg"))
+
+		output = BytesIO()
+		Image.new("RGB", (200, 120)).save(output, format="JPEG")
+		for file_name, content in (("upright.jpg", output.getvalue()), ("scan.pdf", b"%PDF-1.4\n%%EOF\n")):
+			file_doc = frappe.get_doc({
+				"doctype": "File",
+				"file_name": f"{frappe.generate_hash(length=8)}-{file_name}",
+				"content": content
+			}).insert(ignore_permissions=True)
+			self.assertEqual(prepare_ocr_image(file_doc.file_url, config)[0], file_doc.file_url)
+
+	def test_json_codec_round_trip(self):
+		payload = {"name": "Zoë", "amount": 1.5, "items": [1, None, True]}
+		data = signzy_json.dumps(payload)
+		self.assertNotIn(", ", data)
+		self.assertEqual(signzy_json.loads(data), payload)
+		self.assertEqual(signzy_json.loads(data.encode()), payload)
+		self.assertRaises(signzy_json.JSONDecodeError, signzy_json.loads, b"<html>")
+
+	def test_breaker_opens_after_failures_and_fails_fast(self):
+		breaker = {"enable_circuit_breaker": 1, "breaker_failure_threshold": 2, "breaker_recovery_timeout": 60}
+		with MockSignzyServer(error_rate=1) as server, use_mock_connector(server.url, **breaker) as config:
+			signzy_breaker.reset("Verify Vehicle RC")
+			for number in range(2):
+				self.assertRaises(frappe.ValidationError, signzy_api.verify_rc, vehicle_no=f"KA05AB{1000 + number}")
+
+			self.assertRaises(signzy_breaker.SignzyUnavailableError, signzy_api.verify_rc, vehicle_no="KA05AB2000")
+			state = next(row for row in signzy_breaker.get_states(config) if row["api_method"] == "Verify Vehicle RC")
+			signzy_breaker.reset("Verify Vehicle RC")
+
+		self.assertEqual(server.request_count, 2)
+		self.assertEqual(state["state"], signzy_breaker.OPEN)
+		self.assertGreater(state["retry_in"], 0)
+
+	def test_half_open_probe_closes_breaker(self):
+		breaker = {"enable_circuit_breaker": 1, "breaker_failure_threshold": 1, "breaker_recovery_timeout": 1}
+		with MockSignzyServer(error_rate=1) as failing, use_mock_connector(failing.url, **breaker):
+			signzy_breaker.reset("Verify Vehicle RC")
+			self.assertRaises(frappe.ValidationError, signzy_api.verify_rc, vehicle_no="KA06AB1000")
+
+		time.sleep(1.1)
+		with MockSignzyServer() as healthy, use_mock_connector(healthy.url, **breaker) as config:
+			signzy_api.verify_rc(vehicle_no="KA06AB1001")
+			signzy_api.verify_rc(vehicle_no="KA06AB1002")
+			state = next(row for row in signzy_breaker.get_states(config) if row["api_method"] == "Verify Vehicle RC")
+
+		self.assertEqual(healthy.request_count, 2)
+		self.assertEqual(state["state"], signzy_breaker.CLOSED)
+
+	def test_breaker_lets_one_probe_through(self):
+		config = frappe._dict(enable_circuit_breaker=1, breaker_failure_threshold=1, breaker_recovery_timeout=1)
+		endpoint_id = frappe.generate_hash(length=10)
+		signzy_breaker.record_failure(config, "Verify PAN", endpoint_id)
+		self.assertRaises(signzy_breaker.SignzyUnavailableError, signzy_breaker.before_call, config, "Verify PAN", endpoint_id)
+
+		time.sleep(1.1)
+		signzy_breaker.before_call(config, "Verify PAN", endpoint_id)
+		self.assertRaises(signzy_breaker.SignzyUnavailableError, signzy_breaker.before_call, config, "Verify PAN", endpoint_id)
+		self.assertEqual(signzy_breaker.get_open(config, "Verify PAN", [endpoint_id]), [True])
+
+		# A failed probe opens the breaker again for another recovery timeout
+		signzy_breaker.record_failure(config, "Verify PAN", endpoint_id)
+		self.assertRaises(signzy_breaker.SignzyUnavailableError, signzy_breaker.before_call, config, "Verify PAN", endpoint_id)
+
+	def test_breakers_are_kept_per_endpoint(self):
+		config = frappe._dict(enable_circuit_breaker=1, breaker_failure_threshold=1, breaker_recovery_timeout=60)
+		failing, healthy = frappe.generate_hash(length=10), frappe.generate_hash(length=10)
+		signzy_breaker.record_failure(config, "Verify UPI", failing)
+
+		self.assertRaises(signzy_breaker.SignzyUnavailableError, signzy_breaker.before_call, config, "Verify UPI", failing)
+		signzy_breaker.before_call(config, "Verify UPI", healthy)
+		signzy_breaker.before_call(config, "Verify PAN", failing)
+		self.assertEqual(signzy_breaker.get_open(config, "Verify UPI", [failing, healthy]), [True, False])
+
+	def test_breaker_reset_closes_it(self):
+		breaker = {"enable_circuit_breaker": 1, "breaker_failure_threshold": 1, "breaker_recovery_timeout": 60}
+		with MockSignzyServer(error_rate=1) as failing, use_mock_connector(failing.url, **breaker) as config:
+			signzy_breaker.reset("Verify Vehicle RC")
+			self.assertRaises(frappe.ValidationError, signzy_api.verify_rc, vehicle_no="KA07AB1000")
+			self.assertRaises(signzy_breaker.SignzyUnavailableError, signzy_breaker.before_call, config, "Verify Vehicle RC")
+
+			signzy_breaker.reset_circuit_breaker("Verify Vehicle RC")
+			signzy_breaker.before_call(config, "Verify Vehicle RC")
+
+	def test_rate_limit_rejects_at_once_without_a_wait(self):
+		config = get_rate_limited_config(rate=1, burst=2)
+		endpoint_id = frappe.generate_hash(length=10)
+
+		self.assertEqual(signzy_rate_limiter.try_acquire(config, "Verify PAN", endpoint_id), 0)
+		self.assertEqual(signzy_rate_limiter.try_acquire(config, "Verify PAN", endpoint_id), 0)
+		self.assertGreater(signzy_rate_limiter.try_acquire(config, "Verify PAN", endpoint_id), 0)
+		self.assertRaises(
+			signzy_rate_limiter.SignzyRateLimitedError, signzy_rate_limiter.acquire, config, "Verify PAN", 0, endpoint_id=endpoint_id
+		)
+		self.assertEqual(signzy_rate_limiter.try_acquire(config, "Verify UPI", endpoint_id), 0)
+
+	def test_rate_limit_waits_for_the_next_token(self):
+		config = get_rate_limited_config(rate=10, burst=1)
+		endpoint_id = frappe.generate_hash(length=10)
+		signzy_rate_limiter.acquire(config, "Verify PAN", endpoint_id=endpoint_id)
+
+		started_at = time.monotonic()
+		signzy_rate_limiter.acquire(config, "Verify PAN", 1, endpoint_id=endpoint_id)
+		self.assertGreaterEqual(time.monotonic() - started_at, 0.05)
+
+		# The wait never runs past the call's deadline
+		self.assertRaises(
+			signzy_rate_limiter.SignzyRateLimitedError,
+			signzy_rate_limiter.acquire,
+			config,
+			"Verify PAN",
+			1,
+			deadline=time.monotonic() + 0.01,
+			endpoint_id=endpoint_id
+		)
+
+	def test_rate_limit_buckets_are_kept_per_endpoint(self):
+		config = get_rate_limited_config(rate=1, burst=1)
+		first, second = frappe.generate_hash(length=10), frappe.generate_hash(length=10)
+
+		self.assertEqual(signzy_rate_limiter.try_acquire(config, "Verify PAN", first), 0)
+		self.assertGreater(signzy_rate_limiter.try_acquire(config, "Verify PAN", first), 0)
+		self.assertEqual(signzy_rate_limiter.try_acquire(config, "Verify PAN", second), 0)
+
+	def test_calls_are_balanced_by_weight(self):
+		with MockSignzyServer() as first, MockSignzyServer() as second:
+			endpoints = [
+				frappe._dict(id=frappe.generate_hash(length=10), url=first.url, authorization="a", weight=2, apis=()),
+				frappe._dict(id=frappe.generate_hash(length=10), url=second.url, authorization="b", weight=1, apis=()),
+			]
+			with use_mock_connector(first.url, endpoints=endpoints, load_balancing="Weighted Round Robin"):
+				for number in range(6):
+					signzy_api.verify_rc(vehicle_no=f"KA01AB{1000 + number}")
+
+		self.assertEqual((first.request_count, second.request_count), (4, 2))
+
+	def test_failing_endpoint_is_ejected(self):
+		with MockSignzyServer(error_rate=1) as failing, MockSignzyServer() as healthy:
+			endpoints = [
+				frappe._dict(id=frappe.generate_hash(length=10), url=failing.url, authorization="a", weight=1, apis=()),
+				frappe._dict(id=frappe.generate_hash(length=10), url=healthy.url, authorization="b", weight=1, apis=()),
+			]
+			with use_mock_connector(
+				healthy.url,
+				endpoints=endpoints,
+				ejection_min_calls=2,
+				ejection_error_rate=50,
+				enable_circuit_breaker=1,
+				breaker_failure_threshold=2,
+				breaker_recovery_timeout=60
+			):
+				for number in range(4):
+					try:
+						signzy_api.verify_rc(vehicle_no=f"KA02AB{1000 + number}")
+					except frappe.ValidationError:
+						frappe.clear_last_message()
+
+				calls_before_ejection = failing.request_count
+				# The failing endpoint's breaker is open, but the healthy endpoint keeps serving
+				for number in range(4):
+					signzy_api.verify_rc(vehicle_no=f"KA03AB{1000 + number}")
+
+		self.assertEqual(calls_before_ejection, 2)
+		self.assertEqual(failing.request_count, 2)
+		self.assertEqual(healthy.request_count, 6)
+
+	def test_retries_go_to_another_endpoint(self):
+		with MockSignzyServer(error_rate=1) as failing, MockSignzyServer() as healthy:
+			endpoints = [
+				frappe._dict(id=frappe.generate_hash(length=10), url=failing.url, authorization="a", weight=1, apis=()),
+				frappe._dict(id=frappe.generate_hash(length=10), url=healthy.url, authorization="b", weight=1, apis=()),
+			]
+			with use_mock_connector(
+				healthy.url, endpoints=endpoints, max_attempts=2, backoff_base=0.01, retry_status_codes="503"
+			):
+				for number in range(4):
+					signzy_api.verify_rc(vehicle_no=f"KA04AB{1000 + number}")
+
+		self.assertEqual(healthy.request_count, 4)
+		self.assertLessEqual(failing.request_count, 4)
+
+	def test_read_timeouts_are_not_retried(self):
+		with MockSignzyServer(latency=0.5) as server:
+			with use_mock_connector(server.url, max_attempts=3, backoff_base=0.01, read_timeout=0.1):
+				self.assertRaises(frappe.ValidationError, signzy_api.verify_rc, vehicle_no="KA01AB1234")
+
+		self.assertEqual(server.request_count, 1)
+
+	def test_endpoint_allowed_apis(self):
+		with MockSignzyServer() as server:
+			endpoints = [frappe._dict(id=None, url=server.url, authorization="a", weight=1, apis=("Verify PAN",))]
+			with use_mock_connector(server.url, endpoints=endpoints):
+				self.assertRaises(frappe.ValidationError, signzy_api.verify_rc, vehicle_no="KA01AB1234")
+
+		self.assertEqual(server.request_count, 0)
+
+	def test_upstream_error_is_raised(self):
+		with MockSignzyServer(error_rate=1) as server, use_mock_connector(server.url):
+			self.assertRaises(frappe.ValidationError, signzy_api.verify_rc, vehicle_no="KA01AB1234")
+
+	def test_identical_calls_share_one_outcome(self):
+		calls = []
+
+		def send():
+			calls.append(1)
+			return {"result": {"active": "yes"}}
+
+		flight_key = signzy_singleflight.get_flight_key("Verify Bank Account", idempotency_key=frappe.generate_hash())
+		first = signzy_singleflight.run_once(flight_key, send, timeout=5, replay_ttl=60)
+		second = signzy_singleflight.run_once(flight_key, send, timeout=5, replay_ttl=60)
+
+		self.assertEqual(first, second)
+		self.assertEqual(len(calls), 1)
+
+	def test_finished_flights_are_not_replayed(self):
+		calls = []
+
+		def send():
+			calls.append(1)
+			if len(calls) == 1:
+				frappe.throw("Service Unavailable")
+			return {"result": {"active": "yes"}}
+
+		flight_key = signzy_singleflight.get_flight_key("Verify Bank Account", request_key=frappe.generate_hash())
+		self.assertRaises(frappe.ValidationError, signzy_singleflight.run_once, flight_key, send, timeout=5)
+		frappe.clear_last_message()
+
+		self.assertEqual(signzy_singleflight.run_once(flight_key, send, timeout=5), {"result": {"active": "yes"}})
+		signzy_singleflight.run_once(flight_key, send, timeout=5)
+		self.assertEqual(len(calls), 3)
+
+
+def double_slowly(value: int, fail: str | None = None) -> int:
+	"""A bulk verification stand-in where later items finish first."""
+	time.sleep(0.02 * (6 - value))
+	if fail == "invalid":
+		frappe.throw("Invalid value")
+	if fail:
+		raise ValueError("Unexpected error")
+	return value * 2
+
+
+def get_rate_limited_config(rate: float, burst: int) -> frappe._dict:
+	"""Returns connector settings that limit Verify PAN to `rate` calls a second with bursts of `burst`."""
+	return frappe._dict(
+		rate_limit_max_wait=0,
+		api_settings=[frappe._dict(api_method="Verify PAN", rate_limit=rate, rate_limit_burst=burst)]
+	)
@@ -0,0 +1,11 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class SignzyEndpoint(Document):
+	def get_allowed_apis(self) -> tuple:
+		"""Returns the API methods listed in Allowed APIs, empty when all are allowed."""
+		return tuple(line.strip() for line in (self.allowed_apis or "").splitlines() if line.strip())
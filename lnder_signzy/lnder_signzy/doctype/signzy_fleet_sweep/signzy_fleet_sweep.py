@@ -0,0 +1,300 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import json
+import time
+from datetime import datetime
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, get_datetime, getdate, now, now_datetime, today
+
+from lnder_signzy import signzy_async, signzy_writeback
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+
+SWEEP_LOCK = "signzy_fleet_sweep"
+DAILY_CALLS_KEY = "signzy_fleet_sweep|calls"
+
+DEFAULT_RECHECK_DAYS = 30
+DEFAULT_EXPIRY_WINDOW = 30
+DEFAULT_DAILY_LIMIT = 500
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_CONCURRENCY = 4
+# Records inside the expiry window are rechecked this often
+EXPIRING_RECHECK_DAYS = 7
+
+# A run stops before the next hourly run is due, which then resumes from the checkpoint
+MAX_RUN_SECONDS = 50 * 60
+# Sweep calls queue behind the rate limit instead of failing
+RATE_LIMIT_WAIT = 60
+
+# The failure count and last attempt of each doctype's sweep checks
+FAILURE_FIELDS = {
+	"Driver": ("custom_dl_check_failures", "custom_dl_last_attempted_on"),
+	"Vehicle": ("custom_rc_check_failures", "custom_rc_last_attempted_on"),
+}
+
+
+class SignzyFleetSweep(Document):
+	def run(self, config):
+		"""
+		Verifies the queued records in batches, saving results and the checkpoint after each one.
+
+		Stops once the queue is done, the day's call limit is used up or the run has taken
+		MAX_RUN_SECONDS; the sweep then stays Running and a later run resumes it.
+		"""
+		queue = json.loads(self.queue or "[]")
+		batch_size = cint(config.fleet_sweep_batch_size) or DEFAULT_BATCH_SIZE
+		daily_limit = cint(config.fleet_sweep_daily_limit) or DEFAULT_DAILY_LIMIT
+		started_at = time.monotonic()
+
+		while self.position < len(queue) and time.monotonic() - started_at < MAX_RUN_SECONDS:
+			allowed = daily_limit - get_calls_today()
+			if allowed <= 0:
+				break
+
+			batch = queue[self.position:self.position + min(batch_size, allowed)]
+			succeeded, failed = self.run_batch(batch, config)
+
+			self.db_set({
+				"position": self.position + len(batch),
+				"succeeded": self.succeeded + succeeded,
+				"failed": self.failed + failed
+			})
+			frappe.db.commit()
+
+		if self.position >= len(queue):
+			self.db_set({"status": "Completed", "completed_on": now()})
+			frappe.db.commit()
+
+	def run_batch(self, batch: list, config) -> tuple:
+		"""
+		Verifies one batch of [doctype, name] entries concurrently and returns (succeeded, failed).
+
+		Failed entries are recorded on their record, which `get_sweep_queue` then backs off from.
+		"""
+		calls = get_calls(batch)
+		add_calls_today(len(calls))
+
+		outcomes = signzy_async.run_together(
+			calls,
+			concurrency=cint(config.fleet_sweep_concurrency) or DEFAULT_CONCURRENCY,
+			rate_limit_wait=RATE_LIMIT_WAIT
+		)
+
+		succeeded = []
+		for (doctype, name), outcome in outcomes.items():
+			if outcome["status"] != "Success":
+				continue
+
+			try:
+				if doctype == "Driver":
+					signzy_writeback.update_driver(name, outcome["result"].get("result") or {})
+				else:
+					signzy_writeback.update_vehicle(name, outcome["result"].get("result") or {})
+			except Exception:
+				frappe.log_error(title=_("Signzy Fleet Sweep Write Back Failed"), reference_doctype=doctype, reference_name=name)
+			else:
+				succeeded.append((doctype, name))
+
+		# Entries that could not be called at all, e.g. missing inputs, count as failed
+		failed = [(doctype, name) for doctype, name in batch if (doctype, name) not in succeeded]
+		for doctype in FAILURE_FIELDS:
+			record_failures(doctype, [name for failed_doctype, name in failed if failed_doctype == doctype])
+
+		return len(succeeded), len(failed)
+
+
+def run_fleet_sweep():
+	"""
+	Scheduled hourly. Resumes the unfinished fleet sweep, or starts one if none was started today.
+
+	Only one sweep runs at a time across workers.
+	"""
+	config = get_connector_config()
+	if not config.enable_fleet_sweep:
+		return
+
+	cache = frappe.cache()
+	lock = cache.lock(cache.make_key(SWEEP_LOCK), timeout=MAX_RUN_SECONDS + 10 * 60)
+	if not lock.acquire(blocking=False):
+		return
+
+	sweep = None
+	try:
+		sweep = get_or_start_sweep(config)
+		if sweep:
+			sweep.run(config)
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(title=_("Signzy Fleet Sweep Failed"))
+		if sweep:
+			sweep.db_set("error", frappe.get_traceback())
+			frappe.db.commit()
+	finally:
+		lock.release()
+
+
+@frappe.whitelist()
+def start_fleet_sweep():
+	"""Runs the fleet sweep now in a background job, from the Signzy Connector form."""
+	frappe.only_for("System Manager")
+	frappe.enqueue(
+		"lnder_signzy.lnder_signzy.doctype.signzy_fleet_sweep.signzy_fleet_sweep.run_fleet_sweep",
+		queue="long",
+		job_id="signzy_fleet_sweep",
+		deduplicate=True
+	)
+
+
+def get_or_start_sweep(config) -> SignzyFleetSweep | None:
+	"""Returns the sweep still Running, else a new one, unless one was already started today."""
+	running = frappe.db.get_value("Signzy Fleet Sweep", {"status": "Running"}, "name", order_by="creation desc")
+	if running:
+		return frappe.get_doc("Signzy Fleet Sweep", running)
+
+	if frappe.db.exists("Signzy Fleet Sweep", {"started_on": (">=", today())}):
+		return None
+
+	queue = get_sweep_queue(config)
+	if not queue:
+		return None
+
+	sweep = frappe.get_doc({
+		"doctype": "Signzy Fleet Sweep",
+		"status": "Running",
+		"started_on": now(),
+		"total": len(queue),
+		"queue": json.dumps(queue)
+	}).insert(ignore_permissions=True)
+	frappe.db.commit()
+	return sweep
+
+
+def get_sweep_queue(config) -> list:
+	"""
+	Returns the Drivers and Vehicles due for a check as [doctype, name] pairs, most urgent first.
+
+	A record is due when it was never checked, was last checked more than Recheck After Days
+	ago, or expires within Expiry Window Days and was not checked in the last week. Expiring
+	records come first, soonest expiry first, then the least recently checked.
+
+	Records whose checks keep failing, e.g. on a number Signzy rejects, are retried after a
+	backoff that doubles with every failure up to Recheck After Days, and after every record
+	without failures, so they cannot use up the daily call limit.
+	"""
+	now_time = now_datetime()
+	recheck_days = cint(config.fleet_sweep_recheck_days) or DEFAULT_RECHECK_DAYS
+	recheck_before = add_days(now_time, -recheck_days)
+	expiring_recheck_before = add_days(now_time, -EXPIRING_RECHECK_DAYS)
+	expiry_window_end = getdate(add_days(now_time, cint(config.fleet_sweep_expiry_window) or DEFAULT_EXPIRY_WINDOW))
+
+	candidates = []
+	drivers = frappe.get_all(
+		"Driver",
+		filters={
+			"status": ("!=", "Left"),
+			"license_number": ("is", "set"),
+			"issuing_date": ("is", "set"),
+			"custom_date_of_birth": ("is", "set")
+		},
+		fields=[
+			"name", "expiry_date", "custom_dl_last_checked_on", "custom_dl_check_failures", "custom_dl_last_attempted_on"
+		]
+	)
+	for driver in drivers:
+		candidates.append((
+			"Driver", driver.name, driver.expiry_date, driver.custom_dl_last_checked_on,
+			driver.custom_dl_check_failures, driver.custom_dl_last_attempted_on
+		))
+
+	vehicles = frappe.get_all(
+		"Vehicle",
+		fields=[
+			"name", "custom_rc_expiry_date", "custom_rc_last_checked_on", "custom_rc_check_failures", "custom_rc_last_attempted_on"
+		]
+	)
+	for vehicle in vehicles:
+		candidates.append((
+			"Vehicle", vehicle.name, vehicle.custom_rc_expiry_date, vehicle.custom_rc_last_checked_on,
+			vehicle.custom_rc_check_failures, vehicle.custom_rc_last_attempted_on
+		))
+
+	queue = []
+	for doctype, name, expiry_date, last_checked_on, failures, last_attempted_on in candidates:
+		expiring = bool(expiry_date and getdate(expiry_date) <= expiry_window_end)
+		last_checked_on = get_datetime(last_checked_on) if last_checked_on else None
+		if last_checked_on and last_checked_on >= (expiring_recheck_before if expiring else recheck_before):
+			continue
+
+		failures = cint(failures)
+		if failures and last_attempted_on:
+			backoff_days = min(2 ** failures, recheck_days)
+			if get_datetime(last_attempted_on) >= add_days(now_time, -backoff_days):
+				continue
+
+		priority = (
+			1 if failures else 0,
+			0 if expiring else 1,
+			getdate(expiry_date) if expiring else datetime.max.date(),
+			last_checked_on or datetime.min
+		)
+		queue.append((priority, doctype, name))
+
+	queue.sort()
+	return [[doctype, name] for _priority, doctype, name in queue]
+
+
+def get_calls(batch: list) -> dict:
+	"""Returns the `signzy_async.run_together` calls for a batch, keyed by (doctype, name)."""
+	calls = {}
+
+	driver_names = [name for doctype, name in batch if doctype == "Driver"]
+	if driver_names:
+		for driver in frappe.get_all(
+			"Driver",
+			filters={"name": ("in", driver_names)},
+			fields=["name", "license_number", "custom_date_of_birth", "issuing_date"]
+		):
+			calls[("Driver", driver.name)] = ("verify_dl", {
+				"dl_number": driver.license_number,
+				"dob": driver.custom_date_of_birth,
+				"issue_date": driver.issuing_date
+			})
+
+	vehicle_names = [name for doctype, name in batch if doctype == "Vehicle"]
+	if vehicle_names:
+		for vehicle in frappe.get_all("Vehicle", filters={"name": ("in", vehicle_names)}, fields=["name", "license_plate"]):
+			calls[("Vehicle", vehicle.name)] = ("verify_rc", {"vehicle_no": vehicle.license_plate or vehicle.name})
+
+	return calls
+
+
+def record_failures(doctype: str, names: list):
+	"""Counts a failed sweep check against each record and stamps the attempt."""
+	if not names:
+		return
+
+	failures_field, attempted_field = FAILURE_FIELDS[doctype]
+	frappe.db.sql(
+		f""" UPDATE `tab{doctype}`
+		SET `{failures_field}` = COALESCE(`{failures_field}`, 0) + 1, `{attempted_field}` = %(now)s
+		WHERE `name` IN %(names)s
+	""",
+		{"now": now(), "names": tuple(names)}
+	)
+
+
+def get_calls_today() -> int:
+	cache = frappe.cache()
+	return cint(cache.get(cache.make_key(f"{DAILY_CALLS_KEY}|{today()}")))
+
+
+def add_calls_today(count: int):
+	cache = frappe.cache()
+	key = cache.make_key(f"{DAILY_CALLS_KEY}|{today()}")
+	pipeline = cache.pipeline()
+	pipeline.incrby(key, count)
+	pipeline.expire(key, 2 * 24 * 60 * 60)
+	pipeline.execute()
@@ -0,0 +1,154 @@
+# Copyright (c) 2024, Aerele and Contributors
+# See license.txt
+
+import json
+import random
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, getdate, now_datetime, today
+
+from lnder_signzy.benchmarks.mock_signzy import MockSignzyServer, use_mock_connector
+from lnder_signzy.lnder_signzy.doctype.signzy_fleet_sweep.signzy_fleet_sweep import (
+	SignzyFleetSweep,
+	add_calls_today,
+	get_calls_today,
+	get_sweep_queue,
+)
+
+
+class TestSignzyFleetSweep(FrappeTestCase):
+	def test_daily_calls_are_counted(self):
+		calls = get_calls_today()
+		add_calls_today(3)
+		self.assertEqual(get_calls_today(), calls + 3)
+
+	def test_queue_puts_expiring_records_first(self):
+		never_checked = make_driver()
+		expiring_soonest = make_driver(expiry_date=add_days(today(), 5), last_checked_on=add_days(now_datetime(), -10))
+		expiring_later = make_driver(expiry_date=add_days(today(), 20))
+		checked_recently = make_driver(last_checked_on=add_days(now_datetime(), -1))
+		expiring_checked_this_week = make_driver(expiry_date=add_days(today(), 3), last_checked_on=add_days(now_datetime(), -2))
+		checked_long_ago = make_vehicle(last_checked_on=add_days(now_datetime(), -40))
+
+		queue = get_sweep_queue(frappe._dict(fleet_sweep_recheck_days=30, fleet_sweep_expiry_window=30))
+		names = {never_checked, expiring_soonest, expiring_later, checked_recently, expiring_checked_this_week, checked_long_ago}
+
+		self.assertEqual(
+			[name for _doctype, name in queue if name in names],
+			[expiring_soonest, expiring_later, never_checked, checked_long_ago]
+		)
+
+	def test_run_resumes_from_position(self):
+		queue = [["Vehicle", f"SWEEP-{number}"] for number in range(4)]
+		sweep = make_sweep(queue, position=1)
+		batches = []
+
+		def run_batch(batch, config):
+			batches.append(batch)
+			return len(batch), 0
+
+		config = frappe._dict(fleet_sweep_batch_size=2, fleet_sweep_daily_limit=get_calls_today() + 100)
+		with patch.object(SignzyFleetSweep, "run_batch", side_effect=run_batch), patch.object(frappe.db, "commit"):
+			sweep.run(config)
+
+		self.assertEqual(batches, [queue[1:3], queue[3:]])
+		self.assertEqual((sweep.position, sweep.succeeded, sweep.status), (4, 3, "Completed"))
+
+	def test_run_stops_at_the_daily_limit(self):
+		queue = [["Vehicle", f"SWEEP-{number}"] for number in range(5)]
+		sweep = make_sweep(queue)
+		batches = []
+
+		def run_batch(batch, config):
+			batches.append(batch)
+			add_calls_today(len(batch))
+			return len(batch), 0
+
+		config = frappe._dict(fleet_sweep_batch_size=2, fleet_sweep_daily_limit=get_calls_today() + 3)
+		with patch.object(SignzyFleetSweep, "run_batch", side_effect=run_batch), patch.object(frappe.db, "commit"):
+			sweep.run(config)
+
+		self.assertEqual(batches, [queue[:2], queue[2:3]])
+		self.assertEqual((sweep.position, sweep.status), (3, "Running"))
+
+	def test_results_are_written_back(self):
+		driver = make_driver()
+		vehicle = make_vehicle()
+		batch = [["Driver", driver], ["Vehicle", vehicle], ["Vehicle", "SWEEP-DELETED"]]
+
+		with MockSignzyServer() as server, use_mock_connector(server.url) as config:
+			succeeded, failed = frappe.new_doc("Signzy Fleet Sweep").run_batch(batch, config)
+
+		self.assertEqual((succeeded, failed), (2, 1))
+		self.assertEqual(server.request_count, 2)
+
+		driver_values = frappe.db.get_value(
+			"Driver", driver, ["custom_driving_license_verified", "expiry_date", "custom_dl_last_checked_on"], as_dict=True
+		)
+		self.assertEqual(driver_values.custom_driving_license_verified, 1)
+		self.assertEqual(getdate(driver_values.expiry_date), getdate("2040-01-01"))
+		self.assertTrue(driver_values.custom_dl_last_checked_on)
+
+		vehicle_values = frappe.db.get_value(
+			"Vehicle", vehicle, ["custom_rc_verified", "custom_rc_blacklist_status", "custom_rc_last_checked_on"], as_dict=True
+		)
+		self.assertEqual(vehicle_values.custom_rc_verified, 1)
+		self.assertEqual(vehicle_values.custom_rc_blacklist_status, "NA")
+		self.assertTrue(vehicle_values.custom_rc_last_checked_on)
+
+	def test_failed_records_are_backed_off(self):
+		failing = make_driver()
+		with MockSignzyServer(error_rate=1) as server, use_mock_connector(server.url) as config:
+			self.assertEqual(frappe.new_doc("Signzy Fleet Sweep").run_batch([["Driver", failing]], config), (0, 1))
+
+		self.assertEqual(frappe.db.get_value("Driver", failing, "custom_dl_check_failures"), 1)
+		never_checked = make_driver()
+		config = frappe._dict(fleet_sweep_recheck_days=30, fleet_sweep_expiry_window=30)
+
+		# Not retried the next day, after two days only behind the records without failures
+		frappe.db.set_value("Driver", failing, "custom_dl_last_attempted_on", add_days(now_datetime(), -1))
+		self.assertNotIn(["Driver", failing], get_sweep_queue(config))
+
+		frappe.db.set_value("Driver", failing, "custom_dl_last_attempted_on", add_days(now_datetime(), -3))
+		queue = get_sweep_queue(config)
+		self.assertGreater(queue.index(["Driver", failing]), queue.index(["Driver", never_checked]))
+
+
+def make_driver(expiry_date=None, last_checked_on=None) -> str:
+	"""Inserts a Driver the sweep picks up, with a random licence number, and returns its name."""
+	driver = frappe.get_doc({
+		"doctype": "Driver",
+		"full_name": "Sweep Test Driver",
+		"license_number": f"KA012020{random.randint(0, 9999999):07d}",
+		"issuing_date": "2020-01-01",
+		"custom_date_of_birth": "1990-01-01",
+		"expiry_date": expiry_date
+	}).insert(ignore_mandatory=True)
+	if last_checked_on:
+		frappe.db.set_value("Driver", driver.name, "custom_dl_last_checked_on", last_checked_on)
+	return driver.name
+
+
+def make_vehicle(expiry_date=None, last_checked_on=None) -> str:
+	"""Inserts a Vehicle with a random registration number and returns its name."""
+	vehicle = frappe.get_doc({
+		"doctype": "Vehicle",
+		"license_plate": f"KA{random.randint(1, 99):02d}SW{random.randint(0, 9999):04d}",
+		"custom_rc_expiry_date": expiry_date
+	}).insert(ignore_mandatory=True)
+	if last_checked_on:
+		frappe.db.set_value("Vehicle", vehicle.name, "custom_rc_last_checked_on", last_checked_on)
+	return vehicle.name
+
+
+def make_sweep(queue: list, position: int = 0) -> SignzyFleetSweep:
+	return frappe.get_doc({
+		"doctype": "Signzy Fleet Sweep",
+		"status": "Running",
+		"started_on": now_datetime(),
+		"total": len(queue),
+		"position": position,
+		"queue": json.dumps(queue)
+	}).insert(ignore_permissions=True)
@@ -0,0 +1,44 @@
+// Copyright (c) 2024, Aerele and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Signzy API Usage Summary"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.month_start(),
+			reqd: 1,
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+			reqd: 1,
+		},
+		{
+			fieldname: "api_method",
+			label: __("API Method"),
+			fieldtype: "Select",
+			options: [
+				"",
+				"Verify Aadhaar",
+				"Verify Aadhaar - OCR",
+				"Generate OTP",
+				"Submit OTP",
+				"Verify Driving License",
+				"Verify Driving License Details",
+				"Verify PAN",
+				"Verify UPI",
+				"Verify Bank Account",
+				"Verify Vehicle RC",
+			],
+		},
+		{
+			fieldname: "group_by_day",
+			label: __("Group by Day"),
+			fieldtype: "Check",
+		},
+	],
+};
@@ -0,0 +1,107 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	columns = get_columns(filters)
+	data = get_data(filters)
+	chart = get_chart(data)
+	if data:
+		data.append(get_total_row(data))
+	return columns, data, None, chart
+
+
+def get_columns(filters) -> list:
+	columns = []
+	if filters.group_by_day:
+		columns.append({"fieldname": "date", "label": _("Date"), "fieldtype": "Date", "width": 110})
+
+	columns += [
+		{"fieldname": "api_method", "label": _("API Method"), "fieldtype": "Data", "width": 220},
+		{"fieldname": "calls", "label": _("Calls"), "fieldtype": "Int", "width": 100},
+		{"fieldname": "succeeded", "label": _("Successful"), "fieldtype": "Int", "width": 110},
+		{"fieldname": "client_errors", "label": _("Client Errors (4xx)"), "fieldtype": "Int", "width": 140},
+		{"fieldname": "server_errors", "label": _("Server Errors (5xx or No Response)"), "fieldtype": "Int", "width": 220},
+		{"fieldname": "failure_rate", "label": _("Failure %"), "fieldtype": "Percent", "width": 100},
+		{"fieldname": "avg_latency", "label": _("Avg Latency (Seconds)"), "fieldtype": "Float", "precision": 3, "width": 160},
+		{"fieldname": "response_kb", "label": _("Response Data (KB)"), "fieldtype": "Float", "precision": 1, "width": 150},
+	]
+	return columns
+
+
+def get_data(filters) -> list:
+	"""Sums the daily rollups, so the cost depends on the number of days and APIs, not on calls."""
+	conditions = ""
+	if filters.api_method:
+		conditions += " and `api_method` = %(api_method)s"
+
+	group_by = "`date`, `api_method`" if filters.group_by_day else "`api_method`"
+
+	rows = frappe.db.sql(
+		f""" SELECT
+			{"`date`," if filters.group_by_day else ""}
+			`api_method`,
+			SUM(`calls`) AS calls,
+			SUM(CASE WHEN `status_class` = '2xx' THEN `calls` ELSE 0 END) AS succeeded,
+			SUM(CASE WHEN `status_class` = '4xx' THEN `calls` ELSE 0 END) AS client_errors,
+			SUM(CASE WHEN `status_class` IN ('5xx', 'Error') THEN `calls` ELSE 0 END) AS server_errors,
+			SUM(`latency_sum`) AS latency_sum,
+			SUM(`response_bytes`) AS response_bytes
+		FROM `tabSignzy API Usage`
+		WHERE `date` BETWEEN %(from_date)s AND %(to_date)s {conditions}
+		GROUP BY {group_by}
+		ORDER BY {group_by}
+	""",
+		filters,
+		as_dict=True
+	)
+
+	for row in rows:
+		set_rates(row)
+
+	return rows
+
+
+def get_total_row(data: list) -> frappe._dict:
+	"""Totals the counts and derives the rates from them, weighting every API by its calls."""
+	total = frappe._dict(api_method=_("Total"), bold=1)
+	for fieldname in ("calls", "succeeded", "client_errors", "server_errors", "latency_sum", "response_bytes"):
+		total[fieldname] = sum(flt(row[fieldname]) for row in data)
+
+	set_rates(total)
+	return total
+
+
+def set_rates(row: dict):
+	calls = flt(row.calls)
+	row.failure_rate = (calls - flt(row.succeeded)) / calls * 100 if calls else 0
+	row.avg_latency = flt(row.latency_sum) / calls if calls else 0
+	row.response_kb = flt(row.response_bytes) / 1024
+
+
+def get_chart(data: list) -> dict | None:
+	if not data:
+		return None
+
+	totals = {}
+	for row in data:
+		total = totals.setdefault(row.api_method, [0, 0])
+		total[0] += flt(row.succeeded)
+		total[1] += flt(row.calls) - flt(row.succeeded)
+
+	return {
+		"data": {
+			"labels": list(totals),
+			"datasets": [
+				{"name": _("Successful"), "values": [total[0] for total in totals.values()]},
+				{"name": _("Failed"), "values": [total[1] for total in totals.values()]},
+			],
+		},
+		"type": "bar",
+		"barOptions": {"stacked": 1},
+	}
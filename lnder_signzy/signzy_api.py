@@ -2,115 +2,105 @@
 # For license information, please see license.txt
 
 import frappe
-from typing import Final
-import requests
 from frappe import _
-from frappe.utils import get_url, getdate
-import re
-import json
-from lnder_signzy.lnder_signzy.doctype.signzy_api_request_log.signzy_api_request_log import create_log as signzy_api_log
+from frappe.utils import cint
+from lnder_signzy import signzy_async, signzy_endpoints, signzy_validators, signzy_writeback
+from lnder_signzy.signzy_bulk import run_bulk
+from lnder_signzy.signzy_client import make_request
+from lnder_signzy.signzy_jobs import enqueue_verification
+
+# The API behind each check of `verify_employee_kyc`
+EMPLOYEE_KYC_APIS = {
+	"pan": "Verify PAN",
+	"aadhaar": "Verify Aadhaar",
+	"aadhaar_ocr": "Verify Aadhaar - OCR",
+}
+
+# Items a bulk verification runs within the web request; larger batches are queued as a background job
+MAX_SYNC_BULK_ITEMS = 50
+
+# Verifications with a bulk endpoint, by the name of their function
+BULK_VERIFICATIONS = ("verify_pan", "verify_bank_acc")
 
 
 @frappe.whitelist()
-def verify_aadhaar(aadhaar_no: str):
+def verify_aadhaar(aadhaar_no: str, doctype: str | None = None, docname: str | None = None):
 	"""
 	Verifies an Aadhaar number using the Signzy API.
 
 	Args:
 		aadhaar_no (str): The Aadhaar number to verify.
+		doctype (str, optional): With docname, the document to save the result on. A compact status is then returned instead of the Signzy response.
+		docname (str, optional): The name of that document.
 	"""
-	
-	def validate_aadhaar_input(pattern: str, value: str) -> bool:
-		"""Validate the Aadhaar number format using a regex pattern."""
-		import re
-		return bool(re.match(pattern, value))
-
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	# Validate the Aadhaar number format
-	if not validate_aadhaar_input(pattern=r'^[2-9]{1}[0-9]{11}$', value=aadhaar_no):
-		frappe.throw(title="KYC API Error", msg=_("Aadhaar Number is not valid"))
-
-	# Prepare the API request
-	url = f"{connector_doc.url}/aadhaar/verify"
-	payload = json.dumps({"uid": aadhaar_no})
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-
-	# Make the API request
-	response = requests.post(url, headers=headers, data=payload)
-	print(response)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Verify Aadhaar",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
-	)
-
-	# Handle the API response
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		error_message = response.json().get("error", {}).get("message", response.json().get("message", "Unknown error"))
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
-
+	return verify(signzy_endpoints.verify_aadhaar, doctype, docname, aadhaar_no=aadhaar_no)
 
 
 @frappe.whitelist()
-def verify_aadhaar_ocr(front_url: str, back_url: str):
+def verify_aadhaar_ocr(
+	front_url: str,
+	back_url: str,
+	run_in_background: bool = False,
+	doctype: str | None = None,
+	docname: str | None = None
+):
 	"""
 	Verifies Aadhaar card details using OCR (Optical Character Recognition).
 	Args:
 		front_url (str): URL of the front image of the Aadhaar card.
 		back_url (str, optional): URL of the back image of the Aadhaar card. Defaults to None.
+		run_in_background (bool, optional): Queue the call and return a job id; the result is pushed over realtime. Defaults to False.
+		doctype (str, optional): With docname, the document to save the result on. A compact status is then returned instead of the Signzy response.
+		docname (str, optional): The name of that document.
 	"""
+	if cint(run_in_background):
+		return enqueue_verification(
+			"lnder_signzy.signzy_api.verify_aadhaar_ocr", front_url=front_url, back_url=back_url, doctype=doctype, docname=docname
+		)
 
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	url = f"{connector_doc.url}/aadhaar/extraction"
-	files = [get_url() + front_url, get_url() + back_url]
-	payload = json.dumps({
-		"files" : files
-	})
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-	# Make the API request
-	response = requests.post(url, headers=headers, data=payload)
-
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Verify Aadhaar - OCR",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
-	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
+	return verify(signzy_endpoints.verify_aadhaar_ocr, doctype, docname, front_url=front_url, back_url=back_url)
+
+
+@frappe.whitelist()
+def verify_employee_kyc(employee: str):
+	"""
+	Runs every applicable KYC check for an Employee (PAN, Aadhaar and Aadhaar OCR) in parallel
+	and saves the results on the Employee.
+
+	A check is skipped when the Employee is missing its inputs. Mobile verification is not
+	included as it needs the user to enter an OTP.
+
+	Args:
+		employee (str): The Employee name.
+
+	Returns:
+		dict: {"pan" | "aadhaar" | "aadhaar_ocr": dict with "status" and either the compact status
+			of `signzy_writeback.apply` or "error"}
+	"""
+	doc = frappe.get_doc("Employee", employee)
+	doc.check_permission("write")
+
+	checks = {}
+	if doc.get("custom_pan") and doc.employee_name and doc.date_of_birth:
+		checks["pan"] = ("verify_pan", {"pan": doc.custom_pan, "name": doc.employee_name, "dob": doc.date_of_birth})
+	if doc.get("custom_aadhar_number"):
+		checks["aadhaar"] = ("verify_aadhaar", {"aadhaar_no": doc.custom_aadhar_number})
+	if doc.get("custom_aadhar_card_front_image") and doc.get("custom_aadhar_card_back_image"):
+		checks["aadhaar_ocr"] = ("verify_aadhaar_ocr", {
+			"front_url": doc.custom_aadhar_card_front_image,
+			"back_url": doc.custom_aadhar_card_back_image
+		})
+
+	if not checks:
+		frappe.throw(_("Enter the PAN, Aadhaar Number or Aadhaar card images to verify"))
+
+	outcomes = signzy_async.run_together(checks)
+	for key, outcome in outcomes.items():
+		if outcome["status"] == "Success":
+			response = outcome.pop("result")
+			outcome.update(signzy_writeback.apply(EMPLOYEE_KYC_APIS[key], "Employee", employee, response.get("result") or {}))
+
+	return outcomes
 
 
 @frappe.whitelist()
@@ -121,52 +111,21 @@ def generate_otp(country_code: str , mobile_no: str):
 		country_code (str): The country code (e.g., "91" for India).
 		mobile_no (str): The mobile number to verify.
 	"""
-
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	url = f"{connector_doc.url}/phone/generateOtp"
-
-	payload = json.dumps({
-		"countryCode": country_code,
-		"mobileNumber": mobile_no
-	})
-
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-
-	response = requests.post(url, headers=headers, data=payload)
-	print(response.text)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Generate OTP",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
-	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-		frappe.response["generated_otp"] = True
-		frappe.response["mobile_no"] = mobile_no
-		frappe.response["country_code"] = country_code
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
+	frappe.response["message"] = make_request(**signzy_endpoints.generate_otp(country_code, mobile_no))
+	frappe.response["generated_otp"] = True
+	frappe.response["mobile_no"] = mobile_no
+	frappe.response["country_code"] = country_code
 
 
 @frappe.whitelist()
-def submit_otp(country_code: str, mobile_no: str, reference_id: str, otp: str):
+def submit_otp(
+	country_code: str,
+	mobile_no: str,
+	reference_id: str,
+	otp: str,
+	doctype: str | None = None,
+	docname: str | None = None
+):
 	"""
 	Submits the OTP for mobile number verification.
 
@@ -175,95 +134,33 @@ def submit_otp(country_code: str, mobile_no: str, reference_id: str, otp: str):
 		mobile_no (str): The mobile number being verified.
 		reference_id (str): The reference ID received during OTP generation.
 		otp (str): The OTP to submit.
+		doctype (str, optional): With docname, the document to save the result on. A compact status is then returned instead of the Signzy response.
+		docname (str, optional): The name of that document.
 	"""
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	url = f"{connector_doc.url}/phone/getNumberDetails"
-
-	payload = json.dumps({
-		"countryCode": country_code,
-		"mobileNumber": mobile_no,
-		"referenceId": reference_id,
-		"otp": otp,
-		"extraFields": False
-	})
-
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-
-	response = requests.post(url, headers=headers, data=payload)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Submit OTP",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
+	return verify(
+		signzy_endpoints.submit_otp,
+		doctype,
+		docname,
+		country_code=country_code,
+		mobile_no=mobile_no,
+		reference_id=reference_id,
+		otp=otp
 	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
 
 
 @frappe.whitelist()
-def verify_dl(dl_number: str, dob: str, issue_date: str):
+def verify_dl(dl_number: str, dob: str, issue_date: str, doctype: str | None = None, docname: str | None = None):
 	"""
 	Verifies a Driving License (DL) using the Signzy API.
 	Args:
 		dl_number (str): The driving license number.
 		dob (str): The date of birth in 'YYYY-MM-DD' format.
 		issue_date (str): The issue date of the DL in 'YYYY-MM-DD' format.
+		doctype (str, optional): With docname, the document to save the result on. A compact status is then returned instead of the Signzy response.
+		docname (str, optional): The name of that document.
 	"""
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	dob = getdate(dob).strftime('%d/%m/%Y')
-	issue_date = getdate(issue_date).strftime('%d/%m/%Y')
-	url = f"{connector_doc.url}/dl_/verification"
-	payload = json.dumps({
-		"number": dl_number,
-		"dob": dob,
-		"issueDate": issue_date
-	})
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-	response = requests.post(url, headers=headers, data=payload)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Verify Driving License",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
-	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
+	return verify(signzy_endpoints.verify_dl, doctype, docname, dl_number=dl_number, dob=dob, issue_date=issue_date)
+
 
 @frappe.whitelist()
 def extract_dl(dl_number: str, dob: str):
@@ -273,48 +170,11 @@ def extract_dl(dl_number: str, dob: str):
 		dl_number (str): The driving license number.
 		dob (str): The date of birth in 'YYYY-MM-DD' format.
 	"""
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	dob = getdate(dob).strftime('%d/%m/%Y')
-	url = f"{connector_doc.url}/dl_number/based_search"
-
-	payload = json.dumps({
-		"number": dl_number,
-		"dob": dob
-	})
-
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-
-	response = requests.post(url, headers=headers, data=payload)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Verify Driving License Details",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
-	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
+	return make_request(**signzy_endpoints.extract_dl(dl_number, dob))
 
 
 @frappe.whitelist()
-def verify_pan(pan: str, name: str, dob: str):
+def verify_pan(pan: str, name: str, dob: str, doctype: str | None = None, docname: str | None = None):
 	"""
 	Verifies a PAN (Permanent Account Number) using the Signzy API.
 
@@ -322,100 +182,52 @@ def verify_pan(pan: str, name: str, dob: str):
 		pan (str): The PAN number.
 		name (str): The name associated with the PAN.
 		dob (str): The date of birth in 'YYYY-MM-DD' format.
+		doctype (str, optional): With docname, the document to save the result on. A compact status is then returned instead of the Signzy response.
+		docname (str, optional): The name of that document.
 	"""
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	dob = getdate(dob).strftime('%d/%m/%Y')
-	url = f"{connector_doc.url}/pan/verify"
-
-	payload = json.dumps({
-		"pan": pan,
-		"name": name,
-		"dob": dob
-	})
-
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-
-	response = requests.post(url, headers=headers, data=payload)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Verify PAN",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
-	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
+	return verify(signzy_endpoints.verify_pan, doctype, docname, pan=pan, name=name, dob=dob)
+
+
+@frappe.whitelist()
+def verify_pan_bulk(items: str | list):
+	"""
+	Verifies many PANs concurrently.
+
+	Args:
+		items (str | list): A list (or JSON list) of dicts holding the arguments of `verify_pan`.
+
+	Returns:
+		list | dict: One dict per item, in input order, with "status" and either "result" or "error".
+			Above MAX_SYNC_BULK_ITEMS items, the job id of the background job running them; that list
+			is then pushed over realtime.
+	"""
+	return verify_bulk("verify_pan", frappe.parse_json(items))
 
 
 @frappe.whitelist()
-def verify_upi(vpa:str, name:str):
-	print("ddddddddddddddddddddddd")
+def verify_upi(vpa: str, name: str, doctype: str | None = None, docname: str | None = None):
 	"""
 	Verifies a UPI (Unified Payments Interface) ID using the Signzy API.
 
 	Args:
 		vpa (str): The Virtual Payment Address (VPA) to verify.
 		name (str): The name to match with the VPA.
+		doctype (str, optional): With docname, the document to save the result on. A compact status is then returned instead of the Signzy response.
+		docname (str, optional): The name of that document.
 	"""
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	fuzzy = False
-	url = f"{connector_doc.url}/bankAccountVerification/upiVerifications"
-	payload = json.dumps({
-		"vpa" : vpa,
-		"name" : name,
-		"fuzzy" : fuzzy
-	})
-
-	headers = {
-	'Authorization': connector_doc.get_password("authorization"),
-	'Content-Type': 'application/json'
-	}
-
-	response = requests.post(url, headers=headers, data=payload)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Verify UPI",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
-	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
+	return verify(signzy_endpoints.verify_upi, doctype, docname, vpa=vpa, name=name)
 
 
 @frappe.whitelist()
-def verify_bank_acc(acc_no: str, ifsc_code: str, mobile_no: str, name: str ,email: str = None):
+def verify_bank_acc(
+	acc_no: str,
+	ifsc_code: str,
+	mobile_no: str,
+	name: str,
+	email: str = None,
+	doctype: str | None = None,
+	docname: str | None = None
+):
 	"""
 	Verifies a bank account using the Signzy API.
 
@@ -425,90 +237,102 @@ def verify_bank_acc(acc_no: str, ifsc_code: str, mobile_no: str, name: str ,emai
 		mobile_no (str): The mobile number associated with the bank account.
 		name (str): The name associated with the bank account.
 		email (str, optional): The email address associated with the bank account. Defaults to None.
+		doctype (str, optional): With docname, the document to save the result on. A compact status is then returned instead of the Signzy response.
+		docname (str, optional): The name of that document.
 	"""
-
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	url = f"{connector_doc.url}/bankaccountverifications/advancedverification"
-
-	payload = {
-		"beneficiaryAccount": acc_no,
-		"beneficiaryIFSC": ifsc_code,
-		"beneficiaryMobile": mobile_no,
-		"beneficiaryName": name
-	}
-
-	if email:
-		payload["email"] = email
-	payload = json.dumps(payload)
-
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-
-	response = requests.post(url, headers=headers, data=payload)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Verify Bank Account",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
+	return verify(
+		signzy_endpoints.verify_bank_acc,
+		doctype,
+		docname,
+		acc_no=acc_no,
+		ifsc_code=ifsc_code,
+		mobile_no=mobile_no,
+		name=name,
+		email=email
 	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
 
 
 @frappe.whitelist()
-def verify_rc(vehicle_no: str):
-	# Fetch the Signzy Connector details
-	connector_doc = frappe.get_single("Signzy Connector")
-	
-	# Check if the connector configuration is valid
-	if not (connector_doc.url and connector_doc.authorization):
-		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
-
-	url = f"{connector_doc.url}/vehicle/detailedsearches"
-
-	payload = json.dumps({
-		"vehicleNumber": vehicle_no,
-		"blacklistCheck": "true",
-		"splitAddress": "true"
-	})
-
-	headers = {
-		'Authorization': connector_doc.get_password("authorization"),
-		'Content-Type': 'application/json'
-	}
-
-	response = requests.post(url, headers=headers, data=payload)
-	# Log the API request and response
-	signzy_api_log(
-		api_name="Verify Vehicle RC",
-		api_endpoint=url,
-		api_request_header=headers,
-		api_request_data=payload,
-		api_response=response.text,
-		api_response_status_code=response.status_code
-	)
-	if response.ok:
-		frappe.response["message"] = response.json()
-	else:
-		if ("error" in response.json()):
-			error_message = response.json().get("error").get("message")
-		else:
-			error_message = response.json().get("message")
-		frappe.throw(title="Signzy API Error", msg=_(f"{error_message}"))
+def verify_bank_acc_bulk(items: str | list):
+	"""
+	Verifies many bank accounts concurrently.
+
+	Args:
+		items (str | list): A list (or JSON list) of dicts holding the arguments of `verify_bank_acc`.
+
+	Returns:
+		list | dict: One dict per item, in input order, with "status" and either "result" or "error".
+			Above MAX_SYNC_BULK_ITEMS items, the job id of the background job running them; that list
+			is then pushed over realtime.
+	"""
+	return verify_bulk("verify_bank_acc", frappe.parse_json(items))
+
+
+@frappe.whitelist()
+def verify_rc(
+	vehicle_no: str,
+	run_in_background: bool = False,
+	doctype: str | None = None,
+	docname: str | None = None
+):
+	"""
+	Fetches vehicle RC details, including blacklist status, using the Signzy API.
+
+	Args:
+		vehicle_no (str): The vehicle registration number.
+		run_in_background (bool, optional): Queue the call and return a job id; the result is pushed over realtime. Defaults to False.
+		doctype (str, optional): With docname, the document to save the result on. A compact status is then returned instead of the Signzy response.
+		docname (str, optional): The name of that document.
+	"""
+	if cint(run_in_background):
+		# Reject a malformed number now rather than in the job
+		vehicle_no = signzy_validators.validate_rc(vehicle_no)
+		return enqueue_verification(
+			"lnder_signzy.signzy_api.verify_rc", vehicle_no=vehicle_no, doctype=doctype, docname=docname
+		)
+
+	return verify(signzy_endpoints.verify_rc, doctype, docname, vehicle_no=vehicle_no)
+
+
+def verify(build_request, doctype: str | None, docname: str | None, **inputs) -> dict:
+	"""
+	Makes a verification and, when a document is given, saves its result there in the same
+	transaction and returns a compact status in place of the Signzy response.
+
+	Args:
+		build_request (callable): The `signzy_endpoints` builder of the verification.
+		doctype (str | None): The doctype of the document to save the result on.
+		docname (str | None): The name of that document.
+		**inputs: The builder's arguments. With a document, they must match the document's own values.
+	"""
+	request = build_request(**inputs)
+	if not (doctype and docname):
+		return make_request(**request)
+
+	# Checked before the call, so an unsupported target or a missing permission costs nothing
+	signzy_writeback.check_writeback(request.api_name, doctype, docname, inputs)
+	response = make_request(**request)
+	return signzy_writeback.apply(request.api_name, doctype, docname, response.get("result") or {})
+
+
+def verify_bulk(verification: str, items: list) -> list | dict:
+	"""
+	Runs a batch within the request when it is small, or queues it so that a large one does not
+	hold a web worker for minutes.
+
+	Args:
+		verification (str): One of BULK_VERIFICATIONS, e.g. "verify_pan".
+		items (list): Dicts holding the verification's arguments.
+	"""
+	if len(items) > MAX_SYNC_BULK_ITEMS:
+		return enqueue_verification("lnder_signzy.signzy_api.run_bulk_verification", verification=verification, items=items)
+
+	return run_bulk_verification(verification, items)
+
+
+def run_bulk_verification(verification: str, items: list) -> list:
+	"""Runs a batch of `verify_bulk`, within the request or in the background job it queued."""
+	if verification not in BULK_VERIFICATIONS:
+		frappe.throw(title="Signzy API Error", msg=_("{0} cannot be run in bulk").format(verification))
+
+	return run_bulk(frappe.get_attr(f"lnder_signzy.signzy_api.{verification}"), items)
@@ -0,0 +1,378 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+"""
+An asyncio engine for high fan-out Signzy workloads, such as bulk imports and scheduled sweeps,
+where one worker keeps hundreds of calls in flight instead of one per thread.
+
+	async with AsyncSignzyClient(concurrency=64) as client:
+		results = await client.map("verify_pan", items)
+
+	results = run_many("verify_pan", items, concurrency=64)
+
+Requests are built by `signzy_endpoints` and responses are handled by `signzy_client.handle_response`,
+so payloads, error messages, logs, metrics, the circuit breaker, rate limits and the result cache
+all behave exactly as on the synchronous path. Those helpers talk to Redis, and some builders do
+image work and read the database, so the client runs them in its own thread pool and the event loop
+only ever waits on the network. Identical calls are not
+coalesced across workers, since each waiting call would tie up one of those threads.
+"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from lnder_signzy import (
+	signzy_breaker,
+	signzy_cache,
+	signzy_endpoints,
+	signzy_json,
+	signzy_metrics,
+	signzy_rate_limiter,
+	signzy_router,
+	signzy_timing,
+)
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import db_lock, get_connector_config
+from lnder_signzy.signzy_client import (
+	DEFAULT_POOL_SIZE,
+	get_backoff_delay,
+	get_headers,
+	get_retry_policy,
+	get_timeout,
+	handle_connection_error,
+	handle_response,
+)
+
+DEFAULT_CONCURRENCY = 32
+
+# Errors raised before the request went out, the only ones safe to retry; aiohttp tells a connect
+# timeout apart from a read timeout as of 3.10
+CONNECT_ERRORS = (aiohttp.ClientConnectorError,) + (
+	(aiohttp.ConnectionTimeoutError,) if hasattr(aiohttp, "ConnectionTimeoutError") else ()
+)
+
+# Every endpoint of `signzy_api`, by the name of its request builder
+ENDPOINTS = (
+	"verify_aadhaar",
+	"verify_aadhaar_ocr",
+	"generate_otp",
+	"submit_otp",
+	"verify_dl",
+	"extract_dl",
+	"verify_pan",
+	"verify_upi",
+	"verify_bank_acc",
+	"verify_rc",
+)
+
+
+class AsyncSignzyClient:
+	"""
+	Makes Signzy calls concurrently on one event loop over a pooled aiohttp session.
+
+	At most `concurrency` calls are in flight at a time. Cancelling a task cancels its call,
+	including any retry backoff or rate limit wait it is in. The cache, circuit breaker, router,
+	rate limiter and request log run in a pool of as many threads, off the event loop.
+
+	Args:
+		concurrency (int, optional): Calls in flight at a time. Defaults to the connector's Bulk Concurrency, or 32.
+		rate_limit_wait (float, optional): Seconds a call waits for a rate limit token, 0 to reject at once.
+			Defaults to the connector's Rate Limit Max Wait.
+	"""
+
+	def __init__(self, concurrency: int | None = None, rate_limit_wait: float | None = None):
+		self.config = get_connector_config()
+		if not self.config.endpoints:
+			frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
+
+		self.concurrency = cint(concurrency) or cint(self.config.bulk_concurrency) or DEFAULT_CONCURRENCY
+		self.rate_limit_wait = rate_limit_wait
+		self._semaphore = None
+		self._session = None
+		self._executor = None
+
+	async def __aenter__(self) -> "AsyncSignzyClient":
+		self._semaphore = asyncio.Semaphore(self.concurrency)
+		self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="signzy-async")
+		self._session = aiohttp.ClientSession(
+			connector=aiohttp.TCPConnector(limit=max(self.concurrency, cint(self.config.pool_size) or DEFAULT_POOL_SIZE))
+		)
+		return self
+
+	async def __aexit__(self, *args):
+		await self._session.close()
+		self._executor.shutdown(wait=False)
+
+	async def call(self, endpoint_name: str, **kwargs) -> dict:
+		"""
+		Calls one endpoint and returns the parsed response.
+
+		Args:
+			endpoint_name (str): One of `ENDPOINTS`, e.g. "verify_pan".
+			**kwargs: The endpoint's arguments, as for the matching `signzy_api` function.
+		"""
+		if endpoint_name not in ENDPOINTS:
+			frappe.throw(_("Unknown Signzy endpoint {0}").format(endpoint_name))
+
+		return await self.request(**await self._run_blocking(build_request, endpoint_name, kwargs))
+
+	async def request(self, api_name: str, endpoint: str, payload: dict, cache_inputs: dict | None = None) -> dict:
+		"""
+		The asyncio counterpart of `signzy_client.make_request`.
+
+		Args:
+			api_name (str): The API method name used for logging and per-API settings.
+			endpoint (str): The path appended to the connector URL, e.g. "/pan/verify".
+			payload (dict): The request body.
+			cache_inputs (dict, optional): What identifies the result for caching, when that is not the payload itself.
+		"""
+		started_at = time.perf_counter()
+		timer = signzy_timing.PhaseTimer()
+		timer.sample(self.config)
+
+		cache_key = None
+		cache_ttl = signzy_cache.get_ttl(self.config, api_name)
+		if cache_ttl:
+			with timer.measure("cache"):
+				cache_key, cached_result = await self._run_blocking(get_cached_result, api_name, cache_inputs or payload)
+			if cached_result is not None:
+				signzy_metrics.observe(api_name, time.perf_counter() - started_at, "cache")
+				return cached_result
+
+		async with self._semaphore:
+			result = await self._send(api_name, endpoint, payload, started_at, timer)
+
+		if cache_ttl:
+			await self._run_blocking(signzy_cache.set_result, cache_key, result, cache_ttl)
+		return result
+
+	async def map(self, endpoint_name: str, items: list) -> list:
+		"""
+		Calls one endpoint once per item, concurrently.
+
+		Args:
+			endpoint_name (str): One of `ENDPOINTS`, e.g. "verify_pan".
+			items (list): Dicts holding the endpoint's arguments.
+
+		Returns:
+			list: One dict per item, in input order, with "status" and either "result" or "error",
+				as `signzy_bulk.run_bulk` returns.
+		"""
+		tasks = [asyncio.create_task(self._call_item(index, endpoint_name, item)) for index, item in enumerate(items)]
+		try:
+			return await asyncio.gather(*tasks)
+		except BaseException:
+			# Cancelled or failed: stop everything still in flight before giving up
+			for task in tasks:
+				task.cancel()
+			await asyncio.gather(*tasks, return_exceptions=True)
+			raise
+
+	async def _call_item(self, index: int, endpoint_name: str, item: dict) -> dict:
+		try:
+			result = await self.call(endpoint_name, **item)
+		except frappe.ValidationError as e:
+			frappe.clear_last_message()
+			return {"index": index, "status": "Failed", "error": str(e)}
+		except Exception as e:
+			frappe.log_error(title=_("Signzy Async Call Failed"))
+			return {"index": index, "status": "Failed", "error": str(e)}
+
+		return {"index": index, "status": "Success", "result": result}
+
+	async def _send(self, api_name: str, endpoint: str, payload: dict, started_at: float, timer: signzy_timing.PhaseTimer) -> dict:
+		data = signzy_json.dumps(payload)
+		upstream, status_code, content, error = await self._post_with_retry(api_name, endpoint, data, timer)
+
+		url = f"{upstream.url}{endpoint}"
+		headers = get_headers(upstream)
+		if error is not None:
+			await self._run_blocking(handle_connection_error, self.config, api_name, url, headers, data, error, started_at, timer)
+
+		return await self._run_blocking(
+			handle_response, self.config, api_name, url, headers, data, status_code, content, started_at, timer
+		)
+
+	async def _post_with_retry(self, api_name: str, endpoint: str, data: str, timer: signzy_timing.PhaseTimer) -> tuple:
+		"""
+		The asyncio counterpart of `signzy_client.post_with_retry`, returning the connector endpoint
+		of the last attempt, its status code and body, and the connection error it ended with.
+		"""
+		policy = get_retry_policy(self.config, api_name)
+		connect_timeout, read_timeout = get_timeout(self.config, api_name)
+		deadline = time.monotonic() + policy.deadline
+
+		upstream = status_code = content = error = None
+		attempt = 0
+		while True:
+			attempt += 1
+
+			# Fail fast without a call or a log row while Signzy is known to be down; a retry with
+			# nowhere left to go ends with what the previous attempt got
+			try:
+				with timer.measure("breaker"):
+					candidate = await self._run_blocking(
+						choose_endpoint, self.config, api_name, upstream.id if upstream else None
+					)
+			except signzy_breaker.SignzyUnavailableError:
+				if upstream is None:
+					raise
+				return upstream, status_code, content, error
+			upstream = candidate
+
+			# Every attempt counts against the contracted rate, retries included
+			with timer.measure("rate_limit"):
+				await self._acquire_token(api_name, deadline, upstream.id)
+
+			remaining = max(deadline - time.monotonic(), 0.1)
+			timeout = aiohttp.ClientTimeout(total=remaining, sock_connect=connect_timeout, sock_read=read_timeout)
+
+			retry_after, retryable = None, True
+			await self._run_blocking(signzy_router.begin, upstream)
+			try:
+				with timer.measure("upstream"):
+					sent_at = time.perf_counter()
+					async with self._session.post(
+						f"{upstream.url}{endpoint}", headers=get_headers(upstream), data=data, timeout=timeout
+					) as response:
+						timer.add("first_byte", time.perf_counter() - sent_at)
+						status_code, content, error = response.status, await response.read(), None
+						retry_after = response.headers.get("Retry-After")
+			except CONNECT_ERRORS as e:
+				status_code, content, error = None, None, e
+			# Read timeouts and dropped connections: Signzy may have billed the call already
+			except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+				status_code, content, error, retryable = None, None, e, False
+			except BaseException:
+				signzy_router.end(self.config, upstream)
+				raise
+
+			failed = signzy_breaker.is_upstream_failure(status_code)
+			await self._run_blocking(record_outcome, self.config, api_name, upstream, failed)
+
+			if status_code is not None and status_code not in policy.retry_status_codes:
+				return upstream, status_code, content, None
+			if attempt >= policy.max_attempts or not retryable:
+				return upstream, status_code, content, error
+
+			delay = get_backoff_delay(policy, attempt, retry_after)
+			if time.monotonic() + delay >= deadline:
+				if status_code is None:
+					error = asyncio.TimeoutError(f"Signzy request deadline of {policy.deadline}s exceeded")
+				return upstream, status_code, content, error
+
+			signzy_metrics.record_retry(api_name)
+			with timer.measure("backoff"):
+				await asyncio.sleep(delay)
+
+	async def _acquire_token(self, api_name: str, deadline: float, endpoint_id: str | None = None):
+		give_up_at = signzy_rate_limiter.get_give_up_at(self.config, self.rate_limit_wait, deadline)
+		while True:
+			wait = await self._run_blocking(signzy_rate_limiter.try_acquire, self.config, api_name, endpoint_id)
+			if not wait:
+				return
+
+			if time.monotonic() + wait > give_up_at:
+				signzy_rate_limiter.throw_rate_limited(api_name)
+
+			await asyncio.sleep(wait)
+
+	async def _run_blocking(self, func, *args):
+		"""Runs a Redis bound helper in the client's thread pool, with the caller's site context."""
+		context = contextvars.copy_context()
+		return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(context.run, func, *args))
+
+
+def build_request(endpoint_name: str, kwargs: dict) -> frappe._dict:
+	"""Runs an endpoint's request builder, one at a time as builders such as `verify_aadhaar_ocr` use the database."""
+	with db_lock:
+		return getattr(signzy_endpoints, endpoint_name)(**kwargs)
+
+
+def get_cached_result(api_name: str, inputs: dict) -> tuple:
+	"""Returns the cache key for a call and the result cached under it, if any."""
+	cache_key = signzy_cache.get_cache_key(api_name, inputs)
+	return cache_key, signzy_cache.get_result(api_name, cache_key)
+
+
+def choose_endpoint(config, api_name: str, avoid: str | None = None) -> frappe._dict:
+	"""Picks the endpoint for an attempt, raising SignzyUnavailableError if its circuit is open."""
+	candidate = signzy_router.choose(config, api_name, avoid=avoid)
+	signzy_breaker.before_call(config, api_name, candidate.id)
+	return candidate
+
+
+def record_outcome(config, api_name: str, upstream, failed: bool):
+	"""Releases an endpoint after an attempt and records the attempt with its circuit breaker."""
+	signzy_router.end(config, upstream, failed=failed)
+	if failed:
+		signzy_breaker.record_failure(config, api_name, upstream.id)
+	else:
+		signzy_breaker.record_success(config, api_name, upstream.id)
+
+
+def run_many(
+	endpoint_name: str,
+	items: list,
+	concurrency: int | None = None,
+	rate_limit_wait: float | None = None,
+	timeout: float | None = None
+) -> list:
+	"""
+	Runs `AsyncSignzyClient.map` to completion from synchronous code, e.g. a background job.
+
+	Args:
+		endpoint_name (str): One of `ENDPOINTS`, e.g. "verify_pan".
+		items (list): Dicts holding the endpoint's arguments.
+		concurrency (int, optional): Calls in flight at a time.
+		rate_limit_wait (float, optional): Seconds a call waits for a rate limit token.
+		timeout (float, optional): Seconds after which every call still in flight is cancelled
+			and asyncio.TimeoutError is raised.
+	"""
+
+	async def run():
+		async with AsyncSignzyClient(concurrency, rate_limit_wait) as client:
+			return await asyncio.wait_for(client.map(endpoint_name, items), timeout)
+
+	return asyncio.run(run())
+
+
+def run_together(
+	calls: dict,
+	concurrency: int | None = None,
+	rate_limit_wait: float | None = None,
+	timeout: float | None = None
+) -> dict:
+	"""
+	Runs several different endpoints at once from synchronous code, so the total time is close
+	to that of the slowest call rather than the sum of all of them.
+
+	Args:
+		calls (dict): {key: (endpoint name, dict of the endpoint's arguments)}.
+		concurrency (int, optional): Calls in flight at a time. Defaults to all of them.
+		rate_limit_wait (float, optional): Seconds a call waits for a rate limit token.
+		timeout (float, optional): Seconds after which every call still in flight is cancelled
+			and asyncio.TimeoutError is raised.
+
+	Returns:
+		dict: {key: dict with "status" and either "result" or "error"}.
+	"""
+
+	async def run():
+		async with AsyncSignzyClient(concurrency or len(calls), rate_limit_wait) as client:
+			return await asyncio.wait_for(
+				asyncio.gather(*(client._call_item(key, name, kwargs) for key, (name, kwargs) in calls.items())),
+				timeout
+			)
+
+	if not calls:
+		return {}
+
+	return {row.pop("index"): row for row in asyncio.run(run())}
@@ -0,0 +1,178 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import time
+
+import frappe
+from frappe import _
+
+from lnder_signzy.lnder_signzy.doctype.signzy_api_setting.signzy_api_setting import API_METHODS
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+
+CLOSED = "Closed"
+OPEN = "Open"
+HALF_OPEN = "Half Open"
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_FAILURE_WINDOW = 60
+DEFAULT_RECOVERY_TIMEOUT = 30
+
+
+class SignzyUnavailableError(frappe.ValidationError):
+	pass
+
+
+def is_upstream_failure(status_code: int | None) -> bool:
+	"""Returns True for outcomes that point at Signzy itself rather than at the request."""
+	return status_code is None or status_code == 429 or status_code >= 500
+
+
+def before_call(config, api_name: str, endpoint_id: str | None = None):
+	"""
+	Raises SignzyUnavailableError while the breaker for an API is open.
+
+	Once the recovery timeout has passed a single caller across all workers is let
+	through as a half-open probe; its outcome closes or re-opens the breaker.
+
+	Each endpoint of the connector has breakers of its own, so one failing credential
+	does not cut off the others.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+		endpoint_id (str, optional): The endpoint the call goes to, from `signzy_router.choose`.
+	"""
+	if not config.enable_circuit_breaker:
+		return
+
+	cache = frappe.cache()
+	state, opened_at = cache.mget([_key(api_name, "state", endpoint_id), _key(api_name, "opened_at", endpoint_id)])
+	if not state:
+		return
+
+	retry_in = int(float(opened_at or 0) + _recovery_timeout(config) - time.time())
+	if retry_in <= 0 and cache.set(_key(api_name, "probe", endpoint_id), 1, nx=True, ex=_recovery_timeout(config)):
+		cache.set(_key(api_name, "state", endpoint_id), HALF_OPEN)
+		return
+
+	frappe.throw(
+		title=_("Signzy Unavailable"),
+		msg=_("Signzy {0} is currently unavailable. Please try again in {1} seconds.").format(
+			_(api_name), max(retry_in, 1)
+		),
+		exc=SignzyUnavailableError
+	)
+
+
+def record_success(config, api_name: str, endpoint_id: str | None = None):
+	"""Closes the breaker for an API after a healthy response."""
+	if not config.enable_circuit_breaker:
+		return
+
+	cache = frappe.cache()
+	if any(cache.mget([_key(api_name, "state", endpoint_id), _key(api_name, "failures", endpoint_id)])):
+		cache.delete(*[_key(api_name, part, endpoint_id) for part in ("state", "opened_at", "probe", "failures")])
+
+
+def record_failure(config, api_name: str, endpoint_id: str | None = None):
+	"""Counts an upstream failure and opens the breaker once the threshold is reached in the window."""
+	if not config.enable_circuit_breaker:
+		return
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.incr(_key(api_name, "failures", endpoint_id))
+	pipe.expire(_key(api_name, "failures", endpoint_id), config.breaker_failure_window or DEFAULT_FAILURE_WINDOW)
+	pipe.get(_key(api_name, "state", endpoint_id))
+	failures, __, state = pipe.execute()
+
+	threshold = config.breaker_failure_threshold or DEFAULT_FAILURE_THRESHOLD
+	if failures >= threshold or (state and state.decode() == HALF_OPEN):
+		pipe = cache.pipeline()
+		pipe.set(_key(api_name, "state", endpoint_id), OPEN)
+		pipe.set(_key(api_name, "opened_at", endpoint_id), time.time())
+		pipe.delete(_key(api_name, "probe", endpoint_id))
+		pipe.execute()
+
+
+def get_open(config, api_name: str, endpoint_ids: list) -> list:
+	"""
+	Returns, for each endpoint, whether `before_call` would turn a call to it away: its breaker
+	for the API is open within the recovery timeout, or another caller holds the probe. The
+	router uses this to send calls elsewhere.
+	"""
+	if not config.enable_circuit_breaker:
+		return [False] * len(endpoint_ids)
+
+	parts = ("state", "opened_at", "probe")
+	values = frappe.cache().mget([_key(api_name, part, endpoint_id) for endpoint_id in endpoint_ids for part in parts])
+
+	now = time.time()
+	return [
+		bool(state) and (bool(probe) or float(opened_at or 0) + _recovery_timeout(config) > now)
+		for state, opened_at, probe in zip(values[::3], values[1::3], values[2::3])
+	]
+
+
+def get_states(config) -> list:
+	"""Returns the breaker state of every API, per endpoint when there are several."""
+	cache = frappe.cache()
+	states = []
+	for api_name in API_METHODS:
+		for endpoint in config.endpoints or [frappe._dict(id=None, url=config.url)]:
+			state, opened_at, failures = cache.mget([
+				_key(api_name, "state", endpoint.id),
+				_key(api_name, "opened_at", endpoint.id),
+				_key(api_name, "failures", endpoint.id)
+			])
+			retry_in = 0
+			if state and state.decode() == OPEN:
+				retry_in = max(int(float(opened_at or 0) + _recovery_timeout(config) - time.time()), 0)
+
+			states.append({
+				"api_method": api_name,
+				"endpoint": endpoint.url if len(config.endpoints) > 1 else None,
+				"state": state.decode() if state else CLOSED,
+				"failures": int(failures or 0),
+				"retry_in": retry_in
+			})
+
+	return states
+
+
+def reset(api_name: str | None = None):
+	"""Closes the breaker for one API or for all of them, on every endpoint."""
+	cache = frappe.cache()
+	endpoint_ids = [endpoint.id for endpoint in get_connector_config().endpoints] or [None]
+	for name in [api_name] if api_name else API_METHODS:
+		for endpoint_id in endpoint_ids:
+			cache.delete(*[_key(name, part, endpoint_id) for part in ("state", "opened_at", "probe", "failures")])
+
+
+def _recovery_timeout(config) -> int:
+	return config.breaker_recovery_timeout or DEFAULT_RECOVERY_TIMEOUT
+
+
+def _key(api_name: str, part: str, endpoint_id: str | None = None) -> str:
+	if endpoint_id:
+		return frappe.cache().make_key(f"signzy_breaker|{api_name}|{endpoint_id}|{part}")
+	return frappe.cache().make_key(f"signzy_breaker|{api_name}|{part}")
+
+
+@frappe.whitelist()
+def get_circuit_breaker_states():
+	"""Returns the breaker state of every API for the Signzy Connector form."""
+	frappe.only_for("System Manager")
+	return get_states(get_connector_config())
+
+
+@frappe.whitelist()
+def reset_circuit_breaker(api_name: str | None = None):
+	"""
+	Closes the circuit breaker manually.
+
+	Args:
+		api_name (str, optional): Reset only this API. Defaults to all.
+	"""
+	frappe.only_for("System Manager")
+	reset(api_name)
@@ -0,0 +1,79 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+
+DEFAULT_BULK_CONCURRENCY = 8
+
+
+def run_bulk(fn, items: list, max_workers: int | None = None) -> list:
+	"""
+	Calls a verification function once per item over a bounded thread pool.
+
+	Each pool thread opens one site context and database connection and runs items until none
+	are left. Every item is committed on its own, write-backs and error logs included, so a
+	failing item is rolled back and reported in its result instead of aborting the batch.
+	Results are returned in input order.
+
+	Args:
+		fn (callable): The verification function, called as fn(**item).
+		items (list): A list of keyword argument dicts.
+		max_workers (int, optional): Pool size. Defaults to the connector's Bulk Concurrency.
+	"""
+	if not items:
+		return []
+
+	if not max_workers:
+		max_workers = get_connector_config().bulk_concurrency or DEFAULT_BULK_CONCURRENCY
+
+	pending = queue.SimpleQueue()
+	for index, item in enumerate(items):
+		pending.put((index, item))
+	results = [None] * len(items)
+
+	pool_size = min(max_workers, len(items))
+	site, sites_path, user = frappe.local.site, frappe.local.sites_path, frappe.session.user
+	with ThreadPoolExecutor(max_workers=pool_size) as executor:
+		workers = [
+			executor.submit(_run_worker, site, sites_path, user, fn, pending, results) for __ in range(pool_size)
+		]
+		for worker in workers:
+			worker.result()
+
+	return results
+
+
+def _run_worker(site: str, sites_path: str, user: str, fn, pending: queue.SimpleQueue, results: list):
+	frappe.init(site=site, sites_path=sites_path)
+	frappe.connect()
+	frappe.set_user(user)
+	try:
+		while True:
+			try:
+				index, item = pending.get_nowait()
+			except queue.Empty:
+				return
+			results[index] = _run_item(fn, index, item)
+	finally:
+		frappe.destroy()
+
+
+def _run_item(fn, index: int, item: dict) -> dict:
+	try:
+		result = fn(**item)
+		frappe.db.commit()
+		return {"index": index, "status": "Success", "result": result}
+	except frappe.ValidationError as e:
+		frappe.db.rollback()
+		frappe.clear_last_message()
+		return {"index": index, "status": "Failed", "error": str(e)}
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(title="Signzy Bulk Verification Error")
+		frappe.db.commit()
+		return {"index": index, "status": "Failed", "error": str(e)}
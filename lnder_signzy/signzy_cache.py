@@ -0,0 +1,187 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import frappe
+
+# Verifications whose result depends only on their inputs, safe to serve from cache
+CACHEABLE_APIS = (
+	"Verify Aadhaar - OCR",
+	"Verify PAN",
+	"Verify Driving License",
+	"Verify Driving License Details",
+	"Verify Vehicle RC",
+	"Verify UPI",
+	"Verify Bank Account",
+)
+
+DEFAULT_TTL = 3600
+LOCAL_CACHE_SIZE = 1024
+
+GENERATION_KEY = "signzy_result_cache_generation"
+STATS_KEY = "signzy_result_cache_stats"
+
+# In-process LRU in front of Redis: key -> (expires_at, value)
+_local_cache = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def get_ttl(config, api_name: str) -> int:
+	"""
+	Returns the cache TTL in seconds for an API, 0 when results must not be cached.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+	"""
+	if api_name not in CACHEABLE_APIS or not config.enable_result_cache:
+		return 0
+
+	for row in config.api_settings:
+		if row.api_method == api_name:
+			if row.skip_result_cache:
+				return 0
+			if row.cache_ttl:
+				return int(row.cache_ttl)
+
+	return int(config.result_cache_ttl or DEFAULT_TTL)
+
+
+def get_cache_key(api_name: str, payload: dict) -> str:
+	"""
+	Returns a salted hash of the normalized inputs so that raw KYC values never reach Redis.
+
+	Args:
+		api_name (str): The API method name.
+		payload (dict): The request body sent to Signzy.
+	"""
+	generation = frappe.cache().hget(GENERATION_KEY, api_name) or ""
+	normalized = json.dumps(normalize(payload), sort_keys=True, separators=(",", ":"))
+	digest = hashlib.sha256(f"{get_salt()}|{api_name}|{generation}|{normalized}".encode()).hexdigest()
+	return f"signzy_result:{digest}"
+
+
+def normalize(value):
+	"""Upper-cases and collapses whitespace in strings so trivially different inputs share a key."""
+	if isinstance(value, str):
+		return " ".join(value.split()).upper()
+	if isinstance(value, dict):
+		return {k: normalize(v) for k, v in value.items()}
+	if isinstance(value, (list, tuple)):
+		return [normalize(v) for v in value]
+	return value
+
+
+def get_salt() -> str:
+	"""Derives a per-site salt from the site encryption key."""
+	secret = frappe.local.conf.get("encryption_key") or frappe.local.site
+	return hashlib.sha256(f"signzy-result-cache|{secret}".encode()).hexdigest()
+
+
+def get_result(api_name: str, key: str):
+	"""
+	Returns the cached result for a key, checking the in-process LRU before Redis.
+
+	Args:
+		api_name (str): The API method name, used for hit/miss counts.
+		key (str): The key from `get_cache_key`.
+	"""
+	with _local_lock:
+		entry = _local_cache.get(key)
+		if entry and entry[0] > time.monotonic():
+			_local_cache.move_to_end(key)
+			_record(api_name, "hit")
+			return entry[1]
+
+	value = frappe.cache().get_value(key)
+	if value is None:
+		_record(api_name, "miss")
+		return None
+
+	_set_local(key, value, frappe.cache().ttl(frappe.cache().make_key(key)))
+	_record(api_name, "hit")
+	return value
+
+
+def set_result(key: str, value, ttl: int):
+	"""
+	Stores a result in Redis and the in-process LRU.
+
+	Args:
+		key (str): The key from `get_cache_key`.
+		value (dict): The parsed Signzy response.
+		ttl (int): Time to live in seconds.
+	"""
+	frappe.cache().set_value(key, value, expires_in_sec=ttl)
+	_set_local(key, value, ttl)
+
+
+def invalidate(api_name: str | None = None):
+	"""
+	Invalidates cached results for one API or, when no API is given, for all of them.
+
+	Bumping the generation changes every key for the API, so stale entries in Redis
+	and in other workers' LRUs simply stop being addressed and expire on their own.
+
+	Args:
+		api_name (str, optional): The API method name. Defaults to all cacheable APIs.
+	"""
+	for name in [api_name] if api_name else CACHEABLE_APIS:
+		frappe.cache().hset(GENERATION_KEY, name, frappe.generate_hash(length=8))
+
+	with _local_lock:
+		_local_cache.clear()
+
+
+def get_stats() -> dict:
+	"""Returns hit and miss counts per API."""
+	cache = frappe.cache()
+	fields = [f"{api_name}|{outcome}" for api_name in CACHEABLE_APIS for outcome in ("hit", "miss")]
+	values = cache.mget([cache.make_key(f"{STATS_KEY}|{field}") for field in fields])
+
+	stats = {api_name: {"hit": 0, "miss": 0} for api_name in CACHEABLE_APIS}
+	for field, value in zip(fields, values):
+		api_name, outcome = field.split("|")
+		stats[api_name][outcome] = int(value or 0)
+
+	return stats
+
+
+def _record(api_name: str, outcome: str):
+	cache = frappe.cache()
+	cache.incr(cache.make_key(f"{STATS_KEY}|{api_name}|{outcome}"))
+
+
+def _set_local(key: str, value, ttl: int):
+	if not ttl or ttl < 0:
+		return
+
+	with _local_lock:
+		_local_cache[key] = (time.monotonic() + ttl, value)
+		_local_cache.move_to_end(key)
+		while len(_local_cache) > LOCAL_CACHE_SIZE:
+			_local_cache.popitem(last=False)
+
+
+@frappe.whitelist()
+def clear_result_cache(api_name: str | None = None):
+	"""
+	Clears cached Signzy results.
+
+	Args:
+		api_name (str, optional): Clear only this API's results. Defaults to all.
+	"""
+	frappe.only_for("System Manager")
+	invalidate(api_name)
+
+
+@frappe.whitelist()
+def get_result_cache_stats():
+	"""Returns hit and miss counts per API for the Signzy Connector form."""
+	frappe.only_for("System Manager")
+	return get_stats()
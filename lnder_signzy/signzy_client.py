@@ -0,0 +1,436 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import random
+import threading
+import time
+
+import frappe
+import requests
+from frappe import _
+from requests.adapters import HTTPAdapter
+
+from lnder_signzy import (
+	signzy_breaker,
+	signzy_cache,
+	signzy_json,
+	signzy_metrics,
+	signzy_rate_limiter,
+	signzy_router,
+	signzy_singleflight,
+	signzy_timing,
+)
+from lnder_signzy.lnder_signzy.doctype.signzy_api_request_log.signzy_api_request_log import create_log as signzy_api_log
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 60
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8
+DEFAULT_DEADLINE = 90
+DEFAULT_RETRY_STATUS_CODES = "429,500,502,503,504"
+
+# Calls with side effects at Signzy that must never be sent twice
+NON_IDEMPOTENT_APIS = ("Generate OTP", "Submit OTP")
+
+# One keep-alive session per worker process, shared by every endpoint
+_session = None
+_session_pool_size = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+	"""
+	Returns the worker wide pooled session, rebuilding it if the pool size has changed.
+
+	Args:
+		pool_size (int): Maximum number of keep-alive connections to hold open.
+	"""
+	global _session, _session_pool_size
+
+	pool_size = pool_size or DEFAULT_POOL_SIZE
+	if _session is None or _session_pool_size != pool_size:
+		with _session_lock:
+			if _session is None or _session_pool_size != pool_size:
+				session = requests.Session()
+				adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+				session.mount("https://", adapter)
+				session.mount("http://", adapter)
+				_session, _session_pool_size = session, pool_size
+
+	return _session
+
+
+def get_timeout(config, api_name: str) -> tuple:
+	"""
+	Returns the (connect, read) timeout for an API, falling back to the connector defaults.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+	"""
+	connect_timeout = config.connect_timeout or DEFAULT_CONNECT_TIMEOUT
+	read_timeout = config.read_timeout or DEFAULT_READ_TIMEOUT
+
+	for row in config.api_settings:
+		if row.api_method == api_name:
+			connect_timeout = row.connect_timeout or connect_timeout
+			read_timeout = row.read_timeout or read_timeout
+			break
+
+	return (connect_timeout, read_timeout)
+
+
+def get_retry_policy(config, api_name: str) -> frappe._dict:
+	"""
+	Returns the retry policy for an API, falling back to the connector defaults.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+	"""
+	policy = frappe._dict(
+		max_attempts=config.max_attempts or DEFAULT_MAX_ATTEMPTS,
+		backoff_base=config.backoff_base or DEFAULT_BACKOFF_BASE,
+		backoff_max=config.backoff_max or DEFAULT_BACKOFF_MAX,
+		deadline=config.request_deadline or DEFAULT_DEADLINE,
+		retry_status_codes=config.retry_status_codes or DEFAULT_RETRY_STATUS_CODES
+	)
+
+	for row in config.api_settings:
+		if row.api_method == api_name:
+			policy.max_attempts = row.max_attempts or policy.max_attempts
+			policy.deadline = row.request_deadline or policy.deadline
+			policy.retry_status_codes = row.retry_status_codes or policy.retry_status_codes
+			break
+
+	if api_name in NON_IDEMPOTENT_APIS:
+		policy.max_attempts = 1
+
+	policy.retry_status_codes = {int(code) for code in str(policy.retry_status_codes).split(",") if code.strip()}
+	return policy
+
+
+def post_with_retry(
+	session: requests.Session,
+	config,
+	api_name: str,
+	endpoint: str,
+	data: str,
+	rate_limit_wait: float | None = None,
+	timer: signzy_timing.PhaseTimer | None = None
+) -> tuple:
+	"""
+	Posts to Signzy, retrying failed connections and retryable status codes with jittered backoff.
+
+	Only errors raised before the request went out are retried. A read timeout is not, since
+	Signzy may have received, processed and billed the call anyway.
+
+	Every attempt chooses its connector endpoint afresh, passing over the one the previous attempt
+	failed on, and counts towards that endpoint's circuit breaker and error rate. Every attempt and
+	every wait is bounded by the policy deadline, so a degraded upstream cannot hold the worker
+	longer than that.
+
+	Args:
+		session (requests.Session): The pooled session.
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+		endpoint (str): The path appended to the endpoint URL, e.g. "/pan/verify".
+		data (str): The serialized request body.
+		rate_limit_wait (float, optional): Seconds to wait for a rate limit token, 0 to reject at once.
+		timer (PhaseTimer, optional): Collects the time spent per phase.
+
+	Returns:
+		tuple: The connector endpoint of the last attempt, and the response or the connection
+			error that attempt ended with; one of the two is None.
+	"""
+	timer = timer or signzy_timing.PhaseTimer()
+	policy = get_retry_policy(config, api_name)
+	connect_timeout, read_timeout = get_timeout(config, api_name)
+	deadline = time.monotonic() + policy.deadline
+
+	upstream = response = error = None
+	attempt = 0
+	while True:
+		attempt += 1
+
+		candidate = signzy_router.choose(config, api_name, avoid=upstream.id if upstream else None)
+		# Fail fast without a call or a log row while Signzy is known to be down; a retry with
+		# nowhere left to go ends with what the previous attempt got
+		try:
+			with timer.measure("breaker"):
+				signzy_breaker.before_call(config, api_name, candidate.id)
+		except signzy_breaker.SignzyUnavailableError:
+			if upstream is None:
+				raise
+			return upstream, response, error
+		upstream = candidate
+
+		# Every attempt counts against the contracted rate, retries included
+		with timer.measure("rate_limit"):
+			signzy_rate_limiter.acquire(config, api_name, rate_limit_wait, deadline=deadline, endpoint_id=upstream.id)
+
+		remaining = max(deadline - time.monotonic(), 0.1)
+		timeout = (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+		retryable = True
+		signzy_router.begin(upstream)
+		try:
+			with timer.measure("upstream"):
+				response, error = session.post(
+					f"{upstream.url}{endpoint}", headers=get_headers(upstream), data=data, timeout=timeout
+				), None
+		# ConnectTimeout is a ConnectionError too; only ReadTimeout is left for the next clause
+		except requests.ConnectionError as e:
+			response, error = None, e
+		except requests.Timeout as e:
+			response, error, retryable = None, e, False
+		except BaseException:
+			signzy_router.end(config, upstream)
+			raise
+
+		failed = response is None or signzy_breaker.is_upstream_failure(response.status_code)
+		signzy_router.end(config, upstream, failed=failed)
+		if failed:
+			signzy_breaker.record_failure(config, api_name, upstream.id)
+		else:
+			signzy_breaker.record_success(config, api_name, upstream.id)
+
+		if response is not None:
+			# requests cannot split out DNS, connect and TLS, so they count towards the first byte
+			timer.add("first_byte", response.elapsed.total_seconds())
+			if response.status_code not in policy.retry_status_codes:
+				return upstream, response, None
+		if attempt >= policy.max_attempts or not retryable:
+			return upstream, response, error
+
+		delay = get_backoff_delay(policy, attempt, response.headers.get("Retry-After") if response is not None else None)
+
+		if time.monotonic() + delay >= deadline:
+			if response is None:
+				error = requests.Timeout(f"Signzy request deadline of {policy.deadline}s exceeded")
+			return upstream, response, error
+
+		signzy_metrics.record_retry(api_name)
+		with timer.measure("backoff"):
+			time.sleep(delay)
+
+
+def get_backoff_delay(policy, attempt: int, retry_after: str | None = None) -> float:
+	"""
+	Returns the seconds to wait before the next attempt: full jitter, but never sooner than
+	Signzy asked us to wait in a Retry-After header.
+
+	Args:
+		policy (dict): The policy from `get_retry_policy`.
+		attempt (int): The attempt that just failed, starting at 1.
+		retry_after (str, optional): The Retry-After header of the failed response.
+	"""
+	delay = random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** (attempt - 1)))
+	try:
+		return max(delay, float(retry_after or 0))
+	except ValueError:
+		return delay
+
+
+def make_request(
+	api_name: str,
+	endpoint: str,
+	payload: dict,
+	rate_limit_wait: float | None = None,
+	idempotency_key: str | None = None,
+	cache_inputs: dict | None = None
+) -> dict:
+	"""
+	Posts a payload to a Signzy endpoint through the pooled session and returns the parsed response.
+
+	Args:
+		api_name (str): The API method name used for logging and per-API settings.
+		endpoint (str): The path appended to the connector URL, e.g. "/pan/verify".
+		payload (dict): The request body.
+		rate_limit_wait (float, optional): Seconds to wait for a rate limit token, 0 to reject at once.
+			Defaults to the connector's Rate Limit Max Wait.
+		idempotency_key (str, optional): Replays the result of an earlier call made with the same key.
+			Defaults to the request's Idempotency-Key header.
+		cache_inputs (dict, optional): What identifies the result for caching and coalescing,
+			when that is not the payload itself. Defaults to the payload.
+	"""
+	started_at = time.perf_counter()
+	timer = signzy_timing.PhaseTimer()
+
+	# Fetch the Signzy Connector details
+	with timer.measure("config"):
+		config = get_connector_config()
+	timer.sample(config)
+
+	# Check if the connector configuration is valid
+	if not config.endpoints:
+		frappe.throw(title="Configuration Error", msg=_("Signzy Connector URL or Authorization is not set"))
+
+	try:
+		# Serve repeat verifications of the same inputs without a paid call
+		cache_key = None
+		cache_ttl = signzy_cache.get_ttl(config, api_name)
+		if cache_ttl:
+			with timer.measure("cache"):
+				cache_key = signzy_cache.get_cache_key(api_name, cache_inputs or payload)
+				cached_result = signzy_cache.get_result(api_name, cache_key)
+			if cached_result is not None:
+				signzy_metrics.observe(api_name, time.perf_counter() - started_at, "cache")
+				return cached_result
+
+		def send():
+			result = _send_request(config, api_name, endpoint, payload, rate_limit_wait, started_at, timer)
+			if cache_ttl:
+				signzy_cache.set_result(cache_key, result, cache_ttl)
+			return result
+
+		# Identical calls in flight at the same time share one upstream call
+		idempotency_key = idempotency_key or signzy_singleflight.get_idempotency_key()
+		if not idempotency_key and api_name in NON_IDEMPOTENT_APIS:
+			return send()
+
+		flight_key = signzy_singleflight.get_flight_key(
+			api_name,
+			request_key=cache_key or signzy_cache.get_cache_key(api_name, cache_inputs or payload),
+			idempotency_key=idempotency_key
+		)
+		return signzy_singleflight.run_once(
+			flight_key,
+			send,
+			timeout=get_retry_policy(config, api_name).deadline,
+			replay_ttl=signzy_singleflight.IDEMPOTENT_RESULT_TTL if idempotency_key else None
+		)
+	finally:
+		timer.publish()
+
+
+def _send_request(
+	config,
+	api_name: str,
+	endpoint: str,
+	payload: dict,
+	rate_limit_wait: float | None,
+	started_at: float,
+	timer: signzy_timing.PhaseTimer
+) -> dict:
+	# Serialized once; the same string is sent on every attempt and logged
+	payload = signzy_json.dumps(payload)
+
+	session = get_session(config.pool_size)
+	upstream, response, error = post_with_retry(session, config, api_name, endpoint, payload, rate_limit_wait, timer)
+
+	url = f"{upstream.url}{endpoint}"
+	headers = get_headers(upstream)
+	if error is not None:
+		handle_connection_error(config, api_name, url, headers, payload, error, started_at, timer)
+
+	return handle_response(
+		config, api_name, url, headers, payload, response.status_code, response.content, started_at, timer
+	)
+
+
+def get_headers(upstream) -> dict:
+	"""Returns the request headers for an endpoint from `signzy_router.choose`."""
+	return {
+		'Authorization': upstream.authorization,
+		'Content-Type': 'application/json'
+	}
+
+
+def handle_connection_error(
+	config,
+	api_name: str,
+	url: str,
+	headers: dict,
+	data: str,
+	error: Exception,
+	started_at: float,
+	timer: signzy_timing.PhaseTimer | None = None
+):
+	"""Records and logs a call that got no response from Signzy, then raises."""
+	timer = timer or signzy_timing.PhaseTimer()
+	latency = time.perf_counter() - started_at
+	signzy_metrics.observe(api_name, latency, "error")
+	with timer.measure("log"):
+		signzy_api_log(
+			api_name=api_name,
+			api_endpoint=url,
+			api_request_header=headers,
+			api_request_data=data,
+			api_response=str(error),
+			latency=latency,
+			timings=timer.get_log_fields()
+		)
+	frappe.throw(title="Signzy API Error", msg=_("Could not reach Signzy: {0}").format(error))
+
+
+def handle_response(
+	config,
+	api_name: str,
+	url: str,
+	headers: dict,
+	data: str,
+	status_code: int,
+	content: bytes,
+	started_at: float,
+	timer: signzy_timing.PhaseTimer | None = None
+) -> dict:
+	"""
+	Records and logs a Signzy response, then returns its parsed body or raises its error.
+
+	Shared by the synchronous client and the asyncio engine in `signzy_async`.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+		url (str): The full endpoint URL.
+		headers (dict): The request headers.
+		data (str): The serialized request body.
+		status_code (int): The HTTP status of the response.
+		content (bytes): The raw response body.
+		started_at (float): The time.perf_counter() value the call started at.
+		timer (PhaseTimer, optional): Collects the time spent per phase; sampled timings are logged.
+	"""
+	timer = timer or signzy_timing.PhaseTimer()
+	latency = time.perf_counter() - started_at
+	signzy_metrics.observe(api_name, latency, status_code, len(content))
+
+	unreadable = False
+	try:
+		with timer.measure("parse"):
+			body = signzy_json.loads(content)
+	except ValueError:
+		body, unreadable = None, True
+
+	# Log the API request and response
+	with timer.measure("log"):
+		signzy_api_log(
+			api_name=api_name,
+			api_endpoint=url,
+			api_request_header=headers,
+			api_request_data=data,
+			api_response=content,
+			api_response_status_code=status_code,
+			latency=latency,
+			timings=timer.get_log_fields()
+		)
+
+	if unreadable:
+		frappe.throw(title="Signzy API Error", msg=_("Signzy returned a response that could not be read"))
+	if status_code >= 400:
+		frappe.throw(title="Signzy API Error", msg=_(f"{get_error_message(body)}"))
+
+	return body
+
+
+def get_error_message(body) -> str:
+	"""Returns the error message from a parsed Signzy error response."""
+	if not isinstance(body, dict):
+		return body
+	if "error" in body:
+		return body.get("error").get("message")
+	return body.get("message")
@@ -0,0 +1,156 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+"""
+Request shaping for every Signzy endpoint, shared by the synchronous `signzy_api`
+functions and the asyncio engine in `signzy_async`.
+
+Each builder validates and normalizes its inputs with `signzy_validators` and returns the keyword arguments of
+`signzy_client.make_request`: api_name, endpoint, payload and, where needed, cache_inputs.
+"""
+
+import frappe
+from frappe.utils import get_url, getdate
+
+from lnder_signzy import signzy_validators
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+from lnder_signzy.signzy_images import prepare_ocr_image
+
+
+def verify_aadhaar(aadhaar_no: str) -> frappe._dict:
+	aadhaar_no = signzy_validators.validate_aadhaar(aadhaar_no)
+
+	return frappe._dict(
+		api_name="Verify Aadhaar",
+		endpoint="/aadhaar/verify",
+		payload={"uid": aadhaar_no}
+	)
+
+
+def verify_aadhaar_ocr(front_url: str, back_url: str) -> frappe._dict:
+	# Send small, upright derivatives instead of full resolution phone photos
+	config = get_connector_config()
+	front_url, front_hash = prepare_ocr_image(front_url, config)
+	back_url, back_hash = prepare_ocr_image(back_url, config)
+	files = [get_url(front_url), get_url(back_url)]
+
+	return frappe._dict(
+		api_name="Verify Aadhaar - OCR",
+		endpoint="/aadhaar/extraction",
+		payload={"files": files},
+		cache_inputs={"front": front_hash, "back": back_hash}
+	)
+
+
+def generate_otp(country_code: str, mobile_no: str) -> frappe._dict:
+	return frappe._dict(
+		api_name="Generate OTP",
+		endpoint="/phone/generateOtp",
+		payload={
+			"countryCode": country_code,
+			"mobileNumber": mobile_no
+		}
+	)
+
+
+def submit_otp(country_code: str, mobile_no: str, reference_id: str, otp: str) -> frappe._dict:
+	return frappe._dict(
+		api_name="Submit OTP",
+		endpoint="/phone/getNumberDetails",
+		payload={
+			"countryCode": country_code,
+			"mobileNumber": mobile_no,
+			"referenceId": reference_id,
+			"otp": otp,
+			"extraFields": False
+		}
+	)
+
+
+def verify_dl(dl_number: str, dob: str, issue_date: str) -> frappe._dict:
+	dl_number = signzy_validators.validate_dl(dl_number)
+
+	return frappe._dict(
+		api_name="Verify Driving License",
+		endpoint="/dl_/verification",
+		payload={
+			"number": dl_number,
+			"dob": getdate(dob).strftime('%d/%m/%Y'),
+			"issueDate": getdate(issue_date).strftime('%d/%m/%Y')
+		}
+	)
+
+
+def extract_dl(dl_number: str, dob: str) -> frappe._dict:
+	dl_number = signzy_validators.validate_dl(dl_number)
+
+	return frappe._dict(
+		api_name="Verify Driving License Details",
+		endpoint="/dl_number/based_search",
+		payload={
+			"number": dl_number,
+			"dob": getdate(dob).strftime('%d/%m/%Y')
+		}
+	)
+
+
+def verify_pan(pan: str, name: str, dob: str) -> frappe._dict:
+	pan = signzy_validators.validate_pan(pan)
+
+	return frappe._dict(
+		api_name="Verify PAN",
+		endpoint="/pan/verify",
+		payload={
+			"pan": pan,
+			"name": name,
+			"dob": getdate(dob).strftime('%d/%m/%Y')
+		}
+	)
+
+
+def verify_upi(vpa: str, name: str) -> frappe._dict:
+	vpa = signzy_validators.validate_vpa(vpa)
+
+	return frappe._dict(
+		api_name="Verify UPI",
+		endpoint="/bankAccountVerification/upiVerifications",
+		payload={
+			"vpa": vpa,
+			"name": name,
+			"fuzzy": False
+		}
+	)
+
+
+def verify_bank_acc(acc_no: str, ifsc_code: str, mobile_no: str, name: str, email: str = None) -> frappe._dict:
+	ifsc_code = signzy_validators.validate_ifsc(ifsc_code)
+
+	payload = {
+		"beneficiaryAccount": acc_no,
+		"beneficiaryIFSC": ifsc_code,
+		"beneficiaryMobile": mobile_no,
+		"beneficiaryName": name
+	}
+
+	if email:
+		payload["email"] = email
+
+	return frappe._dict(
+		api_name="Verify Bank Account",
+		endpoint="/bankaccountverifications/advancedverification",
+		payload=payload
+	)
+
+
+def verify_rc(vehicle_no: str) -> frappe._dict:
+	vehicle_no = signzy_validators.validate_rc(vehicle_no)
+
+	return frappe._dict(
+		api_name="Verify Vehicle RC",
+		endpoint="/vehicle/detailedsearches",
+		payload={
+			"vehicleNumber": vehicle_no,
+			"blacklistCheck": "true",
+			"splitAddress": "true"
+		}
+	)
@@ -0,0 +1,71 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import hashlib
+from io import BytesIO
+
+import frappe
+from frappe.utils import cint
+from PIL import Image, ImageOps
+
+DEFAULT_MAX_DIMENSION = 1600
+DEFAULT_QUALITY = 85
+# Images already this small are sent as they are
+SMALL_IMAGE_BYTES = 300 * 1024
+# EXIF tag of the camera orientation; 1 means the image is stored upright
+EXIF_ORIENTATION = 0x0112
+
+
+def prepare_ocr_image(file_url: str, config) -> tuple:
+	"""
+	Returns a downsized, re-compressed and upright copy of an uploaded card image for OCR.
+
+	Derivatives are named after the original's content hash, so an image that was already
+	processed is found again instead of being reprocessed. The original URL is returned as it
+	is when there is no File record for it or it is not an image, e.g. a scanned PDF.
+
+	Args:
+		file_url (str): URL of the uploaded image, e.g. "/files/aadhaar-front.jpg".
+		config (dict): The settings from `get_connector_config`.
+
+	Returns:
+		tuple: (URL of the image to send, content hash of the original, or its URL when there is
+			no File record).
+	"""
+	file_name = frappe.db.get_value("File", {"file_url": file_url})
+	if not file_name:
+		return file_url, file_url
+
+	file_doc = frappe.get_doc("File", file_name)
+	content = file_doc.get_content()
+	content_hash = file_doc.content_hash or hashlib.md5(content).hexdigest()
+
+	derivative_name = f"signzy-ocr-{content_hash}.jpg"
+	derivative_url = frappe.db.get_value("File", {"file_name": derivative_name, "is_private": file_doc.is_private}, "file_url")
+	if derivative_url:
+		return derivative_url, content_hash
+
+	max_dimension = cint(config.ocr_image_max_dimension) or DEFAULT_MAX_DIMENSION
+	try:
+		with Image.open(BytesIO(content)) as image:
+			upright = image.getexif().get(EXIF_ORIENTATION, 1) == 1
+			if len(content) <= SMALL_IMAGE_BYTES and max(image.size) <= max_dimension and upright:
+				return file_url, content_hash
+
+			image = ImageOps.exif_transpose(image).convert("RGB")
+			image.thumbnail((max_dimension, max_dimension))
+
+			output = BytesIO()
+			image.save(output, format="JPEG", quality=cint(config.ocr_image_quality) or DEFAULT_QUALITY, optimize=True)
+	except OSError:
+		# Pillow raises OSError, UnidentifiedImageError included, for anything it cannot decode
+		return file_url, content_hash
+
+	derivative = frappe.get_doc({
+		"doctype": "File",
+		"file_name": derivative_name,
+		"is_private": file_doc.is_private,
+		"content": output.getvalue()
+	}).insert(ignore_permissions=True)
+
+	return derivative.file_url, content_hash
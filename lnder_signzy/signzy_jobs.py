@@ -0,0 +1,62 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from rq import get_current_job
+
+REALTIME_EVENT = "signzy_verification"
+
+# Verifications that may be run as background jobs, with the queue they run on
+BACKGROUND_METHODS = {
+	"lnder_signzy.signzy_api.verify_aadhaar_ocr": "short",
+	"lnder_signzy.signzy_api.verify_rc": "short",
+	"lnder_signzy.signzy_api.run_bulk_verification": "long",
+}
+
+
+def enqueue_verification(method: str, **kwargs) -> dict:
+	"""
+	Queues a verification as a background job and returns its job id right away.
+
+	The result is pushed to the requesting user over realtime as a `signzy_verification`
+	event carrying the same job id.
+
+	Args:
+		method (str): Dotted path of the verification, one of BACKGROUND_METHODS.
+		**kwargs: Arguments for the verification.
+	"""
+	if method not in BACKGROUND_METHODS:
+		frappe.throw(title="Signzy API Error", msg=_("{0} cannot be run in the background").format(method))
+
+	job = frappe.enqueue(
+		"lnder_signzy.signzy_jobs.run_verification",
+		queue=BACKGROUND_METHODS[method],
+		verification_method=method,
+		verification_kwargs=kwargs,
+		user=frappe.session.user,
+	)
+	return {"job_id": job.id, "queued": True}
+
+
+def run_verification(verification_method: str, verification_kwargs: dict, user: str):
+	"""
+	Runs a queued verification and publishes its outcome to the user who requested it.
+
+	The outcome is published only once the verification's writes are committed, so a form that
+	reloads on it sees the saved result.
+	"""
+	job = get_current_job()
+	message = {"job_id": job.id if job else None, "method": verification_method}
+	try:
+		message["result"] = frappe.get_attr(verification_method)(**verification_kwargs)
+		message["status"] = "Success"
+	except Exception as e:
+		frappe.db.rollback()
+		message["status"] = "Failed"
+		message["error"] = str(e)
+		if not isinstance(e, frappe.ValidationError):
+			frappe.log_error(title="Signzy Background Verification Error")
+
+	frappe.publish_realtime(REALTIME_EVENT, message, user=user, after_commit=True)
+	frappe.db.commit()
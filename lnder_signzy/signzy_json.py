@@ -0,0 +1,31 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+"""
+The JSON codec of the request pipeline: orjson when it is installed, as it is with Frappe,
+and the standard library otherwise.
+
+Payloads are serialized once and responses parsed once per call; the resulting string and
+objects are what the log, the error message and the caller all get.
+"""
+
+import json
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+# orjson's decode error subclasses this one, so callers catch the same exception either way
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(obj, default=None) -> str:
+	"""Serializes compactly, without spaces after separators."""
+	if orjson:
+		return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+	return json.dumps(obj, default=default, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(data: bytes | str):
+	return orjson.loads(data) if orjson else json.loads(data)
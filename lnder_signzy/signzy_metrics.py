@@ -0,0 +1,172 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import threading
+import time
+from collections import defaultdict
+
+import frappe
+import redis
+from werkzeug.wrappers import Response
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+FLUSH_INTERVAL = 10
+METRICS_KEY = "signzy_metrics"
+
+# Counters recorded in this worker and not yet added to Redis, per site
+_pending = defaultdict(lambda: defaultdict(float))
+_last_flush = defaultdict(float)
+_lock = threading.Lock()
+
+
+def observe(api_name: str, latency: float, status: int | str, response_bytes: int = 0):
+	"""
+	Records one Signzy call. Counters are kept in memory and added to Redis at most every
+	FLUSH_INTERVAL seconds, so recording costs a few dictionary updates.
+
+	Args:
+		api_name (str): The API method name, e.g. "Verify PAN".
+		latency (float): Seconds spent in the call.
+		status (int | str): The HTTP status code, "cache" for a cache hit or "error" when there was no response.
+		response_bytes (int, optional): Size of the response body.
+	"""
+	bucket = next((le for le in LATENCY_BUCKETS if latency <= le), "+Inf")
+	site = frappe.local.site
+
+	with _lock:
+		pending = _pending[site]
+		pending[f"{api_name}|bucket|{bucket}"] += 1
+		pending[f"{api_name}|latency_sum"] += latency
+		pending[f"{api_name}|calls"] += 1
+		pending[f"{api_name}|status|{status}"] += 1
+		pending[f"{api_name}|bytes"] += response_bytes
+
+	_flush_if_due(site)
+
+
+def record_retry(api_name: str):
+	"""Counts a retried attempt."""
+	with _lock:
+		_pending[frappe.local.site][f"{api_name}|retries"] += 1
+
+
+def flush():
+	"""Adds this worker's pending counters for the current site to Redis."""
+	site = frappe.local.site
+	with _lock:
+		pending = _pending.pop(site, None)
+		_last_flush[site] = time.monotonic()
+
+	if not pending:
+		return
+
+	cache = frappe.cache()
+	key = cache.make_key(METRICS_KEY)
+	pipe = cache.pipeline(transaction=False)
+	for field, value in pending.items():
+		pipe.hincrbyfloat(key, field, value)
+	pipe.execute()
+
+
+def get_metrics() -> dict:
+	"""
+	Returns the counters of all workers as {api_name: {"calls": .., "buckets": {..}, "status": {..}, ..}}.
+	"""
+	flush()
+	# The wrapper's hgetall unpickles values, these are plain numbers
+	raw = redis.Redis.hgetall(frappe.cache(), frappe.cache().make_key(METRICS_KEY))
+
+	metrics = defaultdict(lambda: {"buckets": defaultdict(float), "status": defaultdict(float)})
+	for field, value in raw.items():
+		api_name, metric, *label = field.decode().split("|")
+		if label:
+			metrics[api_name][metric + "s" if metric == "bucket" else metric][label[0]] = float(value)
+		else:
+			metrics[api_name][metric] = float(value)
+
+	return metrics
+
+
+def get_summary() -> list:
+	"""Returns one row per API with call counts, latency and outcome figures for the connector dashboard."""
+	rows = []
+	for api_name, metric in sorted(get_metrics().items()):
+		calls = metric.get("calls", 0)
+		if not calls:
+			continue
+
+		failed = sum(count for status, count in metric["status"].items() if status == "error" or status.startswith(("4", "5")))
+		rows.append({
+			"api_method": api_name,
+			"calls": int(calls),
+			"avg_latency": metric.get("latency_sum", 0) / calls,
+			"p95_latency": _estimate_quantile(metric["buckets"], calls, 0.95),
+			"failure_rate": failed / calls * 100,
+			"cache_hits": int(metric["status"].get("cache", 0)),
+			"retries": int(metric.get("retries", 0)),
+			"bytes": int(metric.get("bytes", 0))
+		})
+
+	return rows
+
+
+def _estimate_quantile(buckets: dict, total: float, quantile: float) -> float | None:
+	"""Returns the upper bound of the bucket holding the quantile, None when it lies past the last bucket."""
+	seen = 0
+	for le in LATENCY_BUCKETS:
+		seen += buckets.get(str(le), 0)
+		if seen >= total * quantile:
+			return le
+	return None
+
+
+def _flush_if_due(site: str):
+	if time.monotonic() - _last_flush[site] >= FLUSH_INTERVAL:
+		flush()
+
+
+def _label(value: str) -> str:
+	return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+@frappe.whitelist()
+def metrics():
+	"""Exposes the Signzy call metrics in the Prometheus text format."""
+	frappe.only_for("System Manager")
+
+	lines = [
+		"# HELP signzy_request_duration_seconds Time spent calling Signzy.",
+		"# TYPE signzy_request_duration_seconds histogram"
+	]
+	all_metrics = get_metrics()
+	for api_name, metric in sorted(all_metrics.items()):
+		api = _label(api_name)
+		cumulative = 0
+		for le in LATENCY_BUCKETS:
+			cumulative += metric["buckets"].get(str(le), 0)
+			lines.append(f'signzy_request_duration_seconds_bucket{{api="{api}",le="{le}"}} {cumulative:g}')
+		lines.append(f'signzy_request_duration_seconds_bucket{{api="{api}",le="+Inf"}} {metric.get("calls", 0):g}')
+		lines.append(f'signzy_request_duration_seconds_sum{{api="{api}"}} {metric.get("latency_sum", 0):g}')
+		lines.append(f'signzy_request_duration_seconds_count{{api="{api}"}} {metric.get("calls", 0):g}')
+
+	lines += ["# HELP signzy_requests_total Signzy calls by outcome.", "# TYPE signzy_requests_total counter"]
+	for api_name, metric in sorted(all_metrics.items()):
+		for status, count in sorted(metric["status"].items()):
+			lines.append(f'signzy_requests_total{{api="{_label(api_name)}",status="{_label(status)}"}} {count:g}')
+
+	for name, field, help_text in (
+		("signzy_retries_total", "retries", "Retried Signzy attempts."),
+		("signzy_response_bytes_total", "bytes", "Bytes received from Signzy."),
+	):
+		lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+		for api_name, metric in sorted(all_metrics.items()):
+			lines.append(f'{name}{{api="{_label(api_name)}"}} {metric.get(field, 0):g}')
+
+	return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+@frappe.whitelist()
+def get_metrics_summary():
+	"""Returns per API figures for the Signzy Connector dashboard."""
+	frappe.only_for("System Manager")
+	return get_summary()
@@ -0,0 +1,120 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import time
+
+import frappe
+from frappe import _
+
+DEFAULT_MAX_WAIT = 5
+
+# Refills the bucket from Redis server time and takes a token if one is available.
+# Returns 0 when a token was taken, otherwise the seconds until the next token.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+
+local wait = 0
+if tokens >= 1 then
+	tokens = tokens - 1
+else
+	wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class SignzyRateLimitedError(frappe.ValidationError):
+	pass
+
+
+def get_limit(config, api_name: str) -> tuple:
+	"""
+	Returns the (rate per second, burst) configured for an API, or (0, 0) when it is unlimited.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+	"""
+	for row in config.api_settings:
+		if row.api_method == api_name and row.rate_limit:
+			return (row.rate_limit, max(row.rate_limit_burst or 1, 1))
+
+	return (0, 0)
+
+
+def acquire(
+	config, api_name: str, max_wait: float | None = None, deadline: float | None = None, endpoint_id: str | None = None
+):
+	"""
+	Takes a token from the API's bucket, shared by all workers through Redis.
+
+	Each endpoint of the connector has buckets of its own, as every Signzy credential is
+	given its own rate.
+
+	Waits for a token for up to `max_wait` seconds and raises SignzyRateLimitedError
+	when none becomes available in time. Pass 0 to reject immediately.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+		max_wait (float, optional): Seconds to wait for a token. Defaults to the connector's Rate Limit Max Wait.
+		deadline (float, optional): A time.monotonic() value the wait must not run past.
+		endpoint_id (str, optional): The endpoint the call goes to, from `signzy_router.choose`.
+	"""
+	give_up_at = get_give_up_at(config, max_wait, deadline)
+	while True:
+		wait = try_acquire(config, api_name, endpoint_id)
+		if not wait:
+			return
+
+		if time.monotonic() + wait > give_up_at:
+			throw_rate_limited(api_name)
+
+		time.sleep(wait)
+
+
+def try_acquire(config, api_name: str, endpoint_id: str | None = None) -> float:
+	"""
+	Takes a token without waiting.
+
+	Returns:
+		float: 0 when a token was taken or the API is unlimited, otherwise the seconds until the next token.
+	"""
+	rate, burst = get_limit(config, api_name)
+	if not rate:
+		return 0
+
+	bucket = f"signzy_rate_limit|{api_name}|{endpoint_id}" if endpoint_id else f"signzy_rate_limit|{api_name}"
+	cache = frappe.cache()
+	take_token = cache.register_script(TOKEN_BUCKET_SCRIPT)
+	return float(take_token(keys=[cache.make_key(bucket)], args=[rate, burst]))
+
+
+def get_give_up_at(config, max_wait: float | None = None, deadline: float | None = None) -> float:
+	"""Returns the time.monotonic() value a wait for a token must end by."""
+	if max_wait is None:
+		max_wait = config.rate_limit_max_wait if config.rate_limit_max_wait is not None else DEFAULT_MAX_WAIT
+
+	give_up_at = time.monotonic() + max_wait
+	if deadline is not None:
+		give_up_at = min(give_up_at, deadline)
+	return give_up_at
+
+
+def throw_rate_limited(api_name: str):
+	frappe.throw(
+		title=_("Signzy Rate Limit"),
+		msg=_("Too many {0} requests right now. Please try again shortly.").format(_(api_name)),
+		exc=SignzyRateLimitedError
+	)
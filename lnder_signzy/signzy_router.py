@@ -0,0 +1,181 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+"""
+Spreads Signzy calls over the connector's endpoints: credentials and base URLs, each with a
+weight and an optional list of allowed APIs.
+
+Routing state lives in Redis so every worker balances against the same picture: a round
+robin counter per API, the calls each endpoint has in flight, and per endpoint error counts
+over a fixed window. An endpoint whose error rate crosses the connector's threshold is
+ejected for a while, and one whose circuit breaker for the API is open is skipped; when all are
+out, all are used, since ejecting everything would only turn a partial outage into a full one.
+"""
+
+import random
+import time
+
+import frappe
+from frappe import _
+
+from lnder_signzy import signzy_breaker
+from lnder_signzy.lnder_signzy.doctype.signzy_connector.signzy_connector import get_connector_config
+
+WEIGHTED_ROUND_ROBIN = "Weighted Round Robin"
+LEAST_OUTSTANDING = "Least Outstanding Requests"
+
+DEFAULT_EJECTION_ERROR_RATE = 50
+DEFAULT_EJECTION_MIN_CALLS = 20
+DEFAULT_EJECTION_WINDOW = 60
+DEFAULT_EJECTION_DURATION = 30
+
+# In-flight counts expire when idle, so calls lost with a killed worker do not skew routing for long
+OUTSTANDING_TTL = 300
+
+
+def choose(config, api_name: str, avoid: str | None = None) -> frappe._dict:
+	"""
+	Returns the endpoint to send an API call to.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		api_name (str): The API method name, e.g. "Verify PAN".
+		avoid (str, optional): The id of an endpoint to pass over if there is another, e.g. the
+			one a retried attempt just failed on.
+
+	Returns:
+		dict: The endpoint with its id, url, authorization, weight and apis.
+	"""
+	candidates = [endpoint for endpoint in config.endpoints if not endpoint.apis or api_name in endpoint.apis]
+	if not candidates:
+		frappe.throw(
+			title="Configuration Error", msg=_("No Signzy endpoint is enabled for {0}").format(_(api_name))
+		)
+	if len(candidates) == 1:
+		return candidates[0]
+
+	cache = frappe.cache()
+	ejected = cache.mget([_key(endpoint.id, "ejected") for endpoint in candidates])
+	broken = signzy_breaker.get_open(config, api_name, [endpoint.id for endpoint in candidates])
+	candidates = [
+		endpoint for endpoint, is_ejected, is_broken in zip(candidates, ejected, broken)
+		if not (is_ejected or is_broken)
+	] or candidates
+	if avoid and len(candidates) > 1:
+		candidates = [endpoint for endpoint in candidates if endpoint.id != avoid] or candidates
+	if len(candidates) == 1:
+		return candidates[0]
+
+	if config.load_balancing == LEAST_OUTSTANDING:
+		return choose_least_outstanding(candidates)
+	return choose_round_robin(api_name, candidates)
+
+
+def choose_round_robin(api_name: str, candidates: list) -> frappe._dict:
+	"""Walks the endpoints in turn, each taking as many consecutive turns as its weight."""
+	cache = frappe.cache()
+	turn = cache.incr(cache.make_key(f"signzy_router|turn|{api_name}"))
+	position = turn % sum(endpoint.weight for endpoint in candidates)
+	for endpoint in candidates:
+		if position < endpoint.weight:
+			return endpoint
+		position -= endpoint.weight
+
+	return candidates[-1]
+
+
+def choose_least_outstanding(candidates: list) -> frappe._dict:
+	"""Picks the endpoint with the fewest calls in flight for its weight, breaking ties at random."""
+	outstanding = frappe.cache().mget([_key(endpoint.id, "outstanding") for endpoint in candidates])
+	loads = [max(int(count or 0), 0) / endpoint.weight for endpoint, count in zip(candidates, outstanding)]
+	lowest = min(loads)
+	return random.choice([endpoint for endpoint, load in zip(candidates, loads) if load == lowest])
+
+
+def begin(endpoint):
+	"""Counts a call as in flight on an endpoint."""
+	if endpoint.id is None:
+		return
+
+	pipe = frappe.cache().pipeline()
+	pipe.incr(_key(endpoint.id, "outstanding"))
+	pipe.expire(_key(endpoint.id, "outstanding"), OUTSTANDING_TTL)
+	pipe.execute()
+
+
+def end(config, endpoint, failed: bool | None = None):
+	"""
+	Ends a call counted by `begin`, recording its outcome towards the endpoint's error rate.
+
+	Args:
+		config (dict): The settings from `get_connector_config`.
+		endpoint (dict): The endpoint from `choose`.
+		failed (bool, optional): Whether Signzy failed the call. None when the call never reached
+			Signzy, e.g. it was rate limited, which does not count either way.
+	"""
+	if endpoint.id is None:
+		return
+
+	cache = frappe.cache()
+	window = config.ejection_window or DEFAULT_EJECTION_WINDOW
+	bucket = int(time.time() // window)
+	calls_key, failures_key = _key(endpoint.id, f"calls|{bucket}"), _key(endpoint.id, f"failures|{bucket}")
+
+	pipe = cache.pipeline()
+	pipe.decr(_key(endpoint.id, "outstanding"))
+	if failed is not None:
+		pipe.incr(calls_key)
+		pipe.expire(calls_key, window * 2)
+		pipe.incrby(failures_key, 1 if failed else 0)
+		pipe.expire(failures_key, window * 2)
+	results = pipe.execute()
+
+	if failed:
+		calls, failures = results[1], results[3]
+		if should_eject(config, calls, failures):
+			cache.set(_key(endpoint.id, "ejected"), 1, ex=config.ejection_duration or DEFAULT_EJECTION_DURATION)
+
+
+def should_eject(config, calls: int, failures: int) -> bool:
+	min_calls = config.ejection_min_calls or DEFAULT_EJECTION_MIN_CALLS
+	error_rate = DEFAULT_EJECTION_ERROR_RATE if config.ejection_error_rate is None else config.ejection_error_rate
+	return calls >= min_calls and failures * 100 >= calls * error_rate
+
+
+def get_states(config) -> list:
+	"""Returns the routing state of every endpoint."""
+	cache = frappe.cache()
+	bucket = int(time.time() // (config.ejection_window or DEFAULT_EJECTION_WINDOW))
+	states = []
+	for endpoint in config.endpoints:
+		if endpoint.id is None:
+			continue
+
+		pipe = cache.pipeline()
+		pipe.get(_key(endpoint.id, "outstanding"))
+		pipe.get(_key(endpoint.id, f"calls|{bucket}"))
+		pipe.get(_key(endpoint.id, f"failures|{bucket}"))
+		pipe.ttl(_key(endpoint.id, "ejected"))
+		outstanding, calls, failures, ejected_for = pipe.execute()
+		states.append({
+			"url": endpoint.url,
+			"weight": endpoint.weight,
+			"apis": endpoint.apis,
+			"outstanding": max(int(outstanding or 0), 0),
+			"calls": int(calls or 0),
+			"failures": int(failures or 0),
+			"ejected_for": max(ejected_for or 0, 0)
+		})
+
+	return states
+
+
+def _key(endpoint_id: str, part: str) -> str:
+	return frappe.cache().make_key(f"signzy_router|{endpoint_id}|{part}")
+
+
+@frappe.whitelist()
+def get_endpoint_states():
+	"""Returns the routing state of every endpoint for the Signzy Connector form."""
+	frappe.only_for("System Manager")
+	return get_states(get_connector_config())
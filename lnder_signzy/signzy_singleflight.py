@@ -0,0 +1,130 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import hashlib
+import math
+import time
+
+import frappe
+from frappe import _
+
+from lnder_signzy import signzy_json
+
+# How long the callers waiting on a flight can still pick up its outcome
+SHARED_RESULT_TTL = 15
+# How long the result of a call made with a client idempotency key is replayed
+IDEMPOTENT_RESULT_TTL = 24 * 60 * 60
+POLL_INTERVAL = 0.05
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def get_idempotency_key() -> str | None:
+	"""Returns the client supplied idempotency key of the current request, if any."""
+	if getattr(frappe.local, "request", None):
+		return frappe.get_request_header(IDEMPOTENCY_HEADER)
+
+
+def get_flight_key(api_name: str, request_key: str | None = None, idempotency_key: str | None = None) -> str:
+	"""
+	Returns the key identical calls share: the client's idempotency key when given, otherwise
+	the hashed normalized inputs.
+
+	Args:
+		api_name (str): The API method name.
+		request_key (str, optional): The input hash from `signzy_cache.get_cache_key`.
+		idempotency_key (str, optional): The client supplied idempotency key.
+	"""
+	if idempotency_key:
+		digest = hashlib.sha256(f"{frappe.session.user}|{api_name}|{idempotency_key}".encode()).hexdigest()
+		return f"idempotency|{digest}"
+	return f"inputs|{request_key}"
+
+
+def run_once(flight_key: str, fn, timeout: float, replay_ttl: int | None = None):
+	"""
+	Runs `fn` once across all workers for the calls with a flight key that are in flight together.
+
+	The first caller takes a Redis lock holding a token for its flight and makes the call;
+	callers that find the lock held wait for the outcome of that flight instead of calling
+	Signzy themselves. The outcome is only kept long enough for them to pick it up, so a call
+	that starts after the flight has finished makes its own call, and errors are never replayed
+	to it. Reuse of earlier results is left to the result cache.
+
+	Args:
+		flight_key (str): The key from `get_flight_key`.
+		fn (callable): Makes the upstream call and returns its parsed result.
+		timeout (float): Seconds to wait for another caller's outcome, also the lock expiry.
+		replay_ttl (int, optional): Seconds a successful result is also replayed to later calls
+			with the same key. Only for keys from a client idempotency key.
+	"""
+	cache = frappe.cache()
+	lock_key = cache.make_key(f"signzy_singleflight|lock|{flight_key}")
+	replay_key = cache.make_key(f"signzy_singleflight|replay|{flight_key}")
+
+	if replay_ttl:
+		replay = _get_outcome(replay_key)
+		if replay is not None:
+			return replay["result"]
+
+	token = frappe.generate_hash(length=12)
+	give_up_at = time.monotonic() + timeout
+	while True:
+		if cache.set(lock_key, token, nx=True, ex=max(math.ceil(timeout), 1)):
+			return _lead(flight_key, token, lock_key, fn, replay_key if replay_ttl else None, replay_ttl)
+
+		leader = cache.get(lock_key)
+		if leader is not None:
+			return _wait(flight_key, leader.decode(), lock_key, fn, give_up_at)
+		# The flight ended between the two reads, so it was not in flight with this call
+
+
+def _lead(flight_key: str, token: str, lock_key: str, fn, replay_key: str | None, replay_ttl: int | None):
+	cache = frappe.cache()
+	outcome_key = _outcome_key(flight_key, token)
+	try:
+		result = fn()
+	except frappe.ValidationError as e:
+		cache.set(outcome_key, signzy_json.dumps({"error": str(e)}), ex=SHARED_RESULT_TTL)
+		raise
+	else:
+		outcome = signzy_json.dumps({"result": result})
+		cache.set(outcome_key, outcome, ex=SHARED_RESULT_TTL)
+		if replay_key:
+			cache.set(replay_key, outcome, ex=replay_ttl)
+		return result
+	finally:
+		# The outcome is written before the lock is released; only release a lock that is still ours
+		if cache.get(lock_key) == token.encode():
+			cache.delete(lock_key)
+
+
+def _wait(flight_key: str, leader: str, lock_key: str, fn, give_up_at: float):
+	cache = frappe.cache()
+	outcome_key = _outcome_key(flight_key, leader)
+	outcome = None
+	while outcome is None and time.monotonic() < give_up_at:
+		time.sleep(POLL_INTERVAL)
+		outcome = _get_outcome(outcome_key)
+		if outcome is None and cache.get(lock_key) != leader.encode():
+			outcome = _get_outcome(outcome_key)
+			if outcome is None:
+				# The first caller went away without an outcome, make the call ourselves
+				return fn()
+
+	if outcome is None:
+		frappe.throw(title=_("Signzy API Error"), msg=_("Timed out waiting for an identical verification to finish"))
+
+	if "error" in outcome:
+		frappe.throw(title=_("Signzy API Error"), msg=outcome["error"])
+
+	return outcome["result"]
+
+
+def _outcome_key(flight_key: str, token: str) -> str:
+	return frappe.cache().make_key(f"signzy_singleflight|outcome|{flight_key}|{token}")
+
+
+def _get_outcome(outcome_key: str) -> dict | None:
+	outcome = frappe.cache().get(outcome_key)
+	return signzy_json.loads(outcome) if outcome else None
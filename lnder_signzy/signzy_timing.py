@@ -0,0 +1,82 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+import random
+import time
+from contextlib import contextmanager
+
+import frappe
+
+# Where the time of a Signzy call goes, in pipeline order
+PHASES = (
+	"config",      # loading the connector settings
+	"cache",       # result cache lookup
+	"breaker",     # circuit breaker check
+	"rate_limit",  # waiting for a rate limit token
+	"upstream",    # HTTP calls to Signzy, retries included
+	"first_byte",  # until Signzy's response headers arrived, connection setup included
+	"backoff",     # sleeping between retries
+	"parse",       # parsing the response
+	"log",         # building and buffering the request log entry
+)
+TIMING_FIELDS = tuple(f"time_{phase}" for phase in PHASES)
+
+DEFAULT_SAMPLE_RATE = 10
+
+
+class PhaseTimer:
+	"""
+	Accumulates how long each phase of one Signzy call took, on a monotonic clock.
+
+	Timing is always on as it only costs a few clock reads; sampling decides whether the
+	timings are stored on the request log and sent in the Server-Timing response header.
+	"""
+
+	def __init__(self):
+		self.phases = {}
+		self.sampled = False
+
+	@contextmanager
+	def measure(self, phase: str):
+		started_at = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add(phase, time.perf_counter() - started_at)
+
+	def add(self, phase: str, seconds: float):
+		self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+	def sample(self, config):
+		"""Decides whether this call is sampled, per the connector's Phase Timing Sample Rate."""
+		rate = config.phase_timing_sample_rate
+		self.sampled = random.random() * 100 < (DEFAULT_SAMPLE_RATE if rate is None else rate)
+
+	def get_log_fields(self) -> dict | None:
+		"""Returns the timings in milliseconds as request log fields, or None when not sampled."""
+		if not self.sampled:
+			return None
+		return {f"time_{phase}": round(seconds * 1000, 3) for phase, seconds in self.phases.items()}
+
+	def publish(self):
+		"""Adds a sampled call's timings to the current web request's Server-Timing header."""
+		if not self.sampled or not getattr(frappe.local, "request", None):
+			return
+
+		if getattr(frappe.local, "signzy_server_timing", None) is None:
+			frappe.local.signzy_server_timing = {}
+		for phase, seconds in self.phases.items():
+			frappe.local.signzy_server_timing[phase] = frappe.local.signzy_server_timing.get(phase, 0) + seconds
+
+
+def add_server_timing_header(response=None, request=None):
+	"""after_request hook: sends the sampled Signzy phase timings of the request as a Server-Timing header."""
+	timings = getattr(frappe.local, "signzy_server_timing", None)
+	if not timings or response is None:
+		return
+
+	value = ", ".join(
+		f"signzy-{phase.replace('_', '-')};dur={timings[phase] * 1000:.1f}" for phase in PHASES if phase in timings
+	)
+	existing = response.headers.get("Server-Timing")
+	response.headers["Server-Timing"] = f"{existing}, {value}" if existing else value
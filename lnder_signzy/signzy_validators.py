@@ -0,0 +1,217 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+"""
+Local checks that reject input Signzy is certain to fail on, before a paid call is made.
+Each check returns the input normalized the way it was checked, e.g. without spaces and in
+upper case, and that is what gets sent.
+
+Every check is a precompiled pattern or a table lookup, so obviously invalid input is
+rejected in microseconds. The checks are deliberately no stricter than the official
+formats: anything that could be a real document still goes to Signzy.
+"""
+
+import mmap
+import os
+import re
+import threading
+
+import frappe
+from frappe import _
+
+# Two letter codes of the states and union territories, including the older codes still
+# found on documents issued before a state was renamed or split
+STATE_CODES = (
+	"AN", "AP", "AR", "AS", "BR", "CG", "CH", "DD", "DL", "DN", "GA", "GJ", "HP", "HR", "JH", "JK",
+	"KA", "KL", "LA", "LD", "MH", "ML", "MN", "MP", "MZ", "NL", "OD", "OR", "PB", "PY", "RJ", "SK",
+	"TG", "TN", "TR", "TS", "UA", "UK", "UP", "WB",
+)
+_STATE = "|".join(STATE_CODES)
+
+AADHAAR_PATTERN = re.compile(r"[2-9][0-9]{11}")
+# The fourth letter is the holder type: Person, Company, HUF, Firm, AOP, Trust, BOI, Local authority,
+# artificial Juridical person or Government
+PAN_PATTERN = re.compile(r"[A-Z]{3}[PCHFATBLJG][A-Z][0-9]{4}[A-Z]")
+# State, RTO and a serial: year of issue and seven digits since the Sarathi rollout, while licences
+# issued before it, still valid until renewed, have two digit years, shorter serials or letters
+DL_PATTERN = re.compile(rf"(?:{_STATE})[0-9]{{2}}[0-9A-Z]{{6,13}}")
+# State, RTO, series and number; or a Bharat series number
+RC_PATTERN = re.compile(rf"(?:{_STATE})[0-9]{{1,2}}[A-Z]{{0,3}}[0-9]{{1,4}}|[0-9]{{2}}BH[0-9]{{4}}[A-Z]{{1,2}}")
+IFSC_PATTERN = re.compile(r"[A-Z]{4}0[A-Z0-9]{6}")
+VPA_PATTERN = re.compile(r"[a-zA-Z0-9._-]{2,256}@[a-zA-Z][a-zA-Z0-9.]{1,64}")
+# Spaces and hyphens people type into document numbers
+SEPARATORS = re.compile(r"[\s-]")
+# Older driving licences are also written with slashes, e.g. MH02/12345/99
+DL_SEPARATORS = re.compile(r"[\s/-]")
+
+# Verhoeff checksum tables: multiplication in the dihedral group D5, and the position permutation
+VERHOEFF_D = (
+	(0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+	(1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+	(2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+	(3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+	(4, 0, 1, 2, 3, 9, 5, 6, 7, 8),
+	(5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+	(6, 5, 9, 8, 7, 1, 0, 4, 3, 2),
+	(7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+	(8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+	(9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+VERHOEFF_P = (
+	(0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+	(1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+	(5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+	(8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+	(9, 4, 5, 3, 1, 2, 6, 8, 7, 0),
+	(4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+	(2, 7, 9, 3, 8, 0, 6, 4, 1, 5),
+	(7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+
+# The IFSC directory is a sorted file of fixed width records, one 11 character code and a
+# newline each, searched in place through a memory map shared by all workers on the host
+IFSC_DIRECTORY_PATH = os.path.join(os.path.dirname(__file__), "data", "ifsc_directory.txt")
+IFSC_RECORD_SIZE = 12
+
+_ifsc_directory = None
+_ifsc_directory_lock = threading.Lock()
+
+
+def validate_aadhaar(aadhaar_no: str) -> str:
+	"""Raises unless the Aadhaar number has 12 digits, does not start with 0 or 1, and passes its Verhoeff check."""
+	aadhaar_no = SEPARATORS.sub("", aadhaar_no or "")
+	if not (AADHAAR_PATTERN.fullmatch(aadhaar_no) and is_verhoeff_valid(aadhaar_no)):
+		throw_invalid(_("Aadhaar Number"))
+	return aadhaar_no
+
+
+def validate_pan(pan: str) -> str:
+	"""Raises unless the PAN has the AAAAA9999A structure with a valid holder type."""
+	pan = (pan or "").strip().upper()
+	if not PAN_PATTERN.fullmatch(pan):
+		throw_invalid(_("PAN"))
+	return pan
+
+
+def validate_dl(dl_number: str) -> str:
+	"""Raises unless the driving licence number is a state code, RTO code and a serial of either format."""
+	dl_number = DL_SEPARATORS.sub("", dl_number or "").upper()
+	if not DL_PATTERN.fullmatch(dl_number):
+		throw_invalid(_("Driving License Number"))
+	return dl_number
+
+
+def validate_rc(vehicle_no: str) -> str:
+	"""Raises unless the vehicle number is a state code, RTO code, series and number, or a Bharat series number."""
+	vehicle_no = SEPARATORS.sub("", vehicle_no or "").upper()
+	if not RC_PATTERN.fullmatch(vehicle_no):
+		throw_invalid(_("Vehicle Number"))
+	return vehicle_no
+
+
+def validate_vpa(vpa: str) -> str:
+	"""Raises unless the UPI ID is a handle and a payment service provider, e.g. name@bank."""
+	vpa = (vpa or "").strip()
+	if not VPA_PATTERN.fullmatch(vpa):
+		throw_invalid(_("UPI ID"))
+	return vpa
+
+
+def validate_ifsc(ifsc_code: str) -> str:
+	"""Raises unless the IFSC has the AAAA0XXXXXX structure and, when the IFSC directory is installed, is listed in it."""
+	ifsc_code = (ifsc_code or "").strip().upper()
+	if not IFSC_PATTERN.fullmatch(ifsc_code):
+		throw_invalid(_("IFSC Code"))
+
+	if is_listed_ifsc(ifsc_code) is False:
+		frappe.throw(title="KYC API Error", msg=_("IFSC Code {0} does not belong to any bank branch").format(ifsc_code))
+	return ifsc_code
+
+
+def is_verhoeff_valid(number: str) -> bool:
+	checksum = 0
+	for position, digit in enumerate(reversed(number)):
+		checksum = VERHOEFF_D[checksum][VERHOEFF_P[position % 8][int(digit)]]
+	return checksum == 0
+
+
+def is_listed_ifsc(ifsc_code: str) -> bool | None:
+	"""
+	Binary searches the IFSC directory for a code.
+
+	Returns:
+		bool | None: Whether the code is listed, or None when no directory is installed.
+	"""
+	directory = get_ifsc_directory()
+	if directory is None:
+		return None
+
+	code = ifsc_code.encode()
+	low, high = 0, len(directory) // IFSC_RECORD_SIZE
+	while low < high:
+		middle = (low + high) // 2
+		record = directory[middle * IFSC_RECORD_SIZE:middle * IFSC_RECORD_SIZE + 11]
+		if record < code:
+			low = middle + 1
+		elif record > code:
+			high = middle
+		else:
+			return True
+	return False
+
+
+def get_ifsc_directory() -> mmap.mmap | None:
+	"""Maps the IFSC directory on first use; returns None when it is not installed."""
+	global _ifsc_directory
+
+	if _ifsc_directory is None:
+		with _ifsc_directory_lock:
+			if _ifsc_directory is None:
+				_ifsc_directory = load_ifsc_directory(IFSC_DIRECTORY_PATH)
+
+	return _ifsc_directory or None
+
+
+def load_ifsc_directory(path: str) -> mmap.mmap | bool:
+	if not os.path.exists(path) or not os.path.getsize(path):
+		return False
+
+	with open(path, "rb") as directory:
+		return mmap.mmap(directory.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_ifsc_directory(source_path: str, target_path: str | None = None) -> int:
+	"""
+	Builds the IFSC directory from a file listing IFSC codes, such as the RBI bank branch
+	list exported as CSV. Only the codes are kept; everything else on a line is ignored.
+
+	Run with `bench execute lnder_signzy.signzy_validators.build_ifsc_directory --args "['/path/to/IFSC.csv']"`
+	and restart the workers to pick it up.
+
+	Args:
+		source_path (str): A text or CSV file with an IFSC code somewhere on each line.
+		target_path (str, optional): Where to write the directory. Defaults to the bundled location.
+
+	Returns:
+		int: The number of codes written.
+	"""
+	global _ifsc_directory
+
+	target_path = target_path or IFSC_DIRECTORY_PATH
+	with open(source_path, encoding="utf-8-sig", errors="ignore") as source:
+		codes = sorted({
+			match.group() for line in source for match in re.finditer(r"\b[A-Z]{4}0[A-Z0-9]{6}\b", line.upper())
+		})
+
+	os.makedirs(os.path.dirname(target_path), exist_ok=True)
+	temp_path = f"{target_path}.tmp"
+	with open(temp_path, "w", newline="\n") as target:
+		target.writelines(f"{code}\n" for code in codes)
+	os.replace(temp_path, target_path)
+
+	_ifsc_directory = None
+	return len(codes)
+
+
+def throw_invalid(label: str):
+	frappe.throw(title="KYC API Error", msg=_("{0} is not valid").format(label))
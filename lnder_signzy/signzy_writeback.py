@@ -0,0 +1,258 @@
+# Copyright (c) 2024, Aerele and contributors
+# For license information, please see license.txt
+
+"""Saves Signzy verification results on the records they were made for."""
+
+import re
+from datetime import date, datetime
+
+import frappe
+from frappe import _
+from frappe.utils import getdate, now_datetime
+
+# Spaces and hyphens people type into document numbers
+SEPARATORS = re.compile(r"[\s-]")
+
+
+def update_driver(driver: str, result: dict, update_modified: bool = True) -> dict:
+	"""
+	Saves a Verify Driving License result on a Driver.
+
+	Args:
+		driver (str): The Driver name.
+		result (dict): The "result" of the Signzy response.
+		update_modified (bool, optional): Whether to bump the Driver's modified timestamp. Defaults to True.
+
+	Returns:
+		dict: The values that were set.
+	"""
+	values = {
+		"custom_driving_license_verified": 1 if result.get("verified") in (True, "true") else 0,
+		"custom_dl_last_checked_on": now_datetime(),
+		"custom_dl_check_failures": 0
+	}
+
+	expiry_date = parse_date((result.get("moreInfo") or {}).get("expiryDate"))
+	if values["custom_driving_license_verified"] and expiry_date:
+		values["expiry_date"] = expiry_date
+
+	frappe.db.set_value("Driver", driver, values, update_modified=update_modified)
+	return values
+
+
+def update_vehicle(vehicle: str, result: dict, update_modified: bool = True) -> dict:
+	"""
+	Saves a Verify Vehicle RC result on a Vehicle.
+
+	Args:
+		vehicle (str): The Vehicle name.
+		result (dict): The "result" of the Signzy response.
+		update_modified (bool, optional): Whether to bump the Vehicle's modified timestamp. Defaults to True.
+
+	Returns:
+		dict: The values that were set.
+	"""
+	values = {
+		"custom_rc_verified": 1 if result.get("regNo") else 0,
+		"custom_rc_blacklist_status": result.get("blacklistStatus"),
+		"custom_rc_last_checked_on": now_datetime(),
+		"custom_rc_check_failures": 0
+	}
+
+	expiry_date = parse_date(result.get("rcExpiryDate"))
+	if expiry_date:
+		values["custom_rc_expiry_date"] = expiry_date
+
+	frappe.db.set_value("Vehicle", vehicle, values, update_modified=update_modified)
+	return values
+
+
+def update_bank_account(bank_account: str, result: dict, update_modified: bool = True) -> dict:
+	"""
+	Saves a Verify Bank Account result on a Bank Account.
+
+	Args:
+		bank_account (str): The Bank Account name.
+		result (dict): The "result" of the Signzy response.
+		update_modified (bool, optional): Whether to bump the Bank Account's modified timestamp. Defaults to True.
+
+	Returns:
+		dict: The values that were set.
+	"""
+	values = {"is_bank_account_verified": 1 if is_bank_account_verified(result) else 0}
+	frappe.db.set_value("Bank Account", bank_account, values, update_modified=update_modified)
+	return values
+
+
+def update_bank_account_upi(bank_account: str, result: dict, update_modified: bool = True) -> dict:
+	"""
+	Saves a Verify UPI result on a Bank Account.
+
+	Args:
+		bank_account (str): The Bank Account name.
+		result (dict): The "result" of the Signzy response.
+		update_modified (bool, optional): Whether to bump the Bank Account's modified timestamp. Defaults to True.
+
+	Returns:
+		dict: The values that were set.
+	"""
+	values = {"custom_is_upi_verified": 1 if is_upi_verified(result) else 0}
+	frappe.db.set_value("Bank Account", bank_account, values, update_modified=update_modified)
+	return values
+
+
+def update_employee_pan(employee: str, result: dict, update_modified: bool = True) -> dict:
+	"""Saves a Verify PAN result on an Employee."""
+	verified = result.get("panStatus") == "E" and result.get("dob") == "Y" and result.get("name") == "Y"
+	values = {"custom_is_pan_verified": 1 if verified else 0}
+	frappe.db.set_value("Employee", employee, values, update_modified=update_modified)
+	return values
+
+
+def update_employee_aadhaar(employee: str, result: dict, update_modified: bool = True) -> dict:
+	"""Saves a Verify Aadhaar result on an Employee."""
+	values = {"custom_is_aadhar_verified": 1 if result.get("verified") == "true" else 0}
+	frappe.db.set_value("Employee", employee, values, update_modified=update_modified)
+	return values
+
+
+def update_employee_aadhaar_ocr(employee: str, result: dict, update_modified: bool = True) -> dict:
+	"""Saves a successful Verify Aadhaar - OCR extraction on an Employee."""
+	values = {"custom_is_aadhar_ocr_verified": 1 if result else 0}
+	frappe.db.set_value("Employee", employee, values, update_modified=update_modified)
+	return values
+
+
+def update_employee_mobile(employee: str, result: dict, update_modified: bool = True) -> dict:
+	"""Saves a Submit OTP result on an Employee."""
+	values = {"custom_is_mobile_no_verified": 1 if result else 0}
+	frappe.db.set_value("Employee", employee, values, update_modified=update_modified)
+	return values
+
+
+# The update for each API and doctype pair, and the field holding its verified flag
+WRITEBACKS = {
+	("Verify Driving License", "Driver"): (update_driver, "custom_driving_license_verified"),
+	("Verify Vehicle RC", "Vehicle"): (update_vehicle, "custom_rc_verified"),
+	("Verify Bank Account", "Bank Account"): (update_bank_account, "is_bank_account_verified"),
+	("Verify UPI", "Bank Account"): (update_bank_account_upi, "custom_is_upi_verified"),
+	("Verify PAN", "Employee"): (update_employee_pan, "custom_is_pan_verified"),
+	("Verify Aadhaar", "Employee"): (update_employee_aadhaar, "custom_is_aadhar_verified"),
+	("Verify Aadhaar - OCR", "Employee"): (update_employee_aadhaar_ocr, "custom_is_aadhar_ocr_verified"),
+	("Submit OTP", "Employee"): (update_employee_mobile, "custom_is_mobile_no_verified"),
+}
+
+
+# The document fields each verification input must match before its result is saved there.
+# Inputs missing here, such as the OTP, are not stored on the document.
+WRITEBACK_INPUTS = {
+	("Verify Driving License", "Driver"): {
+		"dl_number": ("license_number",),
+		"dob": ("custom_date_of_birth",),
+		"issue_date": ("issuing_date",),
+	},
+	("Verify Vehicle RC", "Vehicle"): {"vehicle_no": ("license_plate", "name")},
+	("Verify Bank Account", "Bank Account"): {
+		"acc_no": ("bank_account_no",),
+		"ifsc_code": ("branch_code",),
+		"mobile_no": ("custom_mobile_no",),
+		"name": ("account_name",),
+	},
+	("Verify UPI", "Bank Account"): {"vpa": ("custom_upi_id",), "name": ("account_name",)},
+	("Verify PAN", "Employee"): {"pan": ("custom_pan",), "name": ("employee_name",), "dob": ("date_of_birth",)},
+	("Verify Aadhaar", "Employee"): {"aadhaar_no": ("custom_aadhar_number",)},
+	("Verify Aadhaar - OCR", "Employee"): {
+		"front_url": ("custom_aadhar_card_front_image",),
+		"back_url": ("custom_aadhar_card_back_image",),
+	},
+	("Submit OTP", "Employee"): {"mobile_no": ("custom_mobile_number",)},
+}
+
+
+def check_writeback(api_name: str, doctype: str, docname: str, inputs: dict):
+	"""
+	Raises unless the result of `api_name` can be saved on the document by the current user.
+
+	The inputs must be the document's own values, so a result is never saved on a document
+	it was not made for.
+
+	Args:
+		api_name (str): The API method name, e.g. "Verify PAN".
+		doctype (str): The doctype of the document, e.g. "Employee".
+		docname (str): The document name.
+		inputs (dict): The arguments of the `signzy_endpoints` builder.
+	"""
+	if (api_name, doctype) not in WRITEBACKS:
+		frappe.throw(_("{0} results cannot be saved on {1}").format(_(api_name), _(doctype)))
+
+	frappe.has_permission(doctype, "write", docname, throw=True)
+
+	fields = WRITEBACK_INPUTS[(api_name, doctype)]
+	doc = frappe.db.get_value(
+		doctype, docname, list({field for options in fields.values() for field in options}), as_dict=True
+	) or {}
+	for key, options in fields.items():
+		if not any(matches(inputs.get(key), doc.get(field)) for field in options):
+			frappe.throw(
+				_("The {0} sent for verification does not match {1} {2}").format(
+					frappe.unscrub(key), _(doctype), frappe.bold(docname)
+				)
+			)
+
+
+def matches(value, doc_value) -> bool:
+	"""Compares a verification input with a document value, ignoring case, spaces and hyphens."""
+	if not value or not doc_value:
+		return not value and not doc_value
+
+	if isinstance(doc_value, (date, datetime)):
+		return parse_date(value) == getdate(doc_value)
+
+	return SEPARATORS.sub("", str(value)).upper() == SEPARATORS.sub("", str(doc_value)).upper()
+
+
+def apply(api_name: str, doctype: str, docname: str, result: dict) -> dict:
+	"""
+	Saves a verification result on its document in the current transaction and returns a
+	compact status in place of the Signzy response.
+
+	The document's modified timestamp is left alone, so a form that is open on it can
+	still be saved after applying the returned values.
+
+	Args:
+		api_name (str): The API method name, e.g. "Verify PAN".
+		doctype (str): The doctype of the document, e.g. "Employee".
+		docname (str): The document name.
+		result (dict): The "result" of the Signzy response.
+
+	Returns:
+		dict: {"verified": 0 or 1, "message": Signzy's message if any, "values": the values that were set}
+	"""
+	update, verified_field = WRITEBACKS[(api_name, doctype)]
+	values = update(docname, result, update_modified=False)
+
+	message = result.get("message")
+	return {
+		"verified": values[verified_field],
+		"message": message if isinstance(message, str) else None,
+		"values": values
+	}
+
+
+def is_bank_account_verified(result: dict) -> bool:
+	return result.get("active") == "yes" and result.get("reason") == "success"
+
+
+def is_upi_verified(result: dict) -> bool:
+	return result.get("verified") == "true"
+
+
+def parse_date(value: str | None):
+	"""Returns the date in a Signzy date string, or None when it is missing or unreadable."""
+	if not value:
+		return None
+
+	try:
+		return getdate(value)
+	except Exception:
+		return None